@@ -0,0 +1,270 @@
+"""
+Request parsing and response shaping for the JSON API.
+
+Shared by the Flask routes in app.py and the async routes in asgi.py, so both
+serving modes accept the same requests and return the same bodies. Nothing
+here touches the database or a framework's request object.
+"""
+
+import hashlib
+import json
+
+from money import to_grams, to_paise, kgs, rupees, sale_line
+from models import PRODUCT_SORTS
+
+# Query-string parameters of the product listing, carried over by its page links.
+PRODUCT_LISTING_ARGS = (
+    "search_query",
+    "status",
+    "max_stock",
+    "min_price",
+    "max_price",
+    "sort",
+    "order",
+    "page_size",
+)
+_PRODUCT_STATUSES = {"all": None, "active": True, "inactive": False}
+
+
+def parse_checkout(payload, idempotency_key):
+    """
+    Validate a POST /api/invoices body and Idempotency-Key header value.
+
+    Return a (customer_name, quantities, idempotency_key, request_hash) tuple,
+    where ``quantities`` maps product_id to the total grams requested. Raise
+    ValueError with a client-facing message if the request is malformed.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON object.")
+
+    customer_name = str(payload.get("customer_name") or "").strip()
+    raw_items = payload.get("items")
+    if not customer_name:
+        raise ValueError("customer_name is required.")
+    if not isinstance(raw_items, list) or not raw_items:
+        raise ValueError("items must be a non-empty list.")
+
+    idempotency_key = (idempotency_key or "").strip() or None
+    if idempotency_key and len(idempotency_key) > 64:
+        raise ValueError("Idempotency-Key must be at most 64 characters.")
+
+    quantities = {}
+    for raw in raw_items:
+        try:
+            product_id = int(raw["product_id"])
+            quantity = to_grams(raw["quantity"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Each item needs a numeric product_id and quantity.") from None
+        if quantity <= 0:
+            raise ValueError(f"Quantity for product {product_id} must be positive.")
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+    request_hash = hashlib.sha256(
+        json.dumps([customer_name, sorted(quantities.items())]).encode("utf-8")
+    ).hexdigest()
+    return customer_name, quantities, idempotency_key, request_hash
+
+
+def checkout_lines(quantities, products):
+    """
+    Price the requested quantities (grams) against product rows (keyed by product_id).
+
+    Return a (lines, errors) pair: money.sale_line lines for Invoice.save, and
+    a list of messages for products that cannot be sold. Stock is not checked:
+    the rows may come from the catalog cache, so Invoice.save's conditional
+    UPDATE decides whether there is enough (see Invoice.stock_error).
+    """
+    errors = []
+    lines = []
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
+        if not product:
+            errors.append(f"Product {product_id} not found.")
+        elif product["is_active"] == 0:
+            errors.append(f"Product '{product['product_name']}' is inactive.")
+        else:
+            lines.append(
+                sale_line(
+                    product_id, product["product_name"], to_paise(product["unit_price"]), quantity
+                )
+            )
+    return lines, errors
+
+
+def invoice_created_body(invoice_id, grand_total, replayed, url):
+    """Build the JSON response body for a created (or replayed) invoice."""
+    return {
+        "invoice_id": invoice_id,
+        "grand_total": round(float(grand_total), 2),
+        "replayed": replayed,
+        "url": url,
+    }
+
+
+def invoice_detail_body(invoice):
+    """Serialize an Invoice.get_by_id result (header and items) as JSON-ready data."""
+    return {
+        "invoice_id": invoice["invoice_id"],
+        "invoice_date": invoice["invoice_date"].isoformat(),
+        "customer_name": invoice["customer_name"],
+        "grand_total": float(invoice["grand_total"]),
+        "items": [
+            {
+                "item_id": item["item_id"],
+                "product_id": item["product_id"],
+                "product_name": item["product_name"],
+                "quantity_sold": float(item["quantity_sold"]),
+                "unit_price": float(item["unit_price"]),
+                "item_total": float(item["item_total"]),
+            }
+            for item in invoice["items"]
+        ],
+    }
+
+
+def parse_invoice_ids(value, max_count):
+    """
+    Parse the ``ids`` query parameter of GET /api/invoices ("12,15,19").
+
+    Return the invoice IDs in the order given, without duplicates. Raise
+    ValueError with a client-facing message if the list is malformed, empty or
+    longer than ``max_count``.
+    """
+    try:
+        invoice_ids = [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise ValueError("ids must be a comma-separated list of invoice IDs.") from None
+    invoice_ids = list(dict.fromkeys(invoice_ids))
+    if not invoice_ids:
+        raise ValueError("ids must name at least one invoice.")
+    if len(invoice_ids) > max_count:
+        raise ValueError(f"At most {max_count} invoice IDs can be fetched per request.")
+    return invoice_ids
+
+
+def invoice_batch_body(invoice_ids, invoices):
+    """
+    Serialize an Invoice.get_many result for the requested ``invoice_ids``.
+
+    Invoices are listed in the order requested; IDs that do not exist are
+    reported under ``missing``.
+    """
+    return {
+        "invoices": [
+            invoice_detail_body(invoices[invoice_id])
+            for invoice_id in invoice_ids
+            if invoice_id in invoices
+        ],
+        "missing": [invoice_id for invoice_id in invoice_ids if invoice_id not in invoices],
+    }
+
+
+def parse_invoice_listing(args, default_page_size, max_page_size):
+    """
+    Read invoice listing filters and paging from query-string ``args``.
+
+    Return keyword arguments for Invoice.get_all. ``before`` pages towards
+    newer invoices and ``after`` towards older ones.
+    """
+    try:
+        page_size = int(args.get("page_size", default_page_size))
+    except (TypeError, ValueError):
+        page_size = default_page_size
+    before = args.get("before")
+    after = args.get("after")
+    return {
+        "start_date": args.get("start_date"),
+        "end_date": args.get("end_date"),
+        "customer_name": (args.get("customer_name") or "").strip(),
+        "page_size": min(max(page_size, 1), max_page_size),
+        "cursor": before or after,
+        "direction": "prev" if before else "next",
+    }
+
+
+def invoice_page_body(page):
+    """Serialize an Invoice.get_all page as JSON-ready data."""
+    return {
+        "invoices": [
+            {
+                "invoice_id": invoice["invoice_id"],
+                "invoice_date": invoice["invoice_date"].isoformat(),
+                "customer_name": invoice["customer_name"],
+                "grand_total": float(invoice["grand_total"]),
+                "item_count": invoice["item_count"],
+            }
+            for invoice in page["invoices"]
+        ],
+        "next_cursor": page["next_cursor"],
+        "prev_cursor": page["prev_cursor"],
+    }
+
+
+def _optional_amount(args, name, convert):
+    """Return query parameter ``name`` converted with ``convert``, or None if it is blank."""
+    value = (args.get(name) or "").strip()
+    if not value:
+        return None
+    try:
+        amount = convert(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number.") from None
+    if amount < 0:
+        raise ValueError(f"{name} must not be negative.")
+    return amount
+
+
+def parse_product_listing(args, default_page_size, max_page_size):
+    """
+    Read product listing filters, sorting and paging from query-string ``args``.
+
+    Return keyword arguments for Product.get_page. ``before`` pages back towards
+    the start of the ordering and ``after`` onwards. Raise ValueError with a
+    client-facing message if a filter or sort option is invalid.
+    """
+    try:
+        page_size = int(args.get("page_size", default_page_size))
+    except (TypeError, ValueError):
+        page_size = default_page_size
+    status = args.get("status") or "all"
+    if status not in _PRODUCT_STATUSES:
+        raise ValueError("status must be one of: " + ", ".join(_PRODUCT_STATUSES) + ".")
+    sort = args.get("sort") or "name"
+    if sort not in PRODUCT_SORTS:
+        raise ValueError("sort must be one of: " + ", ".join(PRODUCT_SORTS) + ".")
+    order = args.get("order") or "asc"
+    if order not in ("asc", "desc"):
+        raise ValueError("order must be asc or desc.")
+    before = args.get("before")
+    after = args.get("after")
+    return {
+        "page_size": min(max(page_size, 1), max_page_size),
+        "cursor": before or after,
+        "direction": "prev" if before else "next",
+        "sort": sort,
+        "descending": order == "desc",
+        "active": _PRODUCT_STATUSES[status],
+        "max_stock": _optional_amount(args, "max_stock", lambda value: kgs(to_grams(value))),
+        "min_price": _optional_amount(args, "min_price", lambda value: rupees(to_paise(value))),
+        "max_price": _optional_amount(args, "max_price", lambda value: rupees(to_paise(value))),
+        "search": (args.get("search_query") or "").strip(),
+    }
+
+
+def product_page_body(page):
+    """Serialize a Product.get_page page as JSON-ready data."""
+    return {
+        "products": [
+            {
+                "product_id": product["product_id"],
+                "product_name": product["product_name"],
+                "quantity_available": float(product["quantity_available"]),
+                "unit_price": float(product["unit_price"]),
+                "last_updated": product["last_updated"].isoformat(),
+                "is_active": bool(product["is_active"]),
+            }
+            for product in page["products"]
+        ],
+        "next_cursor": page["next_cursor"],
+        "prev_cursor": page["prev_cursor"],
+    }
@@ -1,11 +1,17 @@
 """
 Main Flask application for the Retail Invoice Management System.
 
-Handles routing, request processing, and rendering templates.
+Handles routing, request processing, and rendering templates. create_app()
+builds the app: ``flask run`` finds it by itself, and asgi.py and serve.py
+call it.
 """
 
+import os
+
 from flask import (
+    Blueprint,
     Flask,
+    current_app,
     render_template,
     request,
     redirect,
@@ -13,51 +19,136 @@ from flask import (
     flash,
     session,
     jsonify,
+    Response,
+    stream_with_context,
 )
 from config import Config
-from models import Product, Invoice
-from datetime import datetime
-
-app = Flask(__name__)
-app.config.from_object(Config)
-
-
-@app.context_processor
+from models import Product, Invoice, DailySales, StockReservation
+from database import get_pool_stats
+from export import EXPORT_FORMATS, generate_export
+from cart_store import create_cart_store, new_cart_id
+from product_import import import_products, import_upload
+from api_helpers import (
+    parse_checkout,
+    checkout_lines,
+    invoice_created_body,
+    invoice_detail_body,
+    parse_invoice_ids,
+    invoice_batch_body,
+    parse_invoice_listing,
+    invoice_page_body,
+    PRODUCT_LISTING_ARGS,
+    parse_product_listing,
+    product_page_body,
+)
+from cache import TTLCache, MISSING
+from money import to_paise, to_grams, rupees, kgs, cart_total
+import instrumentation
+import hashlib
+from datetime import datetime, date, timedelta
+from jinja2 import FileSystemBytecodeCache
+
+# Model methods are shared by every app in the process: time them once, here.
+for model in (Product, Invoice, DailySales, StockReservation):
+    instrumentation.instrument_methods(model)
+
+# Every route, hook and template filter, registered by create_app without an
+# endpoint prefix, so endpoints keep their plain names ("products", ...).
+views = Blueprint("views", __name__)
+
+
+def create_app(config=Config):
+    """
+    Build and return the Flask app.
+
+    Startup runs in timed phases (instrumentation.StartupTimer), printed once
+    the app is ready and reported by /api/stats and /metrics. Every template
+    is compiled here (PRECOMPILE_TEMPLATES) rather than by the first request
+    that renders it, and the compiled code is kept in TEMPLATE_CACHE_DIR, so a
+    restarted process loads it instead of compiling again.
+    """
+    startup = instrumentation.StartupTimer()
+    app = Flask(__name__)
+    app.config.from_object(config)
+    app.extensions["cart_store"] = create_cart_store(app.config)
+    # Rendered invoice pages and JSON bodies, keyed by (kind, invoice_id). Invoices
+    # never change once saved, so entries do not expire; they are only evicted.
+    app.extensions["invoice_pages"] = TTLCache(app.config["INVOICE_PAGE_CACHE_SIZE"], ttl=None)
+    app.extensions["startup"] = startup
+    startup.mark("config")
+
+    instrumentation.init_app(app)
+    app.after_request(startup.after_request)
+    app.register_blueprint(views, name="")
+    startup.mark("routes")
+
+    if app.config["TEMPLATE_CACHE_DIR"]:
+        os.makedirs(app.config["TEMPLATE_CACHE_DIR"], exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config["TEMPLATE_CACHE_DIR"])
+    if app.config["PRECOMPILE_TEMPLATES"]:
+        for name in app.jinja_env.list_templates():
+            app.jinja_env.get_template(name)
+    startup.mark("templates")
+
+    print(startup.summary())
+    return app
+
+
+@views.before_app_request
+def apply_remote_product_changes():
+    """Drop catalog data other worker processes have changed (pre-fork serving, see serve.py)."""
+    Product.apply_remote_changes()
+
+
+@views.before_app_request
+def release_expired_reservations():
+    """Return the stock of expired cart holds (at most once per sweep interval)."""
+    StockReservation.release_expired_if_due()
+
+
+@views.app_context_processor
 def inject_now():
     """Inject the current datetime for use in templates."""
     return {"now": datetime.now}
 
 
-@app.route("/")
+# Cart lines carry integer paise and grams (see money.py).
+views.add_app_template_filter(rupees, "rupees")
+views.add_app_template_filter(kgs, "kgs")
+
+
+@views.route("/")
 def index():
-    """Render the home page/dashboard."""
-    return render_template("index.html", title="Dashboard")
+    """Render the home page/dashboard with sales figures from the daily rollups."""
+    today = date.today()
+    daily_sales = DailySales.by_period("day", start_date=today - timedelta(days=6), end_date=today)
+    top_products = DailySales.top_products(start_date=today.replace(day=1), end_date=today, limit=5)
+    today_sales = next((d for d in daily_sales if d["period_start"] == today), None)
+    return render_template(
+        "index.html",
+        title="Dashboard",
+        daily_sales=daily_sales,
+        top_products=top_products,
+        today_sales=today_sales,
+    )
 
 
 # --- Product Routes ---
-@app.route("/products", methods=["GET", "POST"])
+@views.route("/products", methods=["GET", "POST"])
 def products():
     """Handle adding and displaying products, and product search."""
     if request.method == "POST":
-        product_name = request.form["product_name"].strip()
-        quantity_available_str = request.form["quantity_available"].strip()
-        unit_price_str = request.form["unit_price"].strip()
-
-        if not product_name or not quantity_available_str or not unit_price_str:
-            flash("All fields are required!", "danger")
+        try:
+            product_name, quantity_available, unit_price = Product.parse_fields(
+                request.form["product_name"],
+                request.form["quantity_available"],
+                request.form["unit_price"],
+            )
+        except ValueError as e:
+            flash(str(e), "danger")
             return redirect(url_for("products"))
 
         try:
-            quantity_available = float(quantity_available_str)
-            unit_price = float(unit_price_str)
-
-            if quantity_available < 0 or unit_price <= 0:
-                flash(
-                    "Quantity must be non-negative, Unit Price must be positive!",
-                    "danger",
-                )
-                return redirect(url_for("products"))
-
             new_product = Product(
                 product_name=product_name,
                 quantity_available=quantity_available,
@@ -74,31 +165,79 @@ def products():
                     f'Failed to add product "{product_name}". It might already ' f"exist.",
                     "danger",
                 )
-        except ValueError:
-            flash(
-                "Invalid quantity or price format. Please enter numbers.",
-                "danger",
-            )
         except Exception as e:
             flash(f"An unexpected error occurred: {e}", "danger")
 
         return redirect(url_for("products"))
 
-    search_query = request.args.get("search_query", "").strip()
-    if search_query:
-        all_products = Product.get_by_name_like(search_query, include_inactive=True)
-    else:
-        all_products = Product.get_all()
-
+    try:
+        listing = parse_product_listing(
+            request.args,
+            current_app.config["PRODUCTS_PAGE_SIZE"],
+            current_app.config["PRODUCTS_MAX_PAGE_SIZE"],
+        )
+    except ValueError as e:
+        flash(str(e), "danger")
+        return redirect(url_for("products"))
+    page = Product.get_page(**listing)
+    # The filters as given, carried over by the page links and shown in the filter form
+    filters = {name: request.args[name] for name in PRODUCT_LISTING_ARGS if request.args.get(name)}
     return render_template(
         "products.html",
-        products=all_products,
+        products=page["products"],
+        next_cursor=page["next_cursor"],
+        prev_cursor=page["prev_cursor"],
+        filters=filters,
         title="Products",
-        search_query=search_query,
+        search_query=listing["search"],
     )
 
 
-@app.route("/products/edit/<int:product_id>", methods=["GET", "POST"])
+@views.route("/products/import", methods=["POST"])
+def import_products_upload():
+    """Bulk add/update products from an uploaded CSV or JSON price list."""
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        flash("Choose a CSV or JSON file to import.", "danger")
+        return redirect(url_for("products"))
+    try:
+        report = import_upload(upload)
+    except (ValueError, UnicodeDecodeError) as e:
+        flash(f"Could not read the import file: {e}", "danger")
+        return redirect(url_for("products"))
+
+    if report["failed"]:
+        flash("Import failed while writing to the database. Please check logs.", "danger")
+    else:
+        flash(
+            f"Imported {report['rows_written']} of {report['rows_total']} rows "
+            f"({report['rows_per_second']:.0f} rows/s).",
+            "success",
+        )
+    for error in report["errors"][:10]:
+        flash(f"Row {error['row']}: {error['error']}", "warning")
+    if len(report["errors"]) > 10:
+        flash(f"... and {len(report['errors']) - 10} more invalid rows.", "warning")
+    return redirect(url_for("products"))
+
+
+@views.route("/api/products/import", methods=["POST"])
+def api_import_products():
+    """Bulk add/update products from a JSON array body or an uploaded file (JSON report)."""
+    try:
+        if "file" in request.files:
+            report = import_upload(request.files["file"])
+        else:
+            records = request.get_json(silent=True)
+            if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+                return jsonify({"error": "Body must be a JSON array of product objects."}), 400
+            report = import_products(records)
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({"error": f"Could not read the import file: {e}"}), 400
+    return jsonify(report), 500 if report["failed"] else 200
+
+
+@views.route("/products/edit/<int:product_id>", methods=["GET", "POST"])
 def edit_product(product_id):
     """Edit an existing product."""
     product = Product.get_by_id(product_id)
@@ -106,26 +245,22 @@ def edit_product(product_id):
         flash("Product not found.", "danger")
         return redirect(url_for("products"))
 
+    reorder_level = Product.reorder_level(product_id)
+    held = StockReservation.held(product_id)
     if request.method == "POST":
-        product_name = request.form["product_name"].strip()
-        quantity_available_str = request.form["quantity_available"].strip()
-        unit_price_str = request.form["unit_price"].strip()
-
-        if not product_name or not quantity_available_str or not unit_price_str:
-            flash("All fields are required!", "danger")
+        try:
+            # The form asks for the stock on hand, including what is held for carts.
+            product_name, quantity_available, unit_price = Product.parse_fields(
+                request.form["product_name"],
+                request.form["quantity_available"],
+                request.form["unit_price"],
+            )
+            new_reorder_level = Product.parse_reorder_level(request.form.get("reorder_level"))
+        except ValueError as e:
+            flash(str(e), "danger")
             return redirect(url_for("edit_product", product_id=product_id))
 
         try:
-            quantity_available = float(quantity_available_str)
-            unit_price = float(unit_price_str)
-
-            if quantity_available < 0 or unit_price <= 0:
-                flash(
-                    "Quantity must be non-negative, Unit Price must be positive!",
-                    "danger",
-                )
-                return redirect(url_for("edit_product", product_id=product_id))
-
             updated_product = Product(
                 product_id=product_id,
                 product_name=product_name,
@@ -133,7 +268,10 @@ def edit_product(product_id):
                 unit_price=unit_price,
                 is_active=product["is_active"],
             )
-            if updated_product.update():
+            if updated_product.update() and (
+                new_reorder_level == reorder_level
+                or Product.set_reorder_level(product_id, new_reorder_level)
+            ):
                 flash(
                     f'Product "{product_name}" updated successfully!',
                     "success",
@@ -144,22 +282,20 @@ def edit_product(product_id):
                     f'Failed to update product "{product_name}".',
                     "danger",
                 )
-        except ValueError:
-            flash(
-                "Invalid quantity or price format. Please enter numbers.",
-                "danger",
-            )
         except Exception as e:
             flash(f"An unexpected error occurred: {e}", "danger")
 
     return render_template(
         "edit_product.html",
         product=product,
+        reorder_level=reorder_level,
+        held=held,
+        on_hand=product["quantity_available"] + held,
         title=f'Edit Product: {product["product_name"]}',
     )
 
 
-@app.route("/products/deactivate/<int:product_id>", methods=["POST"])
+@views.route("/products/deactivate/<int:product_id>", methods=["POST"])
 def deactivate_product(product_id):
     """Deactivate (soft delete) a product."""
     product = Product.get_by_id(product_id)
@@ -181,7 +317,7 @@ def deactivate_product(product_id):
     return redirect(url_for("products"))
 
 
-@app.route("/products/activate/<int:product_id>", methods=["POST"])
+@views.route("/products/activate/<int:product_id>", methods=["POST"])
 def activate_product(product_id):
     """Activate a previously deactivated product."""
     product = Product.get_by_id(product_id)
@@ -203,24 +339,58 @@ def activate_product(product_id):
     return redirect(url_for("products"))
 
 
-@app.route("/api/products/search")
+@views.route("/api/products", methods=["GET"])
+def api_products():
+    """Return one keyset-paginated page of products as JSON (same filters as /products)."""
+    try:
+        listing = parse_product_listing(
+            request.args,
+            current_app.config["PRODUCTS_PAGE_SIZE"],
+            current_app.config["PRODUCTS_MAX_PAGE_SIZE"],
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(product_page_body(Product.get_page(**listing)))
+
+
+@views.route("/api/products/search")
 def api_product_search():
-    """Return product name suggestions for autocomplete (JSON)."""
+    """Return ranked product name suggestions for autocomplete (JSON)."""
     query = request.args.get("query", "").strip()
     if len(query) < 3:
         return jsonify([])
 
-    products = Product.get_by_name_like(query, include_inactive=False)
-    suggestions = [{"product_name": p["product_name"]} for p in products]
+    limit = min(max(request.args.get("limit", 10, type=int), 1), 50)
+    suggestions = Product.search_names(query, limit=limit, include_inactive=False)
     return jsonify(suggestions)
 
 
+@views.route("/api/products/<int:product_id>/stock")
+def api_product_stock(product_id):
+    """Return a product's stock at ``at`` (default now), replayed from the stock log (JSON)."""
+    at = request.args.get("at")
+    try:
+        at = datetime.fromisoformat(at) if at else datetime.now()
+    except ValueError:
+        return jsonify({"error": "at must be an ISO date and time (YYYY-MM-DDTHH:MM:SS)."}), 400
+    return jsonify(
+        {
+            "product_id": product_id,
+            "at": at.isoformat(),
+            "quantity_available": float(kgs(Product.stock_at(product_id, at))),
+            "on_hand": float(kgs(Product.stock_at(product_id, at, include_holds=False))),
+        }
+    )
+
+
 # --- Invoice Routes ---
-@app.route("/invoice/create", methods=["GET", "POST"])
+@views.route("/invoice/create", methods=["GET", "POST"])
 def create_invoice():
-    """Create a new invoice and manage the cart in session."""
-    if "cart" not in session:
-        session["cart"] = []
+    """Create a new invoice and manage the server-side cart referenced from the session."""
+    cart_store = current_app.extensions["cart_store"]
+    if "cart_id" not in session:
+        session["cart_id"] = new_cart_id()
+    cart_id = session["cart_id"]
 
     if request.method == "POST":
         action = request.form.get("action")
@@ -237,7 +407,7 @@ def create_invoice():
                 return redirect(url_for("create_invoice"))
 
             try:
-                quantity_to_sell = float(quantity_str)
+                quantity_to_sell = to_grams(quantity_str)
                 if quantity_to_sell <= 0:
                     flash("Quantity must be positive.", "danger")
                     return redirect(url_for("create_invoice"))
@@ -259,7 +429,7 @@ def create_invoice():
                     )
                     return redirect(url_for("create_invoice"))
 
-                if quantity_to_sell > float(product["quantity_available"]):
+                if not StockReservation.hold(cart_id, product["product_id"], quantity_to_sell):
                     flash(
                         f"Insufficient stock for {product['product_name']}. Only "
                         f"{product['quantity_available']:.3f} kgs available.",
@@ -267,17 +437,21 @@ def create_invoice():
                     )
                     return redirect(url_for("create_invoice"))
 
-                cart_item = {
-                    "product_id": product["product_id"],
-                    "product_name": product["product_name"],
-                    "unit_price": float(product["unit_price"]),
-                    "quantity_sold": quantity_to_sell,
-                    "item_total": quantity_to_sell * float(product["unit_price"]),
-                }
-                session["cart"].append(cart_item)
-                session.modified = True
+                try:
+                    cart_store.add_item(
+                        cart_id,
+                        product["product_id"],
+                        product["product_name"],
+                        to_paise(product["unit_price"]),
+                        quantity_to_sell,
+                    )
+                except Exception:
+                    # No cart line means no checkout or removal would ever give
+                    # this stock back before the hold expires: do it now.
+                    StockReservation.unhold(cart_id, product["product_id"], quantity_to_sell)
+                    raise
                 flash(
-                    f"Added {quantity_to_sell:.3f} kgs x {product['product_name']} to cart.",
+                    f"Added {kgs(quantity_to_sell)} kgs x {product['product_name']} to cart.",
                     "info",
                 )
 
@@ -289,10 +463,10 @@ def create_invoice():
             return redirect(url_for("create_invoice"))
 
         elif action == "remove_item":
-            item_index = int(request.form["item_index"])
-            if 0 <= item_index < len(session["cart"]):
-                removed_item = session["cart"].pop(item_index)
-                session.modified = True
+            product_id = int(request.form["product_id"])
+            removed_item = cart_store.remove_item(cart_id, product_id)
+            StockReservation.release(cart_id, product_id)
+            if removed_item:
                 flash(
                     f"Removed {removed_item['product_name']} from cart.",
                     "warning",
@@ -305,26 +479,28 @@ def create_invoice():
                 flash("Customer name is required for checkout.", "danger")
                 return redirect(url_for("create_invoice"))
 
-            if not session.get("cart"):
+            cart_items = cart_store.get_items(cart_id)
+            if not cart_items:
                 flash("Cannot checkout with an empty cart.", "warning")
                 return redirect(url_for("create_invoice"))
 
-            grand_total = sum(item["item_total"] for item in session["cart"])
+            grand_total = cart_total(cart_items)
 
             new_invoice = Invoice(
                 customer_name=customer_name,
-                grand_total=grand_total,
-                items=session["cart"],
+                grand_total_paise=grand_total,
+                items=cart_items,
             )
 
-            invoice_id = new_invoice.save()
+            invoice_id = new_invoice.save(cart_id=cart_id)
             if invoice_id:
                 flash(
-                    f"Invoice {invoice_id} created successfully! Total: " f"9{grand_total:.2f}",
+                    f"Invoice {invoice_id} created successfully! Total: "
+                    f"9{rupees(grand_total)}",
                     "success",
                 )
-                session.pop("cart", None)
-                session.modified = True
+                cart_store.delete(cart_id)
+                session.pop("cart_id", None)
                 return redirect(url_for("invoice_detail", invoice_id=invoice_id))
             else:
                 flash(
@@ -334,51 +510,314 @@ def create_invoice():
                 )
             return redirect(url_for("create_invoice"))
 
-    grand_total_display = sum(item["item_total"] for item in session.get("cart", []))
+    cart_items = cart_store.get_items(cart_id)
+    grand_total_display = cart_total(cart_items)
 
     return render_template(
         "create_invoice.html",
-        cart_items=session.get("cart", []),
+        cart_items=cart_items,
         grand_total=grand_total_display,
         title="Create Invoice",
     )
 
 
-@app.route("/invoices")
-def invoices():
-    """Display all past invoices with filtering options."""
-    start_date = request.args.get("start_date")
-    end_date = request.args.get("end_date")
-    customer_name = request.args.get("customer_name", "").strip()
+@views.route("/api/stock/low")
+def api_low_stock():
+    """Return active products at or below their reorder level, longest low first (JSON)."""
+    limit = request.args.get("limit", type=int)
+    products = Product.low_stock(limit=max(limit, 0) if limit is not None else None)
+    return jsonify(
+        {
+            "products": [
+                {
+                    "product_id": product["product_id"],
+                    "product_name": product["product_name"],
+                    "quantity_available": float(product["quantity_available"]),
+                    "reorder_level": float(product["reorder_level"]),
+                    "below_since": product["below_since"].isoformat(timespec="seconds"),
+                }
+                for product in products
+            ],
+        }
+    )
+
+
+@views.route("/api/invoices", methods=["POST"])
+def api_create_invoice():
+    """
+    Create an invoice from a full cart in one request (JSON), for POS terminals.
+
+    Expect ``{"customer_name": str, "items": [{"product_id": int, "quantity": number}]}``.
+    An optional ``Idempotency-Key`` header makes retries safe: repeating a request
+    with the same key returns the invoice created the first time.
+    """
+    try:
+        customer_name, quantities, idempotency_key, request_hash = parse_checkout(
+            request.get_json(silent=True), request.headers.get("Idempotency-Key")
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if idempotency_key:
+        existing = Invoice.get_by_idempotency_key(idempotency_key)
+        if existing:
+            if existing["request_hash"] != request_hash:
+                return jsonify({"error": "Idempotency-Key was used for a different request."}), 422
+            return jsonify(
+                _invoice_created_body(existing["invoice_id"], existing["grand_total"], True)
+            )
+
+    lines, errors = checkout_lines(quantities, Product.get_by_ids(quantities))
+    if errors:
+        return jsonify({"error": "Cart validation failed.", "details": errors}), 422
+
+    grand_total = cart_total(lines)
+    new_invoice = Invoice(customer_name=customer_name, grand_total_paise=grand_total, items=lines)
+    invoice_id = new_invoice.save(idempotency_key=idempotency_key, request_hash=request_hash)
+    if new_invoice.idempotency_conflict:
+        return jsonify({"error": "Idempotency-Key was used for a different request."}), 422
+    if new_invoice.stock_error:
+        return (
+            jsonify({"error": "Cart validation failed.", "details": [new_invoice.stock_error]}),
+            422,
+        )
+    if not invoice_id:
+        return jsonify({"error": "Failed to create invoice."}), 409
+    if new_invoice.replayed:
+        existing = Invoice.get_by_idempotency_key(idempotency_key)
+        return jsonify(_invoice_created_body(invoice_id, existing["grand_total"], True))
+    return jsonify(_invoice_created_body(invoice_id, rupees(grand_total), False)), 201
+
+
+def _invoice_created_body(invoice_id, grand_total, replayed):
+    """Build the JSON response body for a created (or replayed) invoice."""
+    url = url_for("invoice_detail", invoice_id=invoice_id)
+    return invoice_created_body(invoice_id, grand_total, replayed, url)
+
+
+@views.route("/api/invoices", methods=["GET"])
+def api_list_invoices():
+    """
+    Return one keyset-paginated page of invoices as JSON (same filters as /invoices).
+
+    With ``ids=12,15,19``, return those invoices with their items instead.
+    """
+    if "ids" in request.args:
+        try:
+            invoice_ids = parse_invoice_ids(
+                request.args["ids"], current_app.config["INVOICES_MAX_BATCH"]
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify(invoice_batch_body(invoice_ids, Invoice.get_many(invoice_ids)))
+
+    page = Invoice.get_all(
+        **parse_invoice_listing(
+            request.args,
+            current_app.config["INVOICES_PAGE_SIZE"],
+            current_app.config["INVOICES_MAX_PAGE_SIZE"],
+        )
+    )
+    return jsonify(invoice_page_body(page))
+
 
-    all_invoices = Invoice.get_all(
-        start_date=start_date,
-        end_date=end_date,
-        customer_name=customer_name,
+@views.route("/invoices")
+def invoices():
+    """Display past invoices one keyset-paginated page at a time, with filtering options."""
+    listing = parse_invoice_listing(
+        request.args,
+        current_app.config["INVOICES_PAGE_SIZE"],
+        current_app.config["INVOICES_MAX_PAGE_SIZE"],
     )
+    page = Invoice.get_all(**listing, include_total=True)
     return render_template(
         "invoices.html",
-        invoices=all_invoices,
+        invoices=page["invoices"],
+        next_cursor=page["next_cursor"],
+        prev_cursor=page["prev_cursor"],
+        total_estimate=page["total_estimate"],
+        page_size=listing["page_size"],
         title="All Invoices",
-        start_date=start_date,
-        end_date=end_date,
-        customer_name=customer_name,
+        start_date=listing["start_date"],
+        end_date=listing["end_date"],
+        customer_name=listing["customer_name"],
     )
 
 
-@app.route("/invoice/<int:invoice_id>")
+@views.route("/invoice/<int:invoice_id>")
 def invoice_detail(invoice_id):
     """Display the details of a specific invoice."""
-    invoice = Invoice.get_by_id(invoice_id)
-    if not invoice:
-        flash("Invoice not found.", "danger")
-        return redirect(url_for("invoices"))
-    return render_template(
-        "invoice_detail.html",
-        invoice=invoice,
-        title=f"Invoice {invoice_id} Details",
+
+    def render(invoice):
+        return render_template(
+            "invoice_detail.html", invoice=invoice, title=f"Invoice {invoice_id} Details"
+        )
+
+    if session.get("_flashes"):
+        # The page shows the pending flash messages (e.g. right after checkout),
+        # so this render is neither served from nor added to the cache.
+        invoice = Invoice.get_by_id(invoice_id)
+        response = render(invoice) if invoice else None
+    else:
+        response = _immutable_response(("html", invoice_id), render, "text/html")
+    if response:
+        return response
+    flash("Invoice not found.", "danger")
+    return redirect(url_for("invoices"))
+
+
+@views.route("/api/invoices/<int:invoice_id>")
+def api_invoice_detail(invoice_id):
+    """Return an invoice with its items as JSON."""
+    response = _immutable_response(
+        ("json", invoice_id),
+        lambda invoice: current_app.json.dumps(invoice_detail_body(invoice)),
+        "application/json",
+    )
+    if response:
+        return response
+    return jsonify({"error": f"Invoice {invoice_id} not found."}), 404
+
+
+def _immutable_response(key, render, mimetype):
+    """
+    Serve a cached representation of an invoice, rendering it on a cache miss.
+
+    ``key`` is (kind, invoice_id) and ``render`` turns an Invoice.get_by_id
+    result into the body. Responses carry a strong ETag and an immutable
+    Cache-Control header; a request whose If-None-Match holds the ETag gets a
+    304. A cached invoice is served without touching the database. Return None
+    if the invoice does not exist.
+    """
+    invoice_pages = current_app.extensions["invoice_pages"]
+    entry = invoice_pages.get(key)
+    if entry is MISSING:
+        invoice = Invoice.get_by_id(key[1])
+        if not invoice:
+            return None
+        body = render(invoice).encode("utf-8")
+        entry = (body, hashlib.sha256(body).hexdigest()[:32])
+        invoice_pages.set(key, entry)
+    body, etag = entry
+    response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = (
+        f"private, max-age={current_app.config['INVOICE_PAGE_MAX_AGE']}, immutable"
+    )
+    return response.make_conditional(request)
+
+
+@views.route("/api/invoices/export")
+def export_invoices():
+    """Stream invoices with their line items as CSV or NDJSON."""
+    fmt = request.args.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unsupported format '{fmt}'."}), 400
+
+    chunks = generate_export(
+        fmt,
+        start_date=request.args.get("start_date"),
+        end_date=request.args.get("end_date"),
+        customer_name=request.args.get("customer_name", "").strip(),
+    )
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="invoices.{fmt}"'},
+    )
+
+
+# --- Reporting Routes ---
+@views.route("/api/sales/summary")
+def api_sales_summary():
+    """Return sales by day/week/month and the top-N products from the rollups (JSON)."""
+    period = request.args.get("period", "day")
+    order_by = request.args.get("order_by", "revenue")
+    if period not in DailySales.PERIODS or order_by not in ("revenue", "quantity_sold"):
+        return jsonify({"error": "Unsupported period or order_by."}), 400
+    start_date = request.args.get("start_date")
+    end_date = request.args.get("end_date")
+    top = min(max(request.args.get("top", 5, type=int), 1), 100)
+
+    sales = DailySales.by_period(period, start_date=start_date, end_date=end_date)
+    top_products = DailySales.top_products(
+        start_date=start_date, end_date=end_date, limit=top, order_by=order_by
     )
+    return jsonify(
+        {
+            "period": period,
+            "sales": [
+                {
+                    "period_start": row["period_start"].isoformat(),
+                    "quantity_sold": float(row["quantity_sold"]),
+                    "revenue": float(row["revenue"]),
+                    "invoice_lines": int(row["invoice_lines"]),
+                }
+                for row in sales
+            ],
+            "top_products": [
+                {
+                    "product_id": row["product_id"],
+                    "product_name": row["product_name"],
+                    "quantity_sold": float(row["quantity_sold"]),
+                    "revenue": float(row["revenue"]),
+                }
+                for row in top_products
+            ],
+        }
+    )
+
+
+# --- Monitoring Routes ---
+@views.route("/api/stats")
+def api_stats():
+    """Return runtime metrics (connection pool usage, cache hit rates, ...) as JSON."""
+    return jsonify(
+        {
+            "db_pool": get_pool_stats(),
+            "product_cache": Product.cache_stats(),
+            "invoice_page_cache": current_app.extensions["invoice_pages"].stats(),
+            "stock_log": Product.stock_log_stats(),
+            "low_stock": Product.low_stock_stats(),
+            "change_feed": Product.change_feed_stats(),
+            "startup": current_app.extensions["startup"].report(),
+            # Set by asgi.py in async serving mode
+            "async_db_pool": current_app.extensions.get("async_db_pool", dict)(),
+        }
+    )
+
+
+@views.route("/metrics")
+def metrics():
+    """Expose request, SQL, model, template, pool and cache metrics in Prometheus format."""
+    gauges = {
+        (f"db_pool_{key}", ()): value
+        for key, value in get_pool_stats().items()
+        if isinstance(value, (int, float))
+    }
+    for cache_name, cache_stats in Product.cache_stats().items():
+        for key, value in cache_stats.items():
+            gauges[(f"product_cache_{key}", (("cache", cache_name),))] = value
+    for key, value in current_app.extensions["invoice_pages"].stats().items():
+        if isinstance(value, (int, float)):
+            gauges[(f"invoice_page_cache_{key}", ())] = value
+    for key, value in Product.stock_log_stats().items():
+        gauges[(f"stock_log_{key}", ())] = value
+    low_stock_stats = Product.low_stock_stats()
+    for key, value in {**low_stock_stats.pop("sink"), **low_stock_stats}.items():
+        gauges[(f"low_stock_{key}", ())] = value
+    for key, value in Product.change_feed_stats().items():
+        gauges[(f"change_feed_{key}", ())] = value
+    for key, value in current_app.extensions.get("async_db_pool", dict)().items():
+        gauges[(f"async_db_pool_{key}", ())] = value
+    startup = current_app.extensions["startup"].report()
+    for phase, seconds in startup.pop("phases").items():
+        gauges[("startup_phase_seconds", (("phase", phase),))] = seconds
+    for key, seconds in startup.items():
+        if seconds is not None:
+            gauges[(f"startup_{key}_seconds", ())] = seconds
+    return Response(instrumentation.metrics.render(gauges), mimetype="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
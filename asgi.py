@@ -0,0 +1,183 @@
+"""
+ASGI entry point for the Retail Invoice Management System (async serving mode).
+
+    hypercorn asgi:application --workers 1
+    # or: uvicorn asgi:application
+
+Product autocomplete, the JSON invoice listing and the JSON checkout are served
+by async Quart views over an aiomysql pool, so one process can keep hundreds of
+those requests in flight while others wait on the database. Every other route
+is the regular Flask app from app.py, run in a thread pool through an ASGI/WSGI
+adapter; ``flask run`` (sync mode) keeps working unchanged.
+
+The async routes do the same per-request housekeeping as the Flask app's hooks
+(catching up on the change feed) and are counted in the request metrics at
+/metrics, but their SQL is not. Expired stock holds are swept by a background
+task, since async requests do not pass through the Flask sweep.
+"""
+
+import asyncio
+import time
+
+from asgiref.wsgi import WsgiToAsgi
+from quart import Quart, g, request, jsonify
+
+from api_helpers import (
+    parse_checkout,
+    checkout_lines,
+    invoice_created_body,
+    parse_invoice_ids,
+    invoice_batch_body,
+    parse_invoice_listing,
+    invoice_page_body,
+)
+from app import create_app
+from async_database import init_async_pool, close_async_pool, get_async_pool_stats
+from async_models import AsyncProduct, AsyncInvoice
+from config import Config
+from instrumentation import metrics
+from models import Invoice, Product, StockReservation
+from money import rupees, cart_total
+
+flask_app = create_app()
+flask_app.extensions["async_db_pool"] = get_async_pool_stats  # Reported by /api/stats, /metrics
+async_app = Quart(__name__)
+async_app.config.from_object(Config)
+
+# (method, path) pairs answered by async_app; everything else goes to Flask.
+ASYNC_ROUTES = {
+    ("GET", "/api/products/search"),
+    ("GET", "/api/invoices"),
+    ("POST", "/api/invoices"),
+}
+
+
+_background_tasks = []
+
+
+@async_app.before_serving
+async def _open_pool():
+    await init_async_pool()
+    _background_tasks.append(asyncio.create_task(_sweep_reservations()))
+
+
+@async_app.after_serving
+async def _close_pool():
+    while _background_tasks:
+        _background_tasks.pop().cancel()
+    await close_async_pool()
+
+
+async def _sweep_reservations():
+    """Return the stock of expired cart holds every RESERVATION_SWEEP_INTERVAL seconds."""
+    while True:
+        await asyncio.sleep(Config.RESERVATION_SWEEP_INTERVAL)
+        await asyncio.to_thread(StockReservation.release_expired_if_due)
+
+
+@async_app.before_request
+async def _start_request():
+    """Drop catalog data other worker processes have changed, and start the request clock."""
+    Product.apply_remote_changes()
+    g.started = time.perf_counter()
+
+
+@async_app.after_request
+async def _record_request(response):
+    """Count and time the request in the same metrics as the Flask routes."""
+    labels = (("endpoint", request.endpoint or "unmatched"),)
+    metrics.inc(
+        "http_requests_total",
+        labels + (("method", request.method), ("status", str(response.status_code))),
+    )
+    metrics.observe("http_request_duration_seconds", labels, time.perf_counter() - g.started)
+    return response
+
+
+@async_app.route("/api/products/search")
+async def api_product_search():
+    """Return ranked product name suggestions for autocomplete (JSON)."""
+    query = request.args.get("query", "").strip()
+    if len(query) < 3:
+        return jsonify([])
+
+    limit = min(max(request.args.get("limit", 10, type=int), 1), 50)
+    return jsonify(await AsyncProduct.search_names(query, limit=limit, include_inactive=False))
+
+
+@async_app.route("/api/invoices", methods=["GET"])
+async def api_list_invoices():
+    """Return a page of invoices, or the invoices named by ``ids``, as JSON; see app.py."""
+    if "ids" in request.args:
+        try:
+            invoice_ids = parse_invoice_ids(request.args["ids"], Config.INVOICES_MAX_BATCH)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify(invoice_batch_body(invoice_ids, await AsyncInvoice.get_many(invoice_ids)))
+
+    page = await AsyncInvoice.get_all(
+        **parse_invoice_listing(
+            request.args, Config.INVOICES_PAGE_SIZE, Config.INVOICES_MAX_PAGE_SIZE
+        )
+    )
+    return jsonify(invoice_page_body(page))
+
+
+@async_app.route("/api/invoices", methods=["POST"])
+async def api_create_invoice():
+    """Create an invoice from a full cart in one request (JSON); see app.api_create_invoice."""
+    try:
+        customer_name, quantities, idempotency_key, request_hash = parse_checkout(
+            await request.get_json(silent=True), request.headers.get("Idempotency-Key")
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if idempotency_key:
+        existing = await AsyncInvoice.get_by_idempotency_key(idempotency_key)
+        if existing:
+            if existing["request_hash"] != request_hash:
+                return jsonify({"error": "Idempotency-Key was used for a different request."}), 422
+            return jsonify(
+                _invoice_created_body(existing["invoice_id"], existing["grand_total"], True)
+            )
+
+    lines, errors = checkout_lines(quantities, await AsyncProduct.get_by_ids(quantities))
+    if errors:
+        return jsonify({"error": "Cart validation failed.", "details": errors}), 422
+
+    grand_total = cart_total(lines)
+    new_invoice = Invoice(customer_name=customer_name, grand_total_paise=grand_total, items=lines)
+    invoice_id = await AsyncInvoice.save(new_invoice, idempotency_key, request_hash)
+    if new_invoice.idempotency_conflict:
+        return jsonify({"error": "Idempotency-Key was used for a different request."}), 422
+    if new_invoice.stock_error:
+        return (
+            jsonify({"error": "Cart validation failed.", "details": [new_invoice.stock_error]}),
+            422,
+        )
+    if not invoice_id:
+        return jsonify({"error": "Failed to create invoice."}), 409
+    if new_invoice.replayed:
+        existing = await AsyncInvoice.get_by_idempotency_key(idempotency_key)
+        return jsonify(_invoice_created_body(invoice_id, existing["grand_total"], True))
+    return jsonify(_invoice_created_body(invoice_id, rupees(grand_total), False)), 201
+
+
+def _invoice_created_body(invoice_id, grand_total, replayed):
+    """Build the JSON body for a created invoice; its page is served by the Flask app."""
+    url = request.root_path + f"/invoice/{invoice_id}"
+    return invoice_created_body(invoice_id, grand_total, replayed, url)
+
+
+_sync_app = WsgiToAsgi(flask_app)
+
+
+async def application(scope, receive, send):
+    """Dispatch ASGI events: async routes and lifespan to Quart, the rest to Flask."""
+    if scope["type"] == "lifespan" or (
+        scope["type"] == "http" and (scope["method"], scope["path"]) in ASYNC_ROUTES
+    ):
+        await async_app(scope, receive, send)
+    else:
+        await _sync_app(scope, receive, send)
@@ -0,0 +1,86 @@
+"""
+Async database access for the ASGI serving mode (see asgi.py).
+
+Connections come from an aiomysql pool that lives on the server's event loop,
+so a request waiting on MySQL yields to other requests instead of blocking a
+worker thread. With the sqlite backend there is no async pool; async_models
+runs the regular model methods in worker threads instead.
+"""
+
+import asyncio
+import contextlib
+
+import aiomysql
+from config import Config
+
+# aiomysql re-exports the PyMySQL exception hierarchy.
+AsyncDatabaseError = aiomysql.Error
+AsyncIntegrityError = aiomysql.IntegrityError
+
+_pool = None
+
+
+async def init_async_pool():
+    """Create the shared aiomysql pool (MySQL backend only); call once at server startup."""
+    global _pool
+    if Config.DB_BACKEND != "mysql" or _pool is not None:
+        return
+    _pool = await aiomysql.create_pool(
+        host=Config.DB_HOST,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD,
+        db=Config.DB_NAME,
+        minsize=Config.ASYNC_DB_POOL_MIN,
+        maxsize=Config.ASYNC_DB_POOL_SIZE,
+        pool_recycle=Config.ASYNC_DB_POOL_RECYCLE,
+        autocommit=False,
+    )
+    print("Async MySQL connection pool ready!")
+
+
+async def close_async_pool():
+    """Close every pooled connection; call once at server shutdown."""
+    global _pool
+    if _pool is None:
+        return
+    _pool.close()
+    await _pool.wait_closed()
+    _pool = None
+
+
+def async_pool_enabled():
+    """Return True when queries can go through the async pool."""
+    return _pool is not None
+
+
+@contextlib.asynccontextmanager
+async def async_connection():
+    """
+    Check out a pooled connection for the duration of an ``async with`` block.
+
+    Wait up to DB_POOL_TIMEOUT seconds for a free connection (raising
+    asyncio.TimeoutError after that). Any transaction left open is rolled back
+    before the connection goes back to the pool.
+    """
+    conn = await asyncio.wait_for(_pool.acquire(), Config.DB_POOL_TIMEOUT)
+    try:
+        yield conn
+    finally:
+        try:
+            if conn.get_transaction_status():
+                await conn.rollback()
+        except AsyncDatabaseError:
+            conn.close()
+        _pool.release(conn)
+
+
+def get_async_pool_stats():
+    """Return async pool metrics as a dictionary (empty when the pool is not running)."""
+    if _pool is None:
+        return {}
+    return {
+        "size": _pool.maxsize,
+        "open": _pool.size,
+        "idle": _pool.freesize,
+        "in_use": _pool.size - _pool.freesize,
+    }
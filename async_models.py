@@ -0,0 +1,307 @@
+"""
+Async versions of the hot model paths for the ASGI serving mode.
+
+AsyncProduct and AsyncInvoice cover autocomplete, the invoice listing and
+checkout. They issue the same statements as models.Product and models.Invoice
+(the SQL and validation helpers are shared) through the aiomysql pool in
+async_database.py, and read and invalidate the same in-process caches and
+search index. When the async pool is not running (sqlite backend) each method
+runs its synchronous counterpart in a worker thread.
+"""
+
+import asyncio
+from datetime import datetime
+
+from async_database import (
+    async_connection,
+    async_pool_enabled,
+    AsyncDatabaseError,
+    AsyncIntegrityError,
+)
+from cache import MISSING
+from config import Config
+from money import rupees
+from rows import ProductRow
+import aiomysql
+import models
+from models import Product, Invoice, DailySales
+
+# Only one coroutine rebuilds a stale search index; the others wait for it.
+_index_reload_lock = asyncio.Lock()
+_low_stock_reload_lock = asyncio.Lock()
+
+
+class AsyncProduct:
+    """Async reads of the 'products' table."""
+
+    @staticmethod
+    async def get_all():
+        """Fetch all products (cached); see Product.get_all."""
+        if not async_pool_enabled():
+            return await asyncio.to_thread(Product.get_all)
+        cached = models._product_lists.get(("all",))
+        if cached is not MISSING:
+            return list(cached)
+        try:
+            async with async_connection() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(models._PRODUCT_SELECT + " ORDER BY product_name ASC")
+                    products = list(map(ProductRow._make, await cursor.fetchall()))
+        except (AsyncDatabaseError, asyncio.TimeoutError) as e:
+            print(f"Error fetching products: {e}")
+            return []
+        models._product_lists.set(("all",), products)
+        return list(products)
+
+    @staticmethod
+    async def get_by_ids(product_ids):
+        """Fetch several products by ID with at most one query; see Product.get_by_ids."""
+        if not async_pool_enabled():
+            return await asyncio.to_thread(Product.get_by_ids, product_ids)
+        found = {}
+        missing = []
+        for product_id in {int(pid) for pid in product_ids}:
+            cached = models._products_by_id.get(product_id)
+            if cached is not MISSING:
+                found[product_id] = cached
+            else:
+                missing.append(product_id)
+        if not missing:
+            return found
+        placeholders = ", ".join(["%s"] * len(missing))
+        try:
+            async with async_connection() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(
+                        models._PRODUCT_SELECT + f" WHERE product_id IN ({placeholders})",
+                        tuple(missing),
+                    )
+                    rows = await cursor.fetchall()
+        except (AsyncDatabaseError, asyncio.TimeoutError) as e:
+            print(f"Error fetching products by ID: {e}")
+            return found
+        for product in map(ProductRow._make, rows):
+            models._products_by_id.set(product.product_id, product)
+            found[product.product_id] = product
+        return found
+
+    @staticmethod
+    async def search_names(search_term, limit=10, include_inactive=False):
+        """Return ranked autocomplete matches; see Product.search_names."""
+        index = models._search_index
+        if index.is_stale(Config.SEARCH_INDEX_REFRESH):
+            async with _index_reload_lock:
+                if index.is_stale(Config.SEARCH_INDEX_REFRESH):
+                    index.load(await AsyncProduct.get_all())
+        return [
+            {"product_id": product_id, "product_name": product_name}
+            for product_id, product_name in index.search(
+                search_term, limit=limit, include_inactive=include_inactive
+            )
+        ]
+
+    @staticmethod
+    async def refresh_low_stock():
+        """Reload the low-stock index if it is stale; see models._refresh_low_stock."""
+        index = models._low_stock
+        if not index.is_stale(Config.LOW_STOCK_REFRESH):
+            return
+        async with _low_stock_reload_lock:
+            if not index.is_stale(Config.LOW_STOCK_REFRESH):
+                return
+            try:
+                async with async_connection() as conn:
+                    async with conn.cursor() as cursor:
+                        await cursor.execute(models._REORDER_LEVELS_SQL)
+                        models._load_low_stock(await cursor.fetchall())
+            except (AsyncDatabaseError, asyncio.TimeoutError) as e:
+                print(f"Error loading reorder levels: {e}")
+
+
+class AsyncInvoice:
+    """Async invoice listing and checkout."""
+
+    @staticmethod
+    async def get_all(
+        start_date=None,
+        end_date=None,
+        customer_name=None,
+        page_size=50,
+        cursor=None,
+        direction="next",
+    ):
+        """Fetch one keyset-paginated page of invoices; see Invoice.get_all."""
+        if not async_pool_enabled():
+            return await asyncio.to_thread(
+                Invoice.get_all,
+                start_date,
+                end_date,
+                customer_name,
+                page_size=page_size,
+                cursor=cursor,
+                direction=direction,
+            )
+        conditions, params = models._invoice_filters(start_date, end_date, customer_name)
+        sql, page_params, position, backwards = models._invoice_page_query(
+            conditions, params, page_size, cursor, direction
+        )
+        try:
+            async with async_connection() as conn:
+                async with conn.cursor() as db_cursor:
+                    await db_cursor.execute(sql, page_params)
+                    rows = list(await db_cursor.fetchall())
+        except (AsyncDatabaseError, asyncio.TimeoutError) as e:
+            print(f"Error fetching invoices: {e}")
+            return {
+                "invoices": [],
+                "next_cursor": None,
+                "prev_cursor": None,
+                "total_estimate": None,
+            }
+        invoices, next_cursor, prev_cursor = models._invoice_page(
+            rows, page_size, position, backwards
+        )
+        return {
+            "invoices": invoices,
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+            "total_estimate": None,
+        }
+
+    @staticmethod
+    async def get_many(invoice_ids):
+        """Fetch several invoices and their items with two queries; see Invoice.get_many."""
+        if not async_pool_enabled():
+            return await asyncio.to_thread(Invoice.get_many, invoice_ids)
+        invoice_ids = sorted({int(invoice_id) for invoice_id in invoice_ids})
+        if not invoice_ids:
+            return {}
+        (header_sql, params), (items_sql, _) = models._invoice_batch_queries(invoice_ids)
+        try:
+            async with async_connection() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(header_sql, params)
+                    headers = list(await cursor.fetchall())
+                    if not headers:
+                        return {}
+                    await cursor.execute(items_sql, params)
+                    items = await cursor.fetchall()
+        except (AsyncDatabaseError, asyncio.TimeoutError) as e:
+            print(f"Error fetching invoices by ID: {e}")
+            return {}
+        return models._group_invoice_items(headers, items)
+
+    @staticmethod
+    async def get_by_idempotency_key(idempotency_key):
+        """Look up the invoice created under an Idempotency-Key; see Invoice."""
+        if not async_pool_enabled():
+            return await asyncio.to_thread(Invoice.get_by_idempotency_key, idempotency_key)
+        try:
+            async with async_connection() as conn:
+                async with conn.cursor(aiomysql.DictCursor) as cursor:
+                    await cursor.execute(models._IDEMPOTENCY_LOOKUP_SQL, (idempotency_key,))
+                    return await cursor.fetchone()
+        except (AsyncDatabaseError, asyncio.TimeoutError) as e:
+            print(f"Error fetching idempotency key: {e}")
+            return None
+
+    @staticmethod
+    async def save(invoice, idempotency_key=None, request_hash=None):
+        """
+        Save ``invoice`` (a models.Invoice) in one transaction; see Invoice.save.
+
+        Set ``invoice.invoice_id``, ``replayed``, ``idempotency_conflict`` and
+        ``stock_error`` the same way and return the invoice_id, or None on failure.
+        """
+        if not async_pool_enabled():
+            return await asyncio.to_thread(invoice.save, idempotency_key, request_hash)
+        # Reload before the sale rather than after, so that its stock change is
+        # applied to the index exactly once.
+        await AsyncProduct.refresh_low_stock()
+        try:
+            async with async_connection() as conn:
+                async with conn.cursor(aiomysql.DictCursor) as cursor:
+                    return await AsyncInvoice._save(
+                        conn, cursor, invoice, idempotency_key, request_hash
+                    )
+        except asyncio.TimeoutError:
+            print("Error saving invoice: no database connection available")
+            invoice.invoice_id = None
+            return None
+
+    @staticmethod
+    async def _save(conn, cursor, invoice, idempotency_key, request_hash):
+        try:
+            await conn.begin()
+            quantities, revenues, line_counts = models._aggregate_invoice_lines(invoice.items)
+
+            await cursor.execute(
+                models._INSERT_INVOICE_SQL,
+                (invoice.customer_name, rupees(invoice.grand_total_paise), invoice.invoice_date),
+            )
+            invoice.invoice_id = cursor.lastrowid
+
+            if idempotency_key:
+                try:
+                    await cursor.execute(
+                        models._INSERT_IDEMPOTENCY_KEY_SQL,
+                        (idempotency_key, request_hash, invoice.invoice_id, datetime.now()),
+                    )
+                except AsyncIntegrityError:
+                    await conn.rollback()
+                    invoice.invoice_id = None
+                    await cursor.execute(models._IDEMPOTENCY_LOOKUP_SQL, (idempotency_key,))
+                    existing = await cursor.fetchone()
+                    if existing and (
+                        request_hash is None or existing["request_hash"] == request_hash
+                    ):
+                        invoice.invoice_id = existing["invoice_id"]
+                        invoice.replayed = True
+                        return invoice.invoice_id
+                    invoice.idempotency_conflict = True
+                    print(f"Idempotency key '{idempotency_key}' reused for a different request.")
+                    return None
+
+            await cursor.execute(*models._take_stock(quantities))
+            if cursor.rowcount != len(quantities):
+                await cursor.execute(models._stock_rows_sql(len(quantities)), tuple(quantities))
+                products = {row["product_id"]: row for row in await cursor.fetchall()}
+                models._check_stock(quantities, products)
+
+            await cursor.executemany(
+                models._INSERT_INVOICE_ITEM_SQL,
+                models._invoice_item_rows(invoice.invoice_id, invoice.items),
+            )
+            await cursor.executemany(
+                DailySales.RECORD_SQL,
+                DailySales.record_rows(
+                    invoice.invoice_date.date(),
+                    models._daily_sales_rows(quantities, revenues, line_counts),
+                ),
+            )
+
+            await conn.commit()
+        except ValueError as ve:
+            print(f"Stock/Product status error: {ve}")
+            await conn.rollback()
+            invoice.invoice_id = None
+            invoice.stock_error = str(ve)
+            return None
+        except AsyncDatabaseError as e:
+            print(f"Error saving invoice: {e}")
+            await conn.rollback()
+            invoice.invoice_id = None
+            return None
+        except Exception as e:
+            print(f"An unexpected error occurred during invoice saving: {e}")
+            await conn.rollback()
+            invoice.invoice_id = None
+            return None
+        # The post-commit bookkeeping may reload the low-stock index through the
+        # blocking driver, so it runs in a worker thread, off the event loop.
+        await asyncio.to_thread(models._sale_committed, invoice.invoice_id, quantities, {})
+        print(
+            f"Invoice {invoice.invoice_id} saved successfully! Grand Total: "
+            f"{rupees(invoice.grand_total_paise)}"
+        )
+        return invoice.invoice_id
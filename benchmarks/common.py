@@ -0,0 +1,102 @@
+"""
+Shared helpers for the benchmark scripts: timing, percentiles and JSON output.
+
+Every script prints (or writes with --output) one JSON document with the same
+``meta`` block, so results from two commits can be diffed directly.
+"""
+
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+# Words used to build realistic, searchable product names.
+PRODUCT_WORDS = [
+    "basmati", "sona", "masoori", "rice", "toor", "moong", "urad", "chana", "dal",
+    "wheat", "atta", "maida", "rava", "sugar", "jaggery", "salt", "groundnut", "oil",
+    "sunflower", "sesame", "mustard", "cumin", "coriander", "chilli", "turmeric",
+    "tamarind", "pepper", "cardamom", "clove", "cashew", "almond", "raisin", "tea",
+    "coffee", "poha", "sabudana", "ragi", "jowar", "bajra", "besan", "ghee", "garlic",
+    "onion", "potato", "tomato", "premium", "organic", "classic", "select", "fresh",
+]  # fmt: skip
+
+
+def percentile(sorted_samples, fraction):
+    """Return the nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_samples)) - 1, 0)
+    return sorted_samples[min(rank, len(sorted_samples) - 1)]
+
+
+def summarize(samples, wall_seconds=None, errors=0):
+    """
+    Summarize latency samples (seconds) as milliseconds.
+
+    Throughput is computed over ``wall_seconds`` when given (concurrent runs),
+    otherwise over the summed sample time (sequential runs).
+    """
+    ordered = sorted(samples)
+    total = sum(ordered)
+    elapsed = wall_seconds if wall_seconds is not None else total
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "mean_ms": round(1000 * total / len(ordered), 3) if ordered else 0.0,
+        "p50_ms": round(1000 * percentile(ordered, 0.50), 3),
+        "p95_ms": round(1000 * percentile(ordered, 0.95), 3),
+        "p99_ms": round(1000 * percentile(ordered, 0.99), 3),
+        "max_ms": round(1000 * ordered[-1], 3) if ordered else 0.0,
+        "throughput_per_s": round(len(ordered) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def time_calls(func, iterations, warmup=0):
+    """Call ``func()`` ``warmup`` + ``iterations`` times; return the timed samples."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def run_metadata():
+    """Describe the environment a benchmark ran in."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "git_commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def emit(name, results, output=None, **params):
+    """Print the benchmark document, or write it to ``output``."""
+    document = {"benchmark": name, "meta": run_metadata(), "params": params, "results": results}
+    text = json.dumps(document, indent=2, default=str)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
@@ -0,0 +1,198 @@
+"""
+Benchmark database round trips and latency of Invoice.save per cart size.
+
+Run against a development database (configured in config.py); it creates
+throw-away products and invoices and removes them again, together with their
+rollup rows. Their stock movements are not logged.
+
+    python benchmarks/invoice_round_trips.py --sizes 1 10 30 --repeat 5 --output trips.json
+
+Report, for each cart size, the number of connections checked out, statements
+sent (round trips) and the save latency.
+"""
+
+import argparse
+import random
+import time
+import uuid
+
+from common import emit, summarize
+
+import database
+import models
+from models import Product, Invoice
+from money import to_paise, sale_line, cart_total
+
+
+class _CountingCursor:
+    """Cursor proxy that counts statements sent to the server."""
+
+    def __init__(self, cursor, counters):
+        """Wrap ``cursor`` and record into ``counters``."""
+        self._cursor = cursor
+        self._counters = counters
+
+    def execute(self, *args, **kwargs):
+        """Count and forward a single statement."""
+        self._counters["round_trips"] += 1
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        """Count and forward a batched statement (one multi-row INSERT)."""
+        self._counters["round_trips"] += 1
+        return self._cursor.executemany(*args, **kwargs)
+
+    def __getattr__(self, name):
+        """Delegate everything else to the real cursor."""
+        return getattr(self._cursor, name)
+
+
+class _CountingConnection:
+    """Connection proxy that counts checkouts and transaction statements."""
+
+    def __init__(self, conn, counters):
+        """Wrap ``conn`` and record into ``counters``."""
+        self.raw = conn
+        self._counters = counters
+
+    def cursor(self, *args, **kwargs):
+        """Return a counting cursor."""
+        return _CountingCursor(self.raw.cursor(*args, **kwargs), self._counters)
+
+    def start_transaction(self, *args, **kwargs):
+        """Count and forward START TRANSACTION."""
+        self._counters["round_trips"] += 1
+        return self.raw.start_transaction(*args, **kwargs)
+
+    def commit(self):
+        """Count and forward COMMIT."""
+        self._counters["round_trips"] += 1
+        return self.raw.commit()
+
+    def rollback(self):
+        """Count and forward ROLLBACK."""
+        self._counters["round_trips"] += 1
+        return self.raw.rollback()
+
+    def __getattr__(self, name):
+        """Delegate everything else to the real connection."""
+        return getattr(self.raw, name)
+
+
+def _install_counters(counters):
+    """Route the model layer's connections through the counting proxies."""
+
+    def get_db_connection():
+        conn = database.get_db_connection()
+        if not conn:
+            return None
+        counters["connections"] += 1
+        return _CountingConnection(conn, counters)
+
+    def close_db_connection(conn, cursor):
+        database.close_db_connection(getattr(conn, "raw", conn), cursor)
+
+    models.get_db_connection = get_db_connection
+    models.close_db_connection = close_db_connection
+
+
+def _seed_products(count, tag):
+    """Create ``count`` throw-away products with plenty of stock; return their rows."""
+    rows = []
+    for i in range(count):
+        product = Product(
+            product_name=f"bench-{tag}-{i:04d}",
+            quantity_available=1_000_000,
+            unit_price=10.0 + i,
+            is_active=1,
+        )
+        if not product.save():
+            raise SystemExit("Could not seed benchmark products; check config.py.")
+        rows.append(product)
+    return rows
+
+
+def _cleanup(products, invoice_ids):
+    """
+    Remove the invoices and products created by this run, and the rows referring to them.
+
+    Invoice items and idempotency keys go with their invoices (ON DELETE CASCADE).
+    """
+    conn = database.get_db_connection()
+    cursor = conn.cursor()
+    try:
+        for table, column, ids in (
+            ("invoices", "invoice_id", invoice_ids),
+            ("daily_product_sales", "product_id", [p.product_id for p in products]),
+            ("stock_reservations", "product_id", [p.product_id for p in products]),
+            ("products", "product_id", [p.product_id for p in products]),
+        ):
+            if ids:
+                placeholders = ", ".join(["%s"] * len(ids))
+                cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({placeholders})", ids)
+        conn.commit()
+    finally:
+        database.close_db_connection(conn, cursor)
+
+
+def main():
+    """Run the benchmark and print JSON results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 5, 10, 30])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    models._stock_log.path = None  # Leave no movements of throw-away products in the log
+    tag = uuid.uuid4().hex[:8]
+    products = _seed_products(max(args.sizes), tag)
+    counters = {"connections": 0, "round_trips": 0}
+    _install_counters(counters)
+
+    results = []
+    invoice_ids = []
+    try:
+        for size in args.sizes:
+            items = [
+                sale_line(
+                    p.product_id, p.product_name, to_paise(p.unit_price), rng.randint(100, 5000)
+                )
+                for p in products[:size]
+            ]
+            grand_total = cart_total(items)
+            elapsed = []
+            for _ in range(args.repeat):
+                counters.update(connections=0, round_trips=0)
+                started = time.perf_counter()
+                invoice_id = Invoice(
+                    customer_name=f"bench-{tag}", grand_total_paise=grand_total, items=items
+                ).save()
+                elapsed.append(time.perf_counter() - started)
+                if not invoice_id:
+                    raise SystemExit("Invoice.save failed during the benchmark.")
+                invoice_ids.append(invoice_id)
+            results.append(
+                {
+                    "cart_size": size,
+                    "connections": counters["connections"],
+                    "round_trips": counters["round_trips"],
+                    **summarize(elapsed),
+                }
+            )
+    finally:
+        _cleanup(products, invoice_ids)
+
+    emit(
+        "invoice_save_round_trips",
+        results,
+        output=args.output,
+        sizes=args.sizes,
+        repeat=args.repeat,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
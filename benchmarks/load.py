@@ -0,0 +1,158 @@
+"""
+Concurrent HTTP load generator for the Flask routes.
+
+Start the app against a seeded database, then:
+
+    python benchmarks/load.py --base-url http://127.0.0.1:5000 --concurrency 16 --duration 30
+
+Each worker has its own cookie jar (so its own cart) and repeatedly picks a
+scenario by weight: browse /products, autocomplete via /api/products/search,
+list /invoices, or sell through /invoice/create (add to cart, then checkout).
+Report latency percentiles and throughput per route and overall.
+"""
+
+import argparse
+import http.cookiejar
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+
+from common import PRODUCT_WORDS, emit, summarize
+
+SCENARIOS = {
+    "search": 60,
+    "invoices": 15,
+    "products": 5,
+    "checkout": 20,
+}
+
+
+class Worker(threading.Thread):
+    """One simulated till/browser issuing requests until the deadline."""
+
+    def __init__(self, base_url, deadline, seed, samples, errors, lock):
+        """Prepare a worker with its own session cookies."""
+        super().__init__(daemon=True)
+        self.base_url = base_url.rstrip("/")
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+        self.samples = samples
+        self.errors = errors
+        self.lock = lock
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def _request(self, label, path, form=None):
+        data = urllib.parse.urlencode(form).encode() if form is not None else None
+        started = time.perf_counter()
+        try:
+            with self.opener.open(self.base_url + path, data=data, timeout=30) as response:
+                body = response.read()
+            ok = True
+        except (urllib.error.URLError, OSError):
+            body, ok = b"", False
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            if ok:
+                self.samples[label].append(elapsed)
+            else:
+                self.errors[label] += 1
+        return body if ok else None
+
+    def _search(self):
+        term = self.rng.choice(PRODUCT_WORDS)[: self.rng.randint(3, 5)]
+        body = self._request(
+            "GET /api/products/search", "/api/products/search?query=" + urllib.parse.quote(term)
+        )
+        return json.loads(body) if body else []
+
+    def _checkout(self):
+        suggestions = self._search()
+        if not suggestions:
+            return
+        for suggestion in self.rng.sample(suggestions, min(3, len(suggestions))):
+            self._request(
+                "POST /invoice/create [add_to_cart]",
+                "/invoice/create",
+                {
+                    "action": "add_to_cart",
+                    "product_search": suggestion["product_name"],
+                    "quantity_to_sell": "0.25",
+                },
+            )
+        self._request(
+            "POST /invoice/create [checkout]",
+            "/invoice/create",
+            {"action": "checkout", "customer_name": "Load Test"},
+        )
+
+    def run(self):
+        """Issue weighted scenarios until the deadline passes."""
+        names = list(SCENARIOS)
+        weights = [SCENARIOS[n] for n in names]
+        while time.monotonic() < self.deadline:
+            scenario = self.rng.choices(names, weights)[0]
+            if scenario == "search":
+                self._search()
+            elif scenario == "invoices":
+                self._request("GET /invoices", "/invoices")
+            elif scenario == "products":
+                self._request("GET /products", "/products")
+            else:
+                self._checkout()
+
+
+def main():
+    """Run the load test and emit one JSON document."""
+    parser = argparse.ArgumentParser(description="Concurrent HTTP load generator.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds")
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    started = time.perf_counter()
+    deadline = time.monotonic() + args.duration
+    workers = [
+        Worker(args.base_url, deadline, args.seed + i, samples, errors, lock)
+        for i in range(args.concurrency)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    wall = time.perf_counter() - started
+
+    results = {
+        label: summarize(samples[label], wall_seconds=wall, errors=errors[label])
+        for label in sorted(set(samples) | set(errors))
+    }
+    results["overall"] = summarize(
+        [s for values in samples.values() for s in values],
+        wall_seconds=wall,
+        errors=sum(errors.values()),
+    )
+    emit(
+        "load",
+        results,
+        output=args.output,
+        base_url=args.base_url,
+        concurrency=args.concurrency,
+        duration=args.duration,
+        seed=args.seed,
+        scenarios=SCENARIOS,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark of low-stock tracking (low_stock.py) against rescanning the products.
+
+    python benchmarks/low_stock.py --products 50000 --output low_stock.json
+
+Needs no database; alerts go to a sink that discards them. Reports:
+
+- ``load``: building the index from every product's reorder level and stock;
+- ``apply``: what a checkout pays to re-check the products of a five-line sale;
+- ``low``: listing the products at or below their reorder level from the index;
+- ``low_page``: the first 50 of them (``/api/stock/low?limit=50``);
+- ``rescan``: the same full listing by checking every product in memory, a
+  lower bound for the query it replaces.
+"""
+
+import argparse
+import random
+import time
+
+from common import emit, summarize, time_calls
+
+from low_stock import AlertSink, LowStockIndex
+from money import kgs
+
+LINES_PER_SALE = 5
+
+
+class _DiscardSink(AlertSink):
+    def deliver(self, events):
+        pass
+
+
+def main():
+    """Run the low-stock benchmark and emit one JSON document."""
+    parser = argparse.ArgumentParser(description="Low-stock index versus rescanning products.")
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--low-percent", type=float, default=2.0)
+    parser.add_argument("--sales", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = []
+    for product_id in range(1, args.products + 1):
+        reorder = rng.randint(1, 50) * 1000
+        low = rng.random() * 100 < args.low_percent
+        grams = rng.randint(0, reorder) if low else reorder + rng.randint(1, 500000)
+        rows.append((product_id, f"product {product_id}", grams, reorder, True))
+
+    results = {}
+    index = LowStockIndex(_DiscardSink("discard", flush_interval=3600))
+    started = time.perf_counter()
+    index.load(rows)
+    results["load"] = {"seconds": round(time.perf_counter() - started, 3)}
+
+    sales = iter(
+        [
+            {rng.randint(1, args.products): -rng.randint(1, 2000) for _ in range(LINES_PER_SALE)}
+            for _ in range(args.sales)
+        ]
+    )
+    results["apply"] = summarize(time_calls(lambda: index.apply(next(sales)), args.sales))
+    results["low"] = summarize(time_calls(index.low, 200))
+    results["low"]["products"] = len(index.low())
+    results["low_page"] = summarize(time_calls(lambda: index.low(50), 200))
+
+    stock = {product_id: [name, grams, reorder] for product_id, name, grams, reorder, _ in rows}
+
+    def rescan():
+        return [
+            {
+                "product_id": product_id,
+                "product_name": name,
+                "quantity_available": kgs(grams),
+                "reorder_level": kgs(reorder),
+            }
+            for product_id, (name, grams, reorder) in stock.items()
+            if grams <= reorder
+        ]
+
+    results["rescan"] = summarize(time_calls(rescan, 200))
+
+    emit(
+        "low_stock",
+        results,
+        output=args.output,
+        products=args.products,
+        low_percent=args.low_percent,
+        sales=args.sales,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Microbenchmarks of the model layer against the configured (seeded) database.
+
+    python benchmarks/micro.py --iterations 200 --output micro.json
+
+Measure Product.get_by_name_like (uncached and cached), Product.search_names,
+Invoice.save, Invoice.get_all (first page, a deep page and a one-month filter)
+and Invoice.get_by_id. Run benchmarks/seed.py first; Invoice.save writes real
+invoices, so use a throw-away database.
+"""
+
+import argparse
+import random
+from datetime import date, timedelta
+
+from common import PRODUCT_WORDS, emit, summarize, time_calls
+
+import models
+from models import Product, Invoice
+from money import to_paise, sale_line, cart_total
+
+
+def main():
+    """Run every microbenchmark and emit one JSON document."""
+    parser = argparse.ArgumentParser(description="Model-layer microbenchmarks.")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--cart-size", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    terms = [rng.choice(PRODUCT_WORDS)[:4] for _ in range(64)]
+    results = {}
+
+    def name_like_uncached():
+        models._invalidate_product_cache()
+        Product.get_by_name_like(rng.choice(terms))
+
+    results["Product.get_by_name_like[uncached]"] = summarize(
+        time_calls(name_like_uncached, args.iterations, args.warmup)
+    )
+    results["Product.get_by_name_like[cached]"] = summarize(
+        time_calls(lambda: Product.get_by_name_like(rng.choice(terms)), args.iterations, 64)
+    )
+    results["Product.search_names"] = summarize(
+        time_calls(lambda: Product.search_names(rng.choice(terms)), args.iterations, 1)
+    )
+
+    catalog = [p for p in Product.get_all() if p["is_active"] == 1]
+
+    def save_invoice():
+        lines = [
+            sale_line(
+                product["product_id"], product["product_name"], to_paise(product["unit_price"]), 500
+            )
+            for product in rng.sample(catalog, args.cart_size)
+        ]
+        total = cart_total(lines)
+        if not Invoice(customer_name="Benchmark", grand_total_paise=total, items=lines).save():
+            raise SystemExit("Invoice.save failed during the benchmark.")
+
+    results[f"Invoice.save[{args.cart_size} lines]"] = summarize(
+        time_calls(save_invoice, args.iterations, args.warmup)
+    )
+
+    results["Invoice.get_all[first page]"] = summarize(
+        time_calls(lambda: Invoice.get_all(page_size=50), args.iterations, args.warmup)
+    )
+    deep_cursor = None
+    page = Invoice.get_all(page_size=500)
+    for _ in range(20):
+        if not page["next_cursor"]:
+            break
+        deep_cursor = page["next_cursor"]
+        page = Invoice.get_all(page_size=500, cursor=deep_cursor)
+    results["Invoice.get_all[page ~10k deep]"] = summarize(
+        time_calls(
+            lambda: Invoice.get_all(page_size=50, cursor=deep_cursor),
+            args.iterations,
+            args.warmup,
+        )
+    )
+    month_start = (date.today() - timedelta(days=60)).isoformat()
+    month_end = (date.today() - timedelta(days=30)).isoformat()
+    results["Invoice.get_all[one month, unpaginated]"] = summarize(
+        time_calls(
+            lambda: Invoice.get_all(start_date=month_start, end_date=month_end),
+            max(args.iterations // 10, 1),
+            1,
+        )
+    )
+
+    month = Invoice.get_all(start_date=month_start, end_date=month_end)
+    if not month:
+        raise SystemExit("No invoices found; run benchmarks/seed.py first.")
+    id_iter = iter(rng.choice(month)["invoice_id"] for _ in range(args.iterations + args.warmup))
+    results["Invoice.get_by_id"] = summarize(
+        time_calls(lambda: Invoice.get_by_id(next(id_iter)), args.iterations, args.warmup)
+    )
+
+    emit(
+        "micro",
+        results,
+        output=args.output,
+        iterations=args.iterations,
+        warmup=args.warmup,
+        cart_size=args.cart_size,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark of row objects: dictionary rows versus rows.ProductRow/InvoiceRow/InvoiceItemRow.
+
+    python benchmarks/rows_memory.py --rows 100000 --output rows_memory.json
+
+Needs no database. Builds ``--rows`` rows of each kind from the tuples a
+cursor returns, once as dictionaries (what a dictionary cursor makes) and once
+as row objects, and reports the memory they hold (tracemalloc, excluding the
+column values themselves, which both share), the time taken to build them and
+the time taken to read every column of every row by name (``row["unit_price"]``).
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from common import emit
+
+from rows import ProductRow, InvoiceRow, InvoiceItemRow
+
+
+def _product_tuples(rng, count):
+    now = datetime.now()
+    return [
+        (
+            product_id,
+            f"product {product_id}",
+            Decimal(rng.randint(0, 500000)).scaleb(-3),
+            Decimal(rng.randint(500, 250000)).scaleb(-2),
+            now - timedelta(minutes=product_id),
+            1,
+        )
+        for product_id in range(1, count + 1)
+    ]
+
+
+def _invoice_tuples(rng, count):
+    now = datetime.now()
+    return [
+        (
+            invoice_id,
+            now - timedelta(minutes=invoice_id),
+            f"customer {invoice_id % 997}",
+            Decimal(rng.randint(500, 2500000)).scaleb(-2),
+            rng.randint(1, 20),
+        )
+        for invoice_id in range(1, count + 1)
+    ]
+
+
+def _item_tuples(rng, count):
+    return [
+        (
+            item_id // 5 + 1,
+            item_id,
+            rng.randint(1, 5000),
+            Decimal(rng.randint(1, 25000)).scaleb(-3),
+            Decimal(rng.randint(500, 250000)).scaleb(-2),
+            Decimal(rng.randint(500, 2500000)).scaleb(-2),
+            f"product {item_id % 5000}",
+        )
+        for item_id in range(1, count + 1)
+    ]
+
+
+def _measure(build, tuples):
+    """Return (bytes held by the built rows, seconds taken to build them untraced)."""
+    started = time.perf_counter()
+    build(tuples)
+    seconds = time.perf_counter() - started
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = build(tuples)
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del built
+    return held, seconds
+
+
+def _read_by_name(rows, columns):
+    """Return the seconds taken to read every column of every row by name."""
+    started = time.perf_counter()
+    for row in rows:
+        for column in columns:
+            row[column]
+    return time.perf_counter() - started
+
+
+def main():
+    """Run the row memory benchmark and emit one JSON document."""
+    parser = argparse.ArgumentParser(description="Row objects: dictionaries versus named rows.")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    kinds = {
+        "products": (ProductRow, lambda rows: list(map(ProductRow._make, rows)), _product_tuples),
+        "invoices": (InvoiceRow, lambda rows: [InvoiceRow(*row) for row in rows], _invoice_tuples),
+        "invoice_items": (
+            InvoiceItemRow,
+            lambda rows: list(map(InvoiceItemRow._make, rows)),
+            _item_tuples,
+        ),
+    }
+    results = {}
+    for kind, (row_type, build_rows, make_tuples) in kinds.items():
+        tuples = make_tuples(rng, args.rows)
+        columns = row_type._fields[: len(tuples[0])]
+        dict_bytes, dict_seconds = _measure(
+            lambda rows: [dict(zip(columns, row)) for row in rows], tuples
+        )
+        row_bytes, row_seconds = _measure(build_rows, tuples)
+        dict_read = _read_by_name([dict(zip(columns, row)) for row in tuples], columns)
+        row_read = _read_by_name(build_rows(tuples), columns)
+        results[kind] = {
+            "dict_mb": round(dict_bytes / 2**20, 2),
+            "row_mb": round(row_bytes / 2**20, 2),
+            "saved_percent": round(100 * (1 - row_bytes / dict_bytes), 1),
+            "dict_build_ms": round(1000 * dict_seconds, 1),
+            "row_build_ms": round(1000 * row_seconds, 1),
+            "dict_read_ms": round(1000 * dict_read, 1),
+            "row_read_ms": round(1000 * row_read, 1),
+        }
+
+    emit("rows_memory", results, output=args.output, rows=args.rows, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Seed a benchmark database with a realistic catalog and invoice history.
+
+Point config.py at a THROW-AWAY database, create its tables with the
+migrations (see migrations/), then:
+
+    python migrate.py up
+    python benchmarks/seed.py --products 50000 --invoice-lines 1000000
+
+The data is generated from a fixed random seed, so two runs with the same
+arguments produce the same catalog and history. Invoices are spread over the
+last --days days and the daily sales rollups are rebuilt at the end.
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from common import PRODUCT_WORDS, emit
+
+from database import get_db_connection, close_db_connection
+from models import DailySales
+
+FIRST_NAMES = ["Ravi", "Lakshmi", "Suresh", "Padma", "Venkat", "Anitha", "Prasad", "Sirisha"]
+LAST_NAMES = ["Reddy", "Rao", "Naidu", "Kumar", "Sharma", "Varma", "Chowdary", "Devi"]
+
+
+def seed_products(cursor, conn, rng, count, chunk_size):
+    """Insert ``count`` products with unique, word-based names."""
+    rows = []
+    now = datetime.now()
+    for i in range(count):
+        words = rng.sample(PRODUCT_WORDS, 3)
+        name = f"{' '.join(words)} {i:05d}"
+        price = round(rng.uniform(20, 800), 2)
+        rows.append((name, 1_000_000.0, price, now, 1 if rng.random() > 0.05 else 0))
+    for start in range(0, len(rows), chunk_size):
+        end = start + chunk_size
+        cursor.executemany(
+            "INSERT INTO products (product_name, quantity_available, unit_price, "
+            "last_updated, is_active) VALUES (%s, %s, %s, %s, %s)",
+            rows[start:end],
+        )
+        conn.commit()
+
+
+def seed_invoices(cursor, conn, rng, line_count, days, chunk_invoices):
+    """Insert invoices averaging five lines each until ``line_count`` lines exist."""
+    cursor.execute("SELECT product_id, unit_price FROM products WHERE is_active = 1")
+    catalog = [(pid, float(price)) for pid, price in cursor.fetchall()]
+    cursor.execute("SELECT COALESCE(MAX(invoice_id), 0) FROM invoices")
+    next_id = cursor.fetchone()[0] + 1
+    end = datetime.now()
+    span = days * 24 * 3600
+
+    written = 0
+    while written < line_count:
+        invoices, items = [], []
+        for _ in range(chunk_invoices):
+            if written >= line_count:
+                break
+            invoice_id = next_id
+            next_id += 1
+            lines = min(rng.randint(1, 9), line_count - written)
+            total = 0.0
+            for product_id, price in rng.sample(catalog, lines):
+                quantity = round(rng.uniform(0.25, 10), 3)
+                item_total = round(quantity * price, 2)
+                total += item_total
+                items.append((invoice_id, product_id, quantity, price, item_total))
+            customer = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            invoice_date = end - timedelta(seconds=rng.randint(0, span))
+            invoices.append((invoice_id, customer, round(total, 2), invoice_date))
+            written += lines
+        cursor.executemany(
+            "INSERT INTO invoices (invoice_id, customer_name, grand_total, invoice_date) "
+            "VALUES (%s, %s, %s, %s)",
+            invoices,
+        )
+        cursor.executemany(
+            "INSERT INTO invoice_items (invoice_id, product_id, quantity_sold, unit_price, "
+            "item_total) VALUES (%s, %s, %s, %s, %s)",
+            items,
+        )
+        conn.commit()
+    return written
+
+
+def main():
+    """Seed the configured database and report how long it took."""
+    parser = argparse.ArgumentParser(description="Seed a benchmark database.")
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--invoice-lines", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    conn = get_db_connection()
+    if not conn:
+        raise SystemExit("Could not connect to the database; check config.py.")
+    cursor = conn.cursor()
+    try:
+        started = time.perf_counter()
+        seed_products(cursor, conn, rng, args.products, chunk_size=5000)
+        products_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        lines = seed_invoices(cursor, conn, rng, args.invoice_lines, args.days, 2000)
+        invoices_seconds = time.perf_counter() - started
+    finally:
+        close_db_connection(conn, cursor)
+
+    started = time.perf_counter()
+    DailySales.backfill()
+    rollup_seconds = time.perf_counter() - started
+
+    emit(
+        "seed",
+        {
+            "products_seconds": round(products_seconds, 2),
+            "invoice_lines": lines,
+            "invoices_seconds": round(invoices_seconds, 2),
+            "rollup_backfill_seconds": round(rollup_seconds, 2),
+        },
+        output=args.output,
+        products=args.products,
+        invoice_lines=args.invoice_lines,
+        days=args.days,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
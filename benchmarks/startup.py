@@ -0,0 +1,90 @@
+"""
+Benchmark of process startup: import times and time to first response.
+
+    python benchmarks/startup.py --runs 10 --output startup.json
+    DB_BACKEND=sqlite SQLITE_PATH=/tmp/bench.sqlite3 python benchmarks/startup.py
+
+Every sample is a fresh Python process, timed from outside, so interpreter
+start-up is included (``python`` reports it alone). Settings come from
+config.py and the environment, as for the app itself. Reports:
+
+- ``import``: ``python -c "import <module>"`` for the app modules and CLI tools;
+- ``first_response``: building the app with create_app() and answering one GET
+  of ``--path`` through the test client, plus the app's own startup report
+  (instrumentation.StartupTimer) from the last run.
+
+A warm-up run first fills the template bytecode cache and, on the sqlite
+backend, creates the database; use a throw-away one.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from common import PROJECT_ROOT, emit, summarize
+
+MODULES = [
+    "config",
+    "database",
+    "models",
+    "app",
+    "migrate",
+    "export",
+    "movements",
+    "product_import",
+    "rollups",
+]
+
+FIRST_RESPONSE = """
+import json, sys
+from app import create_app
+app = create_app()
+response = app.test_client().get(sys.argv[1])
+print(json.dumps([response.status_code, app.extensions["startup"].report()]))
+"""
+
+
+def _run(code, *args):
+    """Run ``code`` in a fresh interpreter; return (seconds, stdout)."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", code, *args],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return time.perf_counter() - started, result.stdout
+
+
+def main():
+    """Run the startup benchmark and emit one JSON document."""
+    parser = argparse.ArgumentParser(description="Import time and time to first response.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--path", default="/products", help="Page requested by first_response")
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    _run(FIRST_RESPONSE, args.path)
+    results = {"import": {}}
+    results["python"] = summarize([_run("pass")[0] for _ in range(args.runs)])
+    for module in args.modules:
+        samples = [_run(f"import {module}")[0] for _ in range(args.runs)]
+        results["import"][module] = summarize(samples)
+
+    samples = []
+    for _ in range(args.runs):
+        seconds, stdout = _run(FIRST_RESPONSE, args.path)
+        samples.append(seconds)
+    status, report = json.loads(stdout.splitlines()[-1])
+    results["first_response"] = summarize(samples)
+    results["first_response"].update(status=status, startup=report)
+
+    emit("startup", results, output=args.output, runs=args.runs, path=args.path)
+
+
+if __name__ == "__main__":
+    main()
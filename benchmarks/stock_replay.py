@@ -0,0 +1,95 @@
+"""
+Benchmark of the stock movement log (stock_log.py): recording, indexing and replay.
+
+    python benchmarks/stock_replay.py --events 1000000 --output stock_replay.json
+
+Needs no database; the log is written to a temporary directory. Reports:
+
+- ``record``: what a checkout pays to log a five-line sale (queueing only);
+- ``flush``: writing everything queued in one batch, and the bytes per event;
+- ``index``: a fresh StockHistory reading the whole file;
+- ``refresh``: indexing one more batch of 500 events appended to a loaded log;
+- ``stock_at``: one "stock of product X at time T" query on the loaded index.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from common import emit, summarize, time_calls
+
+from stock_log import StockLog, StockHistory
+
+LINES_PER_SALE = 5
+
+
+def main():
+    """Run the stock log benchmark and emit one JSON document."""
+    parser = argparse.ArgumentParser(description="Stock movement log: record, index, replay.")
+    parser.add_argument("--events", type=int, default=1000000)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "stock_movements.log")
+        log = StockLog(path, flush_interval=3600, batch_size=args.events + 1)
+        sales = [
+            {rng.randint(1, args.products): -rng.randint(1, 25000) for _ in range(LINES_PER_SALE)}
+            for _ in range(args.events // LINES_PER_SALE)
+        ]
+        started_at = datetime.now()
+        next_sale = iter(sales)
+        results["record"] = summarize(
+            time_calls(lambda: log.record("sale", next(next_sale), 1), len(sales))
+        )
+        ended_at = datetime.now()
+
+        started = time.perf_counter()
+        written = log.flush()
+        results["flush"] = {
+            "events": written,
+            "seconds": round(time.perf_counter() - started, 3),
+            "bytes_per_event": round(os.path.getsize(path) / written, 2),
+        }
+
+        history = StockHistory(path)
+        started = time.perf_counter()
+        history.refresh()
+        results["index"] = {"seconds": round(time.perf_counter() - started, 3)}
+
+        def append_and_refresh():
+            for _ in range(500 // LINES_PER_SALE):
+                log.record("sale", {rng.randint(1, args.products): -1000}, 2)
+            log.flush()
+            history.refresh()
+
+        results["refresh"] = summarize(time_calls(append_and_refresh, 50))
+
+        span = (ended_at - started_at) / args.queries
+        moments = [started_at + span * rng.randint(0, args.queries) for _ in range(args.queries)]
+        queries = iter([(rng.randint(1, args.products), moment) for moment in moments])
+        results["stock_at"] = summarize(
+            time_calls(lambda: history.stock_at(*next(queries)), args.queries)
+        )
+
+    emit(
+        "stock_replay",
+        results,
+        output=args.output,
+        events=args.events,
+        products=args.products,
+        queries=args.queries,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Benchmark of the cart totals path: float rupees/kgs versus integer paise/grams.
+
+    python benchmarks/totals.py --cart-sizes 5 50 1000 --output totals.json
+
+Needs no database. For each cart size, time four stages over the same random
+carts (prices and quantities as they come from DECIMAL columns and forms):
+
+- ``convert_in``: turning the inputs into cart lines (float() versus
+  money.to_paise/to_grams and money.sale_line);
+- ``price_lines``: pricing every line of a cart (float multiply versus
+  money.line_total, which also rounds the line to whole paise, as
+  money.sale_line does for each cart and checkout line);
+- ``grand_total``: summing the stored line totals, done on every cart render
+  and at checkout (float sum versus money.cart_total);
+- ``convert_out``: building the invoice_items parameters (float() versus
+  money.rupees/kgs Decimals).
+
+``drift_carts`` counts carts whose float grand total, rounded to paise, differs
+from the sum of the line totals as the DECIMAL(10,2) columns store them.
+"""
+
+import argparse
+import random
+from decimal import Decimal
+
+from common import emit, summarize, time_calls
+
+from money import to_paise, to_grams, rupees, kgs, sale_line, line_total, cart_total
+
+
+def _float_lines(rows):
+    return [
+        {
+            "product_id": product_id,
+            "unit_price": float(price),
+            "quantity_sold": float(quantity),
+            "item_total": float(quantity) * float(price),
+        }
+        for product_id, price, quantity in rows
+    ]
+
+
+def _fixed_lines(rows):
+    return [
+        sale_line(product_id, None, to_paise(price), to_grams(quantity))
+        for product_id, price, quantity in rows
+    ]
+
+
+def _float_prices(columns):
+    quantities, prices = columns
+    return [quantity * price for quantity, price in zip(quantities, prices)]
+
+
+def _float_grand_total(lines):
+    return sum(line["item_total"] for line in lines)
+
+
+def _float_params(lines):
+    return [
+        (1, line["product_id"], line["quantity_sold"], line["unit_price"], line["item_total"])
+        for line in lines
+    ]
+
+
+def _fixed_params(lines):
+    return [
+        (
+            1,
+            line["product_id"],
+            kgs(line["quantity_grams"]),
+            rupees(line["unit_price_paise"]),
+            rupees(line["item_total_paise"]),
+        )
+        for line in lines
+    ]
+
+
+def _random_cart(rng, size):
+    """Return (product_id, unit_price Decimal, quantity str) rows like a real cart."""
+    return [
+        (
+            product_id,
+            Decimal(rng.randint(500, 250000)).scaleb(-2),
+            str(Decimal(rng.randint(1, 25000)).scaleb(-3)),
+        )
+        for product_id in range(1, size + 1)
+    ]
+
+
+def main():
+    """Run the totals benchmark and emit one JSON document."""
+    parser = argparse.ArgumentParser(description="Cart totals: float versus fixed point.")
+    parser.add_argument("--cart-sizes", type=int, nargs="+", default=[5, 50, 1000])
+    parser.add_argument("--carts", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = {}
+    for size in args.cart_sizes:
+        carts = [_random_cart(rng, size) for _ in range(args.carts)]
+        float_carts = [_float_lines(rows) for rows in carts]
+        fixed_carts = [_fixed_lines(rows) for rows in carts]
+        float_columns = [
+            ([line["quantity_sold"] for line in lines], [line["unit_price"] for line in lines])
+            for lines in float_carts
+        ]
+        fixed_columns = [
+            (
+                [line["quantity_grams"] for line in lines],
+                [line["unit_price_paise"] for line in lines],
+            )
+            for lines in fixed_carts
+        ]
+        stages = {
+            "convert_in": (_float_lines, _fixed_lines, carts, carts),
+            "price_lines": (
+                _float_prices,
+                lambda columns: [line_total(*line) for line in zip(*columns)],
+                float_columns,
+                fixed_columns,
+            ),
+            "grand_total": (_float_grand_total, cart_total, float_carts, fixed_carts),
+            "convert_out": (_float_params, _fixed_params, float_carts, fixed_carts),
+        }
+        for stage, (float_func, fixed_func, float_inputs, fixed_inputs) in stages.items():
+            for label, func, inputs in (
+                ("float", float_func, float_inputs),
+                ("fixed", fixed_func, fixed_inputs),
+            ):
+                cycle = iter(inputs * (args.iterations + args.warmup))
+                results[f"{stage}[{size} lines, {label}]"] = summarize(
+                    time_calls(lambda: func(next(cycle)), args.iterations, args.warmup)
+                )
+        results[f"drift_carts[{size} lines]"] = sum(
+            to_paise(_float_grand_total(float_lines))
+            != sum(to_paise(line["item_total"]) for line in float_lines)
+            for float_lines in float_carts
+        )
+
+    emit(
+        "totals",
+        results,
+        output=args.output,
+        cart_sizes=args.cart_sizes,
+        carts=args.carts,
+        iterations=args.iterations,
+        warmup=args.warmup,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
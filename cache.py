@@ -0,0 +1,86 @@
+"""
+In-process caching helpers for the Retail Invoice Management System.
+
+Provide a small thread-safe cache with per-entry time-to-live and
+least-recently-used eviction once the cache reaches its size limit. Caches of
+immutable data (e.g. rendered invoices) pass ``ttl=None`` so entries only leave
+by eviction.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+
+class TTLCache:
+    """A size-bounded LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        """Initialize an empty cache of at most ``maxsize`` entries; ``ttl=None`` never expires."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value), oldest first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=MISSING):
+        """
+        Return the cached value for ``key``.
+
+        Return ``default`` (the ``MISSING`` sentinel unless given) if the key is
+        absent or has expired.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store ``value`` under ``key``, evicting the least recently used entry if full."""
+        with self._lock:
+            expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        """Remove ``key`` from the cache if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Return hit/miss/eviction counters and the current size as a dictionary."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,217 @@
+"""
+Server-side shopping cart storage for the Retail Invoice Management System.
+
+The browser session only carries a short cart id; cart lines live in one of
+the backends below. Lines are keyed by product_id, so adding or removing an
+item is a single keyed operation and repeated adds of the same product are
+merged into one line. Carts untouched for longer than the configured TTL are
+expired.
+"""
+
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from money import sale_line
+
+
+def new_cart_id():
+    """Return a new random, URL-safe cart id."""
+    return secrets.token_urlsafe(12)
+
+
+class MemoryCartStore:
+    """
+    In-process cart store.
+
+    Carts are kept in least-recently-touched order, which makes both LRU
+    eviction (beyond ``max_carts``) and TTL expiry pop from the front.
+    """
+
+    def __init__(self, ttl, max_carts):
+        """Initialize an empty store."""
+        self.ttl = ttl
+        self.max_carts = max_carts
+        self._carts = OrderedDict()  # cart_id -> (last_touched, OrderedDict(product_id -> line))
+        self._lock = threading.Lock()
+
+    def _purge_expired(self, now):
+        while self._carts:
+            cart_id, (touched, _) = next(iter(self._carts.items()))
+            if now - touched <= self.ttl:
+                break
+            del self._carts[cart_id]
+
+    def _touch(self, cart_id, create=False):
+        now = time.monotonic()
+        self._purge_expired(now)
+        entry = self._carts.pop(cart_id, None)
+        if entry is None:
+            if not create:
+                return None
+            lines = OrderedDict()
+        else:
+            lines = entry[1]
+        self._carts[cart_id] = (now, lines)
+        while len(self._carts) > self.max_carts:
+            self._carts.popitem(last=False)
+        return lines
+
+    def get_items(self, cart_id):
+        """Return the cart's lines in the order they were first added."""
+        with self._lock:
+            lines = self._touch(cart_id)
+            return [dict(line) for line in lines.values()] if lines else []
+
+    def add_item(self, cart_id, product_id, product_name, unit_price_paise, quantity_grams):
+        """Add ``quantity_grams`` of a product, merging with an existing line; return the line."""
+        with self._lock:
+            lines = self._touch(cart_id, create=True)
+            existing = lines.get(product_id)
+            if existing:
+                quantity_grams += existing["quantity_grams"]
+            lines[product_id] = sale_line(
+                product_id, product_name, unit_price_paise, quantity_grams
+            )
+            return dict(lines[product_id])
+
+    def remove_item(self, cart_id, product_id):
+        """Remove a product's line from the cart; return it, or None if absent."""
+        with self._lock:
+            lines = self._touch(cart_id)
+            return lines.pop(product_id, None) if lines is not None else None
+
+    def delete(self, cart_id):
+        """Discard a whole cart (e.g. after checkout)."""
+        with self._lock:
+            self._carts.pop(cart_id, None)
+
+
+class SQLiteCartStore:
+    """
+    Cart store backed by a local SQLite file, shared by every worker process on the host.
+
+    Each thread gets its own connection; the database runs in WAL mode so
+    readers do not block the writer.
+    """
+
+    PURGE_INTERVAL = 60  # Seconds between sweeps for expired carts
+
+    def __init__(self, path, ttl):
+        """Open (and if needed create) the cart database at ``path``."""
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._last_purge = 0.0
+        conn = self._conn()
+        conn.executescript(
+            "PRAGMA journal_mode=WAL;"
+            "CREATE TABLE IF NOT EXISTS carts ("
+            " cart_id TEXT PRIMARY KEY, updated_at REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS idx_carts_updated_at ON carts (updated_at);"
+            # Lines used to hold float rupees/kgs; carts are short-lived, so the
+            # old table is dropped rather than converted.
+            "DROP TABLE IF EXISTS cart_items;"
+            "CREATE TABLE IF NOT EXISTS cart_lines ("
+            " cart_id TEXT NOT NULL, product_id INTEGER NOT NULL, product_name TEXT NOT NULL,"
+            " unit_price_paise INTEGER NOT NULL, quantity_grams INTEGER NOT NULL,"
+            " added_at REAL NOT NULL, PRIMARY KEY (cart_id, product_id));"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _touch(self, conn, cart_id, now):
+        conn.execute(
+            "INSERT INTO carts (cart_id, updated_at) VALUES (?, ?) "
+            "ON CONFLICT (cart_id) DO UPDATE SET updated_at = excluded.updated_at",
+            (cart_id, now),
+        )
+        if now - self._last_purge > self.PURGE_INTERVAL:
+            self._last_purge = now
+            cutoff = now - self.ttl
+            conn.execute(
+                "DELETE FROM cart_lines WHERE cart_id IN "
+                "(SELECT cart_id FROM carts WHERE updated_at < ?)",
+                (cutoff,),
+            )
+            conn.execute("DELETE FROM carts WHERE updated_at < ?", (cutoff,))
+
+    def get_items(self, cart_id):
+        """Return the cart's lines in the order they were first added."""
+        conn = self._conn()
+        row = conn.execute("SELECT updated_at FROM carts WHERE cart_id = ?", (cart_id,)).fetchone()
+        if not row or time.time() - row[0] > self.ttl:
+            return []
+        rows = conn.execute(
+            "SELECT product_id, product_name, unit_price_paise, quantity_grams FROM cart_lines "
+            "WHERE cart_id = ? ORDER BY added_at",
+            (cart_id,),
+        ).fetchall()
+        return [sale_line(*r) for r in rows]
+
+    def add_item(self, cart_id, product_id, product_name, unit_price_paise, quantity_grams):
+        """Add ``quantity_grams`` of a product, merging with an existing line; return the line."""
+        conn = self._conn()
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._touch(conn, cart_id, now)
+            conn.execute(
+                "INSERT INTO cart_lines (cart_id, product_id, product_name, unit_price_paise, "
+                "quantity_grams, added_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (cart_id, product_id) DO UPDATE SET "
+                "quantity_grams = quantity_grams + excluded.quantity_grams, "
+                "product_name = excluded.product_name, "
+                "unit_price_paise = excluded.unit_price_paise",
+                (cart_id, product_id, product_name, unit_price_paise, quantity_grams, now),
+            )
+            total = conn.execute(
+                "SELECT quantity_grams FROM cart_lines WHERE cart_id = ? AND product_id = ?",
+                (cart_id, product_id),
+            ).fetchone()[0]
+        return sale_line(product_id, product_name, unit_price_paise, total)
+
+    def remove_item(self, cart_id, product_id):
+        """Remove a product's line from the cart; return it, or None if absent."""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT product_id, product_name, unit_price_paise, quantity_grams FROM cart_lines "
+                "WHERE cart_id = ? AND product_id = ?",
+                (cart_id, product_id),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "DELETE FROM cart_lines WHERE cart_id = ? AND product_id = ?",
+                (cart_id, product_id),
+            )
+            self._touch(conn, cart_id, time.time())
+        return sale_line(*row)
+
+    def delete(self, cart_id):
+        """Discard a whole cart (e.g. after checkout)."""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM cart_lines WHERE cart_id = ?", (cart_id,))
+            conn.execute("DELETE FROM carts WHERE cart_id = ?", (cart_id,))
+
+
+def create_cart_store(config):
+    """Build the cart store selected by ``CART_STORE_BACKEND`` in the app config."""
+    backend = config["CART_STORE_BACKEND"]
+    if backend == "memory":
+        return MemoryCartStore(ttl=config["CART_TTL"], max_carts=config["CART_STORE_MAX_CARTS"])
+    if backend == "sqlite":
+        return SQLiteCartStore(path=config["CART_STORE_PATH"], ttl=config["CART_TTL"])
+    raise ValueError(f"Unknown cart store backend: {backend}")
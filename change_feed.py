@@ -0,0 +1,149 @@
+"""
+Cross-process product change feed for the Retail Invoice Management System.
+
+Under the pre-fork server (serve.py) every worker process has its own catalog
+caches, search index and low-stock index. A worker that changes products
+publishes one entry per product here: its product_id, the committed change in
+stock (grams) and whether its name, status or reorder level changed. The other
+workers poll the feed at the start of each request and drop or update what
+they hold for those products.
+
+The feed is a ring of fixed-size entries in anonymous shared memory, created by
+the master process before it forks, behind a generation counter (the number of
+entries ever published). Polling when nothing has changed is one read of the
+counter. Each entry carries the pid of the process that published it, so a
+worker skips its own changes, which it has already applied. A worker that
+has fallen a whole ring behind is told to drop everything instead. Until
+share() is called the feed is disabled and publishing does nothing, so
+single-process serving pays nothing for it.
+"""
+
+import mmap
+import os
+import struct
+
+_GENERATION = struct.Struct("<Q")
+# product_id (negated for catalog changes, 0 = all), grams, pid of the publishing process
+_ENTRY = struct.Struct("<qqq")
+
+EVERYTHING = "everything"  # poll() result: drop all cached catalog data
+
+
+class ChangeFeed:
+    """Ring of product changes in memory shared by forked worker processes."""
+
+    def __init__(self, slots=16384):
+        """Initialize a disabled feed of ``slots`` entries; see share()."""
+        self.slots = slots
+        self._memory = None
+        self._lock = None
+        self._seen = 0  # Generation this process has caught up to
+        self.published = 0
+        self.polled = 0
+        self.overruns = 0
+
+    @property
+    def enabled(self):
+        """Return True once the feed is shared."""
+        return self._memory is not None
+
+    def share(self):
+        """Allocate the shared ring; call once in the master process, before forking workers."""
+        if self._memory is None:
+            import multiprocessing  # Only pre-fork serving needs it
+
+            self._memory = mmap.mmap(-1, _GENERATION.size + self.slots * _ENTRY.size)
+            self._lock = multiprocessing.Lock()
+
+    def _generation(self):
+        return _GENERATION.unpack_from(self._memory, 0)[0]
+
+    def publish(self, product_ids=None, stock=None, catalog=False):
+        """
+        Announce committed changes to ``product_ids`` (every product if None).
+
+        ``stock`` maps product_id to its change in grams; its products are
+        included even if not in ``product_ids``. ``catalog`` marks changes to
+        names, status or reorder levels.
+        """
+        if self._memory is None:
+            return
+        stock = stock or {}
+        pid = os.getpid()
+        if product_ids is None:
+            entries = [(0, 0, pid)]
+        else:
+            changed = {int(product_id) for product_id in product_ids}
+            changed.update(int(product_id) for product_id in stock)
+            entries = [
+                (-product_id if catalog else product_id, stock.get(product_id, 0), pid)
+                for product_id in changed
+            ]
+            if not entries:
+                return
+            if len(entries) > self.slots:
+                entries = [(0, 0, pid)]
+        with self._lock:
+            generation = self._generation()
+            for offset, entry in enumerate(entries):
+                slot = (generation + offset) % self.slots
+                _ENTRY.pack_into(self._memory, _GENERATION.size + slot * _ENTRY.size, *entry)
+            _GENERATION.pack_into(self._memory, 0, generation + len(entries))
+            if self._seen == generation:
+                # Up to date before this publish: nothing here to apply to ourselves.
+                self._seen = generation + len(entries)
+        self.published += len(entries)
+
+    def poll(self):
+        """
+        Return the changes other processes published since the last poll.
+
+        Return None if there are none (entries this process published are
+        skipped), EVERYTHING if all cached catalog data must
+        be dropped, or a (product_ids, stock, catalog) tuple: the set of changed
+        products, their summed stock changes in grams and whether any change
+        was to names, status or reorder levels.
+        """
+        if self._memory is None or self._generation() == self._seen:
+            return None
+        with self._lock:
+            generation = self._generation()
+            start, self._seen = self._seen, generation
+            if generation - start > self.slots:
+                self.overruns += 1
+                return EVERYTHING
+            entries = [
+                _ENTRY.unpack_from(
+                    self._memory, _GENERATION.size + (index % self.slots) * _ENTRY.size
+                )
+                for index in range(start, generation)
+            ]
+        self.polled += len(entries)
+        own = os.getpid()
+        product_ids = set()
+        stock = {}
+        catalog = False
+        for product_id, grams, pid in entries:
+            if pid == own:
+                continue  # Published by this process, which applied it already
+            if product_id == 0:
+                return EVERYTHING
+            if product_id < 0:
+                product_id = -product_id
+                catalog = True
+            product_ids.add(product_id)
+            if grams:
+                stock[product_id] = stock.get(product_id, 0) + grams
+        if not product_ids:
+            return None
+        return product_ids, stock, catalog
+
+    def stats(self):
+        """Return entry counters for this process."""
+        return {
+            "enabled": self.enabled,
+            "generation": self._generation() if self._memory is not None else 0,
+            "published": self.published,
+            "polled": self.polled,
+            "overruns": self.overruns,
+        }
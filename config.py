@@ -1,13 +1,28 @@
 """
 Configuration for the Retail Invoice Management System.
 
-Contains application and database settings.
+Contains application and database settings. The values below are defaults:
+any of them can be overridden by an environment variable of the same name
+(e.g. ``DB_BACKEND=sqlite``), or by a line in a ``.env`` file next to this one
+if python-dotenv is installed. Variables already set in the environment take
+precedence over the file. An empty value sets a setting to None.
 """
 
+import os
+
+try:
+    from dotenv import load_dotenv
+except ImportError:  # python-dotenv is optional; without it only the environment is read
+    load_dotenv = None
+
 
 class Config:
     """Application configuration settings."""
 
+    # Storage backend: "mysql" (settings below) or "sqlite" (embedded, for single-host branches)
+    DB_BACKEND = "mysql"
+    SQLITE_PATH = "retail.sqlite3"  # Database file used by the sqlite backend
+
     # MySQL Database Configuration
     # IMPORTANT: Replace with your actual MySQL credentials
     DB_HOST = "xxxxxxxxxxxxxx"
@@ -15,5 +30,109 @@ class Config:
     DB_PASSWORD = "xxxxxxxxxxxxxxxxx"  # e.g., 'mypassword'
     DB_NAME = "xxxxxxxxxx"
 
+    # Connection pool settings shared by all model classes
+    DB_POOL_SIZE = 5  # Maximum number of open connections
+    DB_POOL_TIMEOUT = 10  # Seconds to wait for a free connection before giving up
+    DB_POOL_PING_INTERVAL = 30  # Ping connections idle longer than this (seconds) on checkout
+
+    # Async (ASGI) serving mode, see asgi.py: aiomysql pool for the async routes
+    ASYNC_DB_POOL_MIN = 1  # Connections opened at startup
+    ASYNC_DB_POOL_SIZE = 20  # Maximum open connections
+    ASYNC_DB_POOL_RECYCLE = 3600  # Reopen connections older than this (seconds)
+
+    # In-process product catalog cache
+    PRODUCT_CACHE_SIZE = 5000  # Maximum cached entries (rows and result lists)
+    PRODUCT_CACHE_TTL = 60  # Seconds before a cached entry is re-read from MySQL
+
+    # In-memory autocomplete index over product names
+    SEARCH_INDEX_REFRESH = 300  # Seconds between full rebuilds from MySQL
+
+    # Product listing
+    PRODUCTS_PAGE_SIZE = 50  # Default rows per page on /products
+    PRODUCTS_MAX_PAGE_SIZE = 500
+
+    # Invoice listing
+    INVOICES_PAGE_SIZE = 50  # Default rows per page on /invoices
+    INVOICES_MAX_PAGE_SIZE = 500
+    INVOICES_MAX_BATCH = 500  # Most invoices GET /api/invoices?ids=... returns at once
+
+    # Rendered invoice pages and JSON bodies (an invoice never changes once saved)
+    INVOICE_PAGE_CACHE_SIZE = 2000  # Cached representations (least recently used evicted)
+    INVOICE_PAGE_MAX_AGE = 7 * 24 * 60 * 60  # Seconds browsers may reuse one without asking
+
+    # Server-side cart storage ("memory" for a single process, "sqlite" to share across workers)
+    CART_STORE_BACKEND = "memory"
+    CART_STORE_PATH = "carts.sqlite3"  # Used by the sqlite backend
+    CART_STORE_MAX_CARTS = 10000  # Used by the memory backend (least recently used evicted)
+    CART_TTL = 4 * 60 * 60  # Seconds before an untouched cart is discarded
+
+    # Stock reservations: adding to a cart holds the stock until checkout or expiry
+    RESERVATION_TTL = 15 * 60  # Seconds a hold lasts after the cart was last added to
+    RESERVATION_SWEEP_INTERVAL = 60  # Seconds between sweeps returning expired holds to stock
+
+    # Stock movement log: every change to quantity_available, see stock_log.py and movements.py
+    STOCK_LOG_PATH = "stock_movements.log"  # Append-only event file; None disables the log
+    STOCK_LOG_FLUSH_INTERVAL = 1.0  # Seconds between background writes of queued events
+    STOCK_LOG_BATCH_SIZE = 500  # Write sooner once this many events are queued
+
+    # Low-stock alerts for products with a reorder level, see low_stock.py
+    LOW_STOCK_REFRESH = 600  # Seconds between reloads of reorder levels and stock from the database
+    LOW_STOCK_ALERT_PATH = (
+        "low_stock_alerts.jsonl"  # Alert events, one JSON per line; None disables
+    )
+    LOW_STOCK_FLUSH_INTERVAL = 5.0  # Seconds between background writes of queued alerts
+    LOW_STOCK_BATCH_SIZE = 100  # Write sooner once this many alerts are queued
+
+    # Pre-fork serving (serve.py)
+    SERVE_BIND = "127.0.0.1:8000"
+    SERVE_WORKERS = None  # Worker processes; None = one per CPU core
+    SERVE_THREADS = 4  # Request threads per worker (each worker has its own DB pool)
+    CHANGE_FEED_SLOTS = 16384  # Product changes kept for workers to catch up on
+
     # Flask Secret Key for session management (IMPORTANT for production)
     SECRET_KEY = "xxxxxxxxxxxxxxxx"  # In production, use a strong, randomly generated key
+
+    # Request instrumentation (see /metrics)
+    SERVER_TIMING_HEADER = False  # Add a Server-Timing header (app, db, template) to responses
+    PROFILE_SLOWEST_N = 0  # Keep profiles of the N slowest requests; 0 disables profiling
+    PROFILE_DIR = "profiles"  # Where request profiles are written
+
+    # Startup (see app.create_app)
+    TEMPLATE_CACHE_DIR = "template_cache"  # Compiled templates kept across restarts; None disables
+    PRECOMPILE_TEMPLATES = True  # Compile every template at startup instead of on first use
+
+
+_TRUE = {"1", "true", "yes", "on"}
+_FALSE = {"0", "false", "no", "off"}
+
+
+def _parse(name, value, default):
+    """Convert environment variable ``name`` to the type of the setting's ``default``."""
+    value = value.strip()
+    if not value:
+        return None
+    if isinstance(default, bool):
+        if value.lower() in _TRUE | _FALSE:
+            return value.lower() in _TRUE
+        raise ValueError(f"{name} must be one of {sorted(_TRUE | _FALSE)}, not {value!r}")
+    if default is None:
+        return int(value) if value.lstrip("-").isdigit() else value
+    if isinstance(default, (int, float)):
+        try:
+            return type(default)(value)
+        except ValueError:
+            raise ValueError(f"{name} must be a number, not {value!r}") from None
+    return value
+
+
+def load_environment(config=Config):
+    """Override ``config`` settings from the environment (and the .env file); return it."""
+    if load_dotenv is not None:
+        load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
+    for name, default in list(vars(config).items()):
+        if name.isupper() and name in os.environ:
+            setattr(config, name, _parse(name, os.environ[name], default))
+    return config
+
+
+load_environment()
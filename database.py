@@ -1,44 +1,325 @@
 """
 Database connection management for the Retail Invoice Management System.
 
-Provide functions to connect to and close the MySQL database.
+Provide functions to connect to and close the database. The storage backend is
+chosen with Config.DB_BACKEND: "mysql" hands out connections from a shared,
+fixed-size pool so that model methods do not pay for a TCP + authentication
+handshake on every call; "sqlite" uses the embedded engine in sqlite_backend.py.
+``dialect`` exposes the SQL fragments that differ between the two.
 """
 
 # retail_invoice_app/database.py
 
-import mysql.connector
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
 from config import Config  # Import configuration from config.py
+from instrumentation import instrument_connection, unwrap_connection
+from sqlite_backend import SQLiteBackend
 
+# Catch these instead of a driver's own exception classes. The MySQL driver
+# takes longer to import than the rest of the app's own modules together, so
+# processes on the sqlite backend (including the command-line tools) skip it.
+if Config.DB_BACKEND == "sqlite":
+    DatabaseError = (sqlite3.Error,)
+    IntegrityError = (sqlite3.IntegrityError,)
+else:
+    import mysql.connector
 
-def get_db_connection():
+    DatabaseError = (mysql.connector.Error, sqlite3.Error)
+    IntegrityError = (mysql.connector.IntegrityError, sqlite3.IntegrityError)
+
+# innodb_ft_min_token_size: shorter words are left out of FULLTEXT indexes.
+FULLTEXT_MIN_TOKEN_SIZE = 3
+
+
+class MySQLDialect:
+    """SQL fragments for MySQL."""
+
+    name = "mysql"
+    for_update = " FOR UPDATE"
+    next_day = "DATE_ADD(%s, INTERVAL 1 DAY)"
+    periods = {
+        "day": "sales_date",
+        "week": "DATE_SUB(sales_date, INTERVAL WEEKDAY(sales_date) DAY)",
+        "month": "DATE_SUB(sales_date, INTERVAL DAYOFMONTH(sales_date) - 1 DAY)",
+    }
+
+    @staticmethod
+    def upsert(conflict_columns, replace=(), add=()):
+        """Return the upsert clause: ``replace`` columns take the new value, ``add`` sum it."""
+        assignments = [f"{column} = VALUES({column})" for column in replace]
+        assignments += [f"{column} = {column} + VALUES({column})" for column in add]
+        return "ON DUPLICATE KEY UPDATE " + ", ".join(assignments)
+
+    @staticmethod
+    def decimal(expression, places):
+        """Return a computed DECIMAL ``expression`` as is (MySQL's DECIMAL arithmetic is exact)."""
+        return expression
+
+    @staticmethod
+    def date_column(expression, alias):
+        """Select ``expression AS alias`` (MySQL already returns DATE values as datetime.date)."""
+        return f"{expression} AS {alias}"
+
+    @staticmethod
+    def estimate_rows(cursor, sql, params):
+        """Return the optimizer's row estimate for ``sql`` from EXPLAIN, on a tuple cursor."""
+        cursor.execute("EXPLAIN " + sql, params)
+        plan = cursor.fetchall()
+        if not plan:
+            return 0
+        rows = [column[0] for column in cursor.description].index("rows")
+        return int(plan[0][rows] or 0)
+
+    @staticmethod
+    def name_search(column, term):
+        """
+        Return a (condition, params) pair matching ``column`` against a search ``term``.
+
+        Every word of the term must start a word of the column, which the
+        FULLTEXT index (migration 0002) answers without a leading-wildcard LIKE.
+        Words shorter than InnoDB's minimum token size are not indexed, so such
+        terms fall back to a substring LIKE.
+        """
+        words = re.findall(r"\w+", term)
+        if words and min(len(word) for word in words) >= FULLTEXT_MIN_TOKEN_SIZE:
+            return f"MATCH({column}) AGAINST (%s IN BOOLEAN MODE)", [
+                " ".join(f"+{word}*" for word in words)
+            ]
+        return f"{column} LIKE %s", [f"%{term}%"]
+
+    @staticmethod
+    def full_scans(cursor, sql, params):
+        """Return the tables EXPLAIN says ``sql`` reads with a full table scan."""
+        cursor.execute("EXPLAIN " + sql, params)
+        return [row["table"] for row in cursor.fetchall() if row["type"] == "ALL"]
+
+
+class ConnectionPool:
     """
-    Establish and return a connection to the MySQL database.
+    A thread-safe pool of MySQL connections (the "mysql" backend).
 
-    Handle connection errors gracefully.
+    Idle connections are reused last-in-first-out so that the busiest
+    connections stay warm. Connections that have sat idle for longer than
+    ``ping_interval`` seconds are pinged (and reconnected if the server has
+    dropped them) before they are handed out.
     """
-    try:
+
+    dialect = MySQLDialect
+
+    def __init__(self, size, timeout, ping_interval):
+        """Initialize an empty pool; connections are opened on demand."""
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self._idle = deque()  # (connection, last_used_monotonic) pairs
+        self._open = 0
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            "connections_created": 0,
+            "reconnects": 0,
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_seconds": 0.0,
+            "timeouts": 0,
+        }
+
+    def _bump(self, key, amount=1):
+        """Increment a pool counter under the pool lock."""
+        with self._cond:
+            self._stats[key] += amount
+
+    def _connect(self):
+        """Open a brand new physical connection."""
         conn = mysql.connector.connect(
             host=Config.DB_HOST,
             user=Config.DB_USER,
             password=Config.DB_PASSWORD,
             database=Config.DB_NAME,
         )
-        if conn.is_connected():
-            print("Successfully connected to the database!")
+        self._bump("connections_created")
+        print("Successfully connected to the database!")
+        return conn
+
+    def _ensure_healthy(self, conn, last_used):
+        """
+        Return a usable connection, reconnecting if the server dropped it.
+
+        Only connections idle for longer than ``ping_interval`` are checked, so a
+        busy pool does not pay an extra round trip per checkout.
+        """
+        if time.monotonic() - last_used < self.ping_interval:
             return conn
-    except mysql.connector.Error as e:
-        print(f"Error connecting to MySQL database: {e}")
-        return None
+        try:
+            conn.ping(reconnect=False)
+        except mysql.connector.Error:
+            self._bump("reconnects")
+            conn.reconnect(attempts=2, delay=0)
+        return conn
+
+    def acquire(self):
+        """
+        Check out a connection, waiting up to ``timeout`` seconds for one.
+
+        Return None if no connection could be obtained.
+        """
+        with self._cond:
+            started = None
+            while not self._idle and self._open >= self.size:
+                if started is None:
+                    started = time.monotonic()
+                    self._stats["waits"] += 1
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    self._stats["wait_time_seconds"] += self.timeout
+                    print("Error connecting to MySQL database: connection pool exhausted")
+                    return None
+                self._cond.wait(remaining)
+            if started is not None:
+                self._stats["wait_time_seconds"] += time.monotonic() - started
+
+            if self._idle:
+                conn, last_used = self._idle.pop()
+            else:
+                conn, last_used = None, None
+                self._open += 1
+            self._in_use += 1
+            self._stats["checkouts"] += 1
+
+        try:
+            if conn is None:
+                return self._connect()
+            return self._ensure_healthy(conn, last_used)
+        except mysql.connector.Error as e:
+            print(f"Error connecting to MySQL database: {e}")
+            self._discard()
+            return None
+
+    def release(self, conn):
+        """
+        Return a connection to the pool.
+
+        Any transaction left open by the caller is rolled back so the next user
+        does not inherit its locks or a stale REPEATABLE READ snapshot.
+        """
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except mysql.connector.Error:
+            self.discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._in_use -= 1
+            self._cond.notify()
+
+    def discard(self, conn):
+        """Close a checked-out connection and free its slot in the pool."""
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+        self._discard()
+
+    def close_idle(self):
+        """Close every idle connection; return how many were closed."""
+        with self._cond:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            try:
+                conn.close()
+            except mysql.connector.Error:
+                pass
+        return len(idle)
+
+    def _discard(self):
+        """Forget a checked-out connection that is no longer usable."""
+        with self._cond:
+            self._open -= 1
+            self._in_use -= 1
+            self._cond.notify()
+
+    def stats(self):
+        """Return a snapshot of pool metrics as a dictionary."""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot.update(
+                size=self.size,
+                open=self._open,
+                in_use=self._in_use,
+                idle=len(self._idle),
+            )
+        return snapshot
+
+
+def _create_backend():
+    """Build the storage backend selected by Config.DB_BACKEND."""
+    if Config.DB_BACKEND == "sqlite":
+        return SQLiteBackend(Config.SQLITE_PATH, timeout=Config.DB_POOL_TIMEOUT)
+    if Config.DB_BACKEND != "mysql":
+        raise ValueError(f"Unknown DB_BACKEND: {Config.DB_BACKEND!r}")
+    return ConnectionPool(
+        size=Config.DB_POOL_SIZE,
+        timeout=Config.DB_POOL_TIMEOUT,
+        ping_interval=Config.DB_POOL_PING_INTERVAL,
+    )
+
+
+_backend = _create_backend()  # Opens no connection until the first get_db_connection()
+dialect = _backend.dialect
+
+
+def get_db_connection():
+    """
+    Check out a connection to the configured database.
+
+    Handle connection errors gracefully by returning None. Inside an HTTP request
+    the connection is wrapped so its statements are counted and timed.
+    """
+    return instrument_connection(_backend.acquire())
 
 
 def close_db_connection(conn, cursor):
     """
-    Close the database cursor and connection.
+    Close the database cursor and return the connection to the pool.
 
     Ensure resources are properly released.
     """
     if cursor:
         cursor.close()
-    if conn and conn.is_connected():
-        conn.close()
-        print("Database connection closed.")
+    if conn:
+        _backend.release(unwrap_connection(conn))
+
+
+def discard_db_connection(conn):
+    """
+    Close a checked-out connection instead of returning it to the pool.
+
+    Use this when a connection is left in an unknown state, e.g. a streaming
+    (unbuffered) result set that was abandoned before all rows were read.
+    """
+    _backend.discard(unwrap_connection(conn))
+
+
+def close_idle_connections():
+    """
+    Close the pool's idle connections; return how many were closed.
+
+    Call before forking worker processes (serve.py): a connection must not be
+    shared between processes, and each worker opens its own on demand.
+    """
+    return _backend.close_idle()
+
+
+def get_pool_stats():
+    """Return connection pool (or SQLite backend) metrics as a dictionary."""
+    return _backend.stats()
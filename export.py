@@ -0,0 +1,123 @@
+"""
+Streaming export of invoices and their line items for the Retail Invoice Management System.
+
+Serialize rows from Invoice.iter_export as CSV or NDJSON chunk by chunk, for
+both the /api/invoices/export endpoint and the command line:
+
+    python export.py --format csv --start-date 2024-04-01 --end-date 2025-03-31 -o sales.csv
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+
+from database import DatabaseError
+from models import Invoice
+
+EXPORT_COLUMNS = [
+    "invoice_id",
+    "invoice_date",
+    "customer_name",
+    "grand_total",
+    "item_id",
+    "product_id",
+    "product_name",
+    "quantity_sold",
+    "unit_price",
+    "item_total",
+]
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _json_default(value):
+    """Serialize dates as ISO 8601 and decimals as exact strings."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def generate_csv(rows, chunk_rows=500):
+    """Yield CSV text (header first) in chunks of ``chunk_rows`` rows."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def generate_ndjson(rows, chunk_rows=500):
+    """Yield newline-delimited JSON objects in chunks of ``chunk_rows`` rows."""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({c: row[c] for c in EXPORT_COLUMNS}, default=_json_default))
+        if len(lines) >= chunk_rows:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def generate_export(fmt, start_date=None, end_date=None, customer_name=None):
+    """Return a generator of text chunks for the requested export format."""
+    rows = Invoice.iter_export(
+        start_date=start_date, end_date=end_date, customer_name=customer_name
+    )
+    if fmt == "csv":
+        return generate_csv(rows)
+    if fmt == "ndjson":
+        return generate_ndjson(rows)
+    raise ValueError(f"Unsupported export format: {fmt}")
+
+
+def main(argv=None):
+    """Export invoices from the command line to a file or stdout; return the exit status."""
+    parser = argparse.ArgumentParser(description="Export invoices with their line items.")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--start-date", help="Earliest invoice date (YYYY-MM-DD)")
+    parser.add_argument("--end-date", help="Latest invoice date (YYYY-MM-DD)")
+    parser.add_argument(
+        "--customer-name",
+        help="Customer name search: on MySQL every word must start a word of the name "
+        "(e.g. 'ravi kum'), on SQLite a substring",
+    )
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for chunk in generate_export(
+            args.format,
+            start_date=args.start_date,
+            end_date=args.end_date,
+            customer_name=args.customer_name,
+        ):
+            out.write(chunk)
+    except (ConnectionError, *DatabaseError) as e:
+        print(f"Export failed, the output is incomplete: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
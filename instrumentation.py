@@ -0,0 +1,429 @@
+"""
+Request-level profiling and SQL instrumentation for the Retail Invoice Management System.
+
+Per request, record wall time, SQL statements (count and time), connections
+checked out, time spent in each model method and template render time. Totals
+are aggregated into Prometheus-style metrics served at /metrics, can be echoed
+in a ``Server-Timing`` response header, and the slowest N requests can be
+profiled with cProfile (or pyinstrument, when installed) and dumped to disk.
+Startup is timed too: how long imports and each phase of create_app() took,
+and how long after the process started it sent its first response.
+"""
+
+import contextvars
+import cProfile
+import functools
+import heapq
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+
+_current = contextvars.ContextVar("request_stats", default=None)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    """Counters collected while handling a single request."""
+
+    def __init__(self):
+        """Start the request clock."""
+        self.started = time.perf_counter()
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.connections = 0
+        self.method_seconds = defaultdict(float)
+        self.template_seconds = 0.0
+        self.template_started = None
+
+
+def current_stats():
+    """Return the RequestStats of the request being handled, or None outside a request."""
+    return _current.get()
+
+
+class InstrumentedCursor:
+    """Cursor proxy that counts and times statements for the current request."""
+
+    def __init__(self, cursor, stats):
+        """Wrap ``cursor``; statements are recorded into ``stats``."""
+        self._cursor = cursor
+        self._stats = stats
+
+    def _timed(self, method, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            self._stats.sql_statements += 1
+            self._stats.sql_seconds += time.perf_counter() - started
+
+    def execute(self, *args, **kwargs):
+        """Execute and record one statement."""
+        return self._timed(self._cursor.execute, *args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        """Execute and record one batched statement."""
+        return self._timed(self._cursor.executemany, *args, **kwargs)
+
+    def __iter__(self):
+        """Iterate over the wrapped cursor's rows."""
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        """Delegate everything else to the wrapped cursor."""
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    """Connection proxy handing out instrumented cursors; ``raw`` is the pooled connection."""
+
+    def __init__(self, conn, stats):
+        """Wrap ``conn`` for the request described by ``stats``."""
+        self.raw = conn
+        self._stats = stats
+        stats.connections += 1
+
+    def cursor(self, *args, **kwargs):
+        """Return an instrumented cursor."""
+        return InstrumentedCursor(self.raw.cursor(*args, **kwargs), self._stats)
+
+    def _timed(self, method, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            self._stats.sql_statements += 1
+            self._stats.sql_seconds += time.perf_counter() - started
+
+    def start_transaction(self, *args, **kwargs):
+        """Start and record a transaction."""
+        return self._timed(self.raw.start_transaction, *args, **kwargs)
+
+    def commit(self):
+        """Commit and record."""
+        return self._timed(self.raw.commit)
+
+    def rollback(self):
+        """Roll back and record."""
+        return self._timed(self.raw.rollback)
+
+    def __getattr__(self, name):
+        """Delegate everything else to the pooled connection."""
+        return getattr(self.raw, name)
+
+
+def instrument_connection(conn):
+    """Wrap a freshly checked-out connection when called inside an instrumented request."""
+    stats = _current.get()
+    if conn is None or stats is None:
+        return conn
+    return InstrumentedConnection(conn, stats)
+
+
+def unwrap_connection(conn):
+    """Return the pooled connection behind an InstrumentedConnection (or ``conn`` itself)."""
+    return getattr(conn, "raw", conn)
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms rendered in the Prometheus text format."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = defaultdict(float)  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket_counts, sum, count]
+
+    def describe(self, name, kind, text):
+        """Register the TYPE and HELP lines for a metric."""
+        self._help[name] = (kind, text)
+
+    def inc(self, name, labels=(), value=1.0):
+        """Add ``value`` to a counter."""
+        with self._lock:
+            self._counters[(name, labels)] += value
+
+    def observe(self, name, labels, value):
+        """Record one observation in a histogram."""
+        with self._lock:
+            entry = self._histograms.get((name, labels))
+            if entry is None:
+                entry = self._histograms[(name, labels)] = [[0] * len(DURATION_BUCKETS), 0.0, 0]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self, gauges=None):
+        """Return the exposition text, including the given ``{(name, labels): value}`` gauges."""
+        lines = []
+        with self._lock:
+            series = defaultdict(list)
+            for (name, labels), value in self._counters.items():
+                series[name].append(f"{name}{_labels(labels)} {value:g}")
+            for (name, labels), (buckets, total, count) in self._histograms.items():
+                for bound, bucket_count in zip(DURATION_BUCKETS, buckets):
+                    le = _labels(labels + (("le", f"{bound:g}"),))
+                    series[name].append(f"{name}_bucket{le} {bucket_count}")
+                inf = _labels(labels + (("le", "+Inf"),))
+                series[name].append(f"{name}_bucket{inf} {count}")
+                series[name].append(f"{name}_sum{_labels(labels)} {total:.6f}")
+                series[name].append(f"{name}_count{_labels(labels)} {count}")
+        for (name, labels), value in (gauges or {}).items():
+            series[name].append(f"{name}{_labels(labels)} {float(value):g}")
+        for name in sorted(series):
+            kind, text = self._help.get(name, ("gauge", name))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(series[name])
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+metrics = MetricsRegistry()
+metrics.describe("http_requests_total", "counter", "HTTP requests handled.")
+metrics.describe("http_request_duration_seconds", "histogram", "Request wall time.")
+metrics.describe("db_statements_total", "counter", "SQL statements executed.")
+metrics.describe("db_statement_seconds_total", "counter", "Time spent executing SQL.")
+metrics.describe("db_connections_total", "counter", "Pooled connections checked out.")
+metrics.describe("model_method_duration_seconds", "histogram", "Time spent in model methods.")
+metrics.describe("template_render_duration_seconds", "histogram", "Template render time.")
+
+
+def _timed_method(qualname, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stats = _current.get()
+        if stats is None:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            stats.method_seconds[qualname] += elapsed
+            metrics.observe("model_method_duration_seconds", (("method", qualname),), elapsed)
+
+    return wrapper
+
+
+def instrument_methods(cls):
+    """Time every public method and staticmethod of a model class (in place)."""
+    for name, attr in list(vars(cls).items()):
+        if name.startswith("_"):
+            continue
+        qualname = f"{cls.__name__}.{name}"
+        if isinstance(attr, staticmethod):
+            setattr(cls, name, staticmethod(_timed_method(qualname, attr.__func__)))
+        elif callable(attr):
+            setattr(cls, name, _timed_method(qualname, attr))
+    return cls
+
+
+class SlowRequestProfiler:
+    """Keep profiles of the slowest ``keep`` requests as files in ``directory``."""
+
+    def __init__(self, keep, directory):
+        """Initialize; ``keep`` = 0 disables profiling."""
+        self.keep = keep
+        self.directory = directory
+        self._slowest = []  # min-heap of (seconds, path)
+        self._lock = threading.Lock()
+        try:
+            import pyinstrument  # noqa: F401
+
+            self.engine = "pyinstrument"
+        except ImportError:
+            self.engine = "cprofile"
+
+    def start(self):
+        """Start profiling the current request; return a handle or None."""
+        if not self.keep:
+            return None
+        try:
+            if self.engine == "pyinstrument":
+                from pyinstrument import Profiler
+
+                profiler = Profiler(async_mode="disabled")
+                profiler.start()
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+        except (RuntimeError, ValueError):
+            return None  # Another profiler is active on this interpreter
+        return profiler
+
+    def stop(self, profiler, seconds, label):
+        """Stop profiling and keep the result if it is among the slowest requests."""
+        if self.engine == "pyinstrument":
+            profiler.stop()
+        else:
+            profiler.disable()
+        with self._lock:
+            if len(self._slowest) >= self.keep and seconds <= self._slowest[0][0]:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            slug = re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_") or "root"
+            suffix = "html" if self.engine == "pyinstrument" else "prof"
+            path = os.path.join(self.directory, f"{seconds * 1000:09.1f}ms_{slug}.{suffix}")
+            if self.engine == "pyinstrument":
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+            else:
+                profiler.dump_stats(path)
+            heapq.heappush(self._slowest, (seconds, path))
+            if len(self._slowest) > self.keep:
+                _, evicted = heapq.heappop(self._slowest)
+                try:
+                    os.remove(evicted)
+                except OSError:
+                    pass
+
+
+def process_uptime():
+    """Return seconds since this process started, or None where /proc does not say."""
+    try:
+        with open("/proc/self/stat") as f:
+            started_ticks = int(f.read().rpartition(")")[2].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return max(uptime - started_ticks / os.sysconf("SC_CLK_TCK"), 0.0)
+
+
+class StartupTimer:
+    """
+    Durations of the phases of app startup, in seconds.
+
+    ``imports`` is the time from process start to the timer's creation
+    (interpreter start-up and module imports); ``first_response`` the time
+    from process start until the first response was ready. Both are None
+    where the process start time is unknown, and are only precise to the
+    kernel's clock tick (usually 10ms). In a forked worker the process starts
+    at the fork, so ``first_response`` leaves out what the master did.
+    """
+
+    def __init__(self):
+        """Start timing the first phase."""
+        self.imports = process_uptime()
+        self.phases = {}
+        self.first_response = None
+        self._last = time.perf_counter()
+
+    def mark(self, phase):
+        """End ``phase``, timed from the end of the previous one or the timer's creation."""
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last
+        self._last = now
+
+    def after_request(self, response):
+        """Flask after_request hook: note when the first response is ready."""
+        if self.first_response is None:
+            self.first_response = process_uptime()
+        return response
+
+    def report(self):
+        """Return the durations as a JSON-ready dictionary."""
+        ready = sum(self.phases.values())
+        if self.imports is not None:
+            ready += self.imports
+        return {
+            "imports": _rounded(self.imports),
+            "phases": {phase: _rounded(seconds) for phase, seconds in self.phases.items()},
+            "ready": _rounded(ready),
+            "first_response": _rounded(self.first_response),
+        }
+
+    def summary(self):
+        """Return a one-line description of the startup time for the console."""
+        report = self.report()
+        parts = [f"imports {report['imports']:.3f}s"] if report["imports"] is not None else []
+        parts += [f"{phase} {seconds:.3f}s" for phase, seconds in report["phases"].items()]
+        return f"App ready in {report['ready']:.3f}s ({', '.join(parts)})"
+
+
+def _rounded(seconds):
+    return None if seconds is None else round(seconds, 4)
+
+
+def init_app(app):
+    """Register the request hooks and template signals on a Flask app."""
+    from flask import g, request, before_render_template, template_rendered
+
+    profiler = SlowRequestProfiler(app.config["PROFILE_SLOWEST_N"], app.config["PROFILE_DIR"])
+
+    @app.before_request
+    def _start_request_stats():
+        stats = RequestStats()
+        g._instrumentation = (stats, _current.set(stats), profiler.start())
+
+    @app.after_request
+    def _record_request_stats(response):
+        state = g.get("_instrumentation")
+        if state is None:
+            return response
+        stats = state[0]
+        elapsed = time.perf_counter() - stats.started
+        endpoint = request.endpoint or "unmatched"
+        labels = (("endpoint", endpoint),)
+        metrics.inc(
+            "http_requests_total",
+            labels + (("method", request.method), ("status", str(response.status_code))),
+        )
+        metrics.observe("http_request_duration_seconds", labels, elapsed)
+        metrics.inc("db_statements_total", labels, stats.sql_statements)
+        metrics.inc("db_statement_seconds_total", labels, stats.sql_seconds)
+        metrics.inc("db_connections_total", labels, stats.connections)
+        if app.config["SERVER_TIMING_HEADER"]:
+            response.headers["Server-Timing"] = ", ".join(
+                [
+                    f"app;dur={elapsed * 1000:.1f}",
+                    f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.sql_statements} queries, '
+                    f'{stats.connections} connections"',
+                    f"tpl;dur={stats.template_seconds * 1000:.1f}",
+                ]
+            )
+        return response
+
+    @app.teardown_request
+    def _finish_request_stats(exc):
+        state = g.pop("_instrumentation", None)
+        if state is None:
+            return
+        stats, token, request_profiler = state
+        _current.reset(token)
+        if request_profiler is not None:
+            elapsed = time.perf_counter() - stats.started
+            profiler.stop(request_profiler, elapsed, f"{request.method} {request.path}")
+
+    def _template_started(sender, template, context, **extra):
+        stats = _current.get()
+        if stats is not None:
+            stats.template_started = time.perf_counter()
+
+    def _template_finished(sender, template, context, **extra):
+        stats = _current.get()
+        if stats is not None and stats.template_started is not None:
+            elapsed = time.perf_counter() - stats.template_started
+            stats.template_seconds += elapsed
+            stats.template_started = None
+            name = template.name or "inline"
+            metrics.observe("template_render_duration_seconds", (("template", name),), elapsed)
+
+    before_render_template.connect(_template_started, app, weak=False)
+    template_rendered.connect(_template_finished, app, weak=False)
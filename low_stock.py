@@ -0,0 +1,309 @@
+"""
+Low-stock alerting for the Retail Invoice Management System.
+
+Products with a reorder level (products.reorder_level, in kgs) are tracked in
+memory together with their stock. Model write paths pass each committed stock
+change to LowStockIndex.apply, which re-checks only the products it touches, so
+the products at or below their reorder level are always at hand: listing them
+costs O(k) for k low products, with no query.
+
+A product crossing its reorder level queues an alert event: "low" when its
+stock falls to or below the level, "restocked" when it rises above it again.
+AlertSink writes queued events in batches from a background thread, one JSON
+object per line, so a sale never waits for alert delivery.
+
+The index is loaded from the database on first use and reloaded every
+LOW_STOCK_REFRESH seconds (models._refresh_low_stock), which also picks up
+changes made by other processes. Alerts for those are raised by the reload.
+Pre-fork workers instead pass each other their stock changes through the
+change feed (change_feed.py) and apply them without alerts, so each alert is
+raised once, by the worker that made the change.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from itertools import islice
+
+from money import kgs
+
+
+class AlertSink:
+    """
+    Write-behind sink for alert events.
+
+    Events are queued by emit() and written by a daemon thread every
+    ``flush_interval`` seconds, or as soon as ``batch_size`` are waiting, as
+    JSON lines appended to ``path``. A ``path`` of None disables the sink.
+    Override deliver() to send batches elsewhere (e.g. to a webhook).
+    """
+
+    def __init__(self, path, flush_interval=5.0, batch_size=100):
+        """Initialize a sink for ``path``; the file and thread are created on first use."""
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.delivered = 0
+        self.batches = 0
+        self.errors = 0
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.flush)
+
+    def _reset(self):
+        self._pending = []
+        self._cond = threading.Condition()
+        self._deliver_lock = threading.Lock()
+        self._thread = None
+
+    def emit(self, events):
+        """Queue a list of alert events (dictionaries) for delivery."""
+        if not self.path or not events:
+            return
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="low-stock-alerts", daemon=True
+                )
+                self._thread.start()
+            self._pending.extend(events)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if len(self._pending) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+            self.flush()
+
+    def deliver(self, events):
+        """Append ``events`` to the alert file; raise OSError if that fails."""
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(event) + "\n" for event in events))
+
+    def flush(self):
+        """
+        Deliver every queued event now.
+
+        Return the number of events delivered. If delivery fails the events stay
+        queued and are retried by the next flush.
+        """
+        with self._deliver_lock:
+            with self._cond:
+                events, self._pending = self._pending, []
+            if not events:
+                return 0
+            try:
+                self.deliver(events)
+            except OSError as e:
+                print(f"Error delivering low-stock alerts: {e}")
+                self.errors += 1
+                with self._cond:
+                    self._pending[:0] = events
+                return 0
+            self.delivered += len(events)
+            self.batches += 1
+            return len(events)
+
+    def stats(self):
+        """Return queue and delivery counters."""
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "enabled": bool(self.path),
+            "pending": pending,
+            "delivered": self.delivered,
+            "batches": self.batches,
+            "errors": self.errors,
+        }
+
+
+# Fields of a tracked product's entry in LowStockIndex._products.
+_NAME, _GRAMS, _REORDER, _ACTIVE = range(4)
+
+
+class LowStockIndex:
+    """
+    Stock and reorder level of every product that has one, and which of them are low.
+
+    A product is low while it is active and its stock (quantity_available, in
+    grams) is at or below its reorder level. Low products are kept in the order
+    they became low. Changes committed by two threads while the index reloads
+    can be counted twice until the next reload.
+    """
+
+    def __init__(self, sink):
+        """Initialize an empty, not yet loaded index raising alerts through ``sink``."""
+        self.sink = sink
+        self._lock = threading.Lock()
+        self._products = {}  # product_id -> [product_name, grams, reorder grams, is_active]
+        self._low = {}  # product_id -> datetime it became low, oldest first
+        self.loads = 0
+        self.loaded_at = None
+        self.alerts = 0
+        self._reload_alerts = True
+
+    def is_stale(self, max_age):
+        """Return True if the index was never loaded, was invalidated or is over ``max_age`` old."""
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > max_age
+
+    def invalidate(self, alerts=True):
+        """Force a reload on next use; with ``alerts`` False that reload raises no alerts."""
+        self._reload_alerts = alerts
+        self.loaded_at = None
+
+    def load(self, rows):
+        """
+        Rebuild the index from (product_id, product_name, grams, reorder grams, is_active) rows.
+
+        The first load raises no alerts. Later loads raise them for products
+        that became low or were restocked since the previous one, unless the
+        index was invalidated with ``alerts`` False.
+        """
+        now = datetime.now()
+        events = []
+        with self._lock:
+            alerts = self.loads and self._reload_alerts
+            self._reload_alerts = True
+            products = {row[0]: list(row[1:]) for row in rows}
+            previous, self._low = self._low, {}
+            for product_id, since in previous.items():
+                entry = products.get(product_id)
+                if entry is not None and _is_low(entry):
+                    self._low[product_id] = since
+                elif entry is not None and entry[_ACTIVE] and alerts:
+                    events.append(_event("restocked", product_id, entry, now))
+            for product_id, entry in products.items():
+                if product_id not in self._low and _is_low(entry):
+                    self._low[product_id] = now
+                    if alerts:
+                        events.append(_event("low", product_id, entry, now))
+            self._products = products
+            self.loads += 1
+            self.loaded_at = time.monotonic()
+        self._emit(events)
+
+    def apply(self, changes, alerts=True):
+        """
+        Apply committed stock changes (product_id -> change in grams).
+
+        Raise alerts for products crossing their reorder level, unless
+        ``alerts`` is False (changes another process has already alerted on).
+        """
+        if not self.loads:
+            return
+        now = datetime.now()
+        events = []
+        with self._lock:
+            for product_id, delta in changes.items():
+                entry = self._products.get(int(product_id))
+                if entry is not None and delta:
+                    entry[_GRAMS] += delta
+                    self._check(int(product_id), entry, now, events)
+        if alerts:
+            self._emit(events)
+
+    def set_product(self, product_id, product_name=None, is_active=None):
+        """Record a tracked product's new name and/or active flag."""
+        now = datetime.now()
+        events = []
+        with self._lock:
+            entry = self._products.get(int(product_id))
+            if entry is None:
+                return
+            if product_name is not None:
+                entry[_NAME] = product_name
+            if is_active is not None:
+                entry[_ACTIVE] = bool(is_active)
+                self._check(int(product_id), entry, now, events)
+        self._emit(events)
+
+    def set_reorder_level(self, product_id, product_name, grams, reorder_grams, is_active):
+        """Start, change or (with ``reorder_grams`` None) stop tracking a product."""
+        if not self.loads:
+            return
+        now = datetime.now()
+        events = []
+        with self._lock:
+            product_id = int(product_id)
+            if reorder_grams is None:
+                self._products.pop(product_id, None)
+                self._low.pop(product_id, None)
+            else:
+                entry = [product_name, grams, reorder_grams, bool(is_active)]
+                self._products[product_id] = entry
+                self._check(product_id, entry, now, events)
+        self._emit(events)
+
+    def reorder_level(self, product_id):
+        """Return a product's reorder level in grams, or None if it has none."""
+        with self._lock:
+            entry = self._products.get(int(product_id))
+            return None if entry is None else entry[_REORDER]
+
+    def low(self, limit=None):
+        """
+        Return up to ``limit`` low products (all by default), longest low first.
+
+        Each is a dictionary with product_id, product_name, quantity_available
+        and reorder_level (Decimal kgs) and below_since (a datetime).
+        """
+        with self._lock:
+            return [
+                {
+                    "product_id": product_id,
+                    "product_name": self._products[product_id][_NAME],
+                    "quantity_available": kgs(self._products[product_id][_GRAMS]),
+                    "reorder_level": kgs(self._products[product_id][_REORDER]),
+                    "below_since": since,
+                }
+                for product_id, since in islice(self._low.items(), limit)
+            ]
+
+    def stats(self):
+        """Return index sizes and alert counters, with the sink's counters under 'sink'."""
+        with self._lock:
+            tracked = len(self._products)
+            low = len(self._low)
+        return {
+            "loaded": self.loads > 0,
+            "tracked": tracked,
+            "low": low,
+            "alerts": self.alerts,
+            "sink": self.sink.stats(),
+        }
+
+    def _check(self, product_id, entry, now, events):
+        """Move a product into or out of the low set after its entry changed."""
+        if _is_low(entry):
+            if product_id not in self._low:
+                self._low[product_id] = now
+                events.append(_event("low", product_id, entry, now))
+        elif self._low.pop(product_id, None) is not None and entry[_ACTIVE]:
+            events.append(_event("restocked", product_id, entry, now))
+
+    def _emit(self, events):
+        if events:
+            self.alerts += len(events)
+            self.sink.emit(events)
+
+
+def _is_low(entry):
+    return entry[_ACTIVE] and entry[_GRAMS] <= entry[_REORDER]
+
+
+def _event(kind, product_id, entry, now):
+    """Return an alert event as JSON-ready data."""
+    return {
+        "event": kind,
+        "at": now.isoformat(timespec="seconds"),
+        "product_id": product_id,
+        "product_name": entry[_NAME],
+        "quantity_available": float(kgs(entry[_GRAMS])),
+        "reorder_level": float(kgs(entry[_REORDER])),
+    }
@@ -0,0 +1,133 @@
+"""
+Schema migration commands for the Retail Invoice Management System.
+
+Bring the configured database (Config.DB_BACKEND) up to the current schema, or
+check that the hot queries in models.py are still served by an index:
+
+    python migrate.py up
+    python migrate.py up --target 1
+    python migrate.py status
+    python migrate.py check
+
+``check`` EXPLAINs each query in HOT_QUERIES and exits with status 1 if any of
+them reads a whole table. The MySQL optimizer prefers full scans of tables
+that are nearly empty, so run it against a realistically sized database (see
+benchmarks/seed.py).
+"""
+
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+from database import get_db_connection, close_db_connection, dialect, DatabaseError
+from migrations import available, applied, apply_pending
+import models
+
+
+def _listing_query(start_date=None, end_date=None, customer_name=None, cursor=None):
+    """Return (sql, params) for an invoice listing page as Invoice.get_all runs it."""
+    conditions, params = models._invoice_filters(start_date, end_date, customer_name)
+    sql, page_params, _, _ = models._invoice_page_query(conditions, params, 50, cursor, "next")
+    return sql, page_params
+
+
+def _product_listing_query(sort="name", descending=False, cursor=None, **filters):
+    """Return (sql, params) for a product listing page as Product.get_page runs it."""
+    conditions, params = models._product_filters(**filters)
+    sql, page_params, _, _ = models._product_page_query(
+        conditions, params, sort, descending, 50, cursor, "next"
+    )
+    return sql, page_params
+
+
+_NOW = datetime.now().replace(microsecond=0)
+
+# (label, sql, params) for the queries every request path depends on.
+HOT_QUERIES = [
+    ("invoice listing, first page", *_listing_query()),
+    (
+        "invoice listing, date range, later page",
+        *_listing_query(
+            start_date=_NOW - timedelta(days=30),
+            end_date=_NOW,
+            cursor=models._encode_cursor({"invoice_date": _NOW, "invoice_id": 1}),
+        ),
+    ),
+    ("invoice listing, customer search", *_listing_query(customer_name="kumar")),
+    ("invoice header", models._INVOICE_HEADER_SELECT + " WHERE invoice_id = %s", (1,)),
+    ("invoice items", models._INVOICE_ITEMS_SELECT + " WHERE ii.invoice_id = %s", (1,)),
+    ("invoice headers, batch", *models._invoice_batch_queries([1, 2, 3])[0]),
+    ("invoice items, batch", *models._invoice_batch_queries([1, 2, 3])[1]),
+    ("idempotency key lookup", models._IDEMPOTENCY_LOOKUP_SQL, ("key",)),
+    ("products by ID", models._PRODUCT_SELECT + " WHERE product_id IN (%s, %s)", (1, 2)),
+    ("product listing, by name", *_product_listing_query()),
+    ("product listing, low stock", *_product_listing_query(sort="stock", max_stock=5)),
+    (
+        "product listing, recently updated, later page",
+        *_product_listing_query(
+            sort="last_updated",
+            descending=True,
+            cursor=models._encode_product_cursor(
+                "last_updated", {"last_updated": _NOW, "product_id": 1}
+            ),
+        ),
+    ),
+    ("reorder levels", models._REORDER_LEVELS_SQL, ()),
+]
+
+
+def check_hot_queries(conn):
+    """EXPLAIN every hot query; return a list of (label, tables) for those with full scans."""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        failures = []
+        for label, sql, params in HOT_QUERIES:
+            tables = dialect.full_scans(cursor, sql, params)
+            if tables:
+                failures.append((label, tables))
+        return failures
+    finally:
+        cursor.close()
+
+
+def main(argv=None):
+    """Parse command-line arguments and run the requested migration command."""
+    parser = argparse.ArgumentParser(description="Manage the database schema.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    up = subcommands.add_parser("up", help="Apply pending migrations.")
+    up.add_argument("--target", type=int, help="Last schema version to apply")
+    subcommands.add_parser("status", help="List migrations and whether they are applied.")
+    subcommands.add_parser("check", help="Fail if a hot query does a full table scan.")
+    args = parser.parse_args(argv)
+
+    conn = get_db_connection()
+    if not conn:
+        return 1
+    try:
+        if args.command == "up":
+            if not apply_pending(conn, dialect.name, target=args.target):
+                print("Schema is up to date.")
+            return 0
+        if args.command == "status":
+            done = applied(conn)
+            for version, name, _ in available(dialect.name):
+                state = "applied" if version in done else "pending"
+                print(f"{version:04d} {name}: {state}")
+            return 0
+        if args.command == "check":
+            failures = check_hot_queries(conn)
+            for label, tables in failures:
+                print(f"Full table scan in {label}: {', '.join(tables)}")
+            if not failures:
+                print(f"All {len(HOT_QUERIES)} hot queries use an index.")
+            return 1 if failures else 0
+    except DatabaseError as e:
+        print(f"Migration error: {e}")
+        return 1
+    finally:
+        close_db_connection(conn, None)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
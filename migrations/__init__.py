@@ -0,0 +1,85 @@
+"""
+Versioned schema migrations for the Retail Invoice Management System.
+
+Each storage backend has a directory of SQL files named ``NNNN_description.sql``
+(e.g. ``mysql/0002_invoice_indexes.sql``), where the number is the schema
+version. Migrations are applied in version order and recorded in the
+'schema_migrations' table, so any database is brought up to date by applying
+the versions it has not seen yet. Run them with ``python migrate.py up``; the
+sqlite backend applies them itself when it opens the database.
+"""
+
+import os
+import re
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_FILENAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+_COMMENT = re.compile(r"--[^\n]*")
+
+_CREATE_TABLE_SQL = (
+    "CREATE TABLE IF NOT EXISTS schema_migrations ("
+    "version INT PRIMARY KEY, "
+    "name VARCHAR(255) NOT NULL, "
+    "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+)
+
+
+def available(backend):
+    """Return (version, name, path) for every migration of ``backend``, oldest first."""
+    directory = os.path.join(MIGRATIONS_DIR, backend)
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _FILENAME.match(filename)
+        if match:
+            migrations.append(
+                (int(match.group(1)), match.group(2), os.path.join(directory, filename))
+            )
+    return sorted(migrations)
+
+
+def statements(path):
+    """Return the SQL statements of a migration file, without its ``--`` comments."""
+    with open(path, encoding="utf-8") as f:
+        text = _COMMENT.sub("", f.read())
+    return [statement.strip() for statement in text.split(";") if statement.strip()]
+
+
+def applied(conn):
+    """Return the set of versions applied to ``conn``'s database (creating the table if needed)."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(_CREATE_TABLE_SQL)
+        cursor.execute("SELECT version FROM schema_migrations")
+        return {row[0] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def apply_pending(conn, backend, target=None):
+    """
+    Apply every migration ``conn``'s database has not seen, up to version ``target``.
+
+    A migration is recorded once all of its statements have run. MySQL commits
+    DDL implicitly, so one that fails part-way leaves its earlier statements in
+    place; fix the cause, undo those by hand and run it again. Database errors
+    are raised to the caller. Return the list of versions applied.
+    """
+    done = applied(conn)
+    newly_applied = []
+    cursor = conn.cursor()
+    try:
+        for version, name, path in available(backend):
+            if version in done or (target is not None and version > target):
+                continue
+            for statement in statements(path):
+                cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name)
+            )
+            conn.commit()
+            newly_applied.append(version)
+            print(f"Applied migration {version:04d} {name}")
+    finally:
+        cursor.close()
+    return newly_applied
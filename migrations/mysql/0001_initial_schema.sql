@@ -0,0 +1,62 @@
+-- Baseline schema (the tables previously created by hand from the README).
+-- Every statement is IF NOT EXISTS, so databases set up that way can record
+-- this version without changes.
+
+CREATE TABLE IF NOT EXISTS products (
+    product_id INT AUTO_INCREMENT PRIMARY KEY,
+    product_name VARCHAR(255) NOT NULL UNIQUE,
+    quantity_available DECIMAL(10, 3) NOT NULL DEFAULT 0.000, -- e.g., for kgs
+    unit_price DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    is_active TINYINT(1) DEFAULT 1 -- Soft delete (1=active, 0=inactive)
+);
+
+CREATE TABLE IF NOT EXISTS invoices (
+    invoice_id INT AUTO_INCREMENT PRIMARY KEY,
+    customer_name VARCHAR(255) NOT NULL,
+    grand_total DECIMAL(10, 2) NOT NULL,
+    invoice_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS invoice_items (
+    item_id INT AUTO_INCREMENT PRIMARY KEY,
+    invoice_id INT NOT NULL,
+    product_id INT NOT NULL,
+    quantity_sold DECIMAL(10, 3) NOT NULL,
+    unit_price DECIMAL(10, 2) NOT NULL, -- Price at the time of sale
+    item_total DECIMAL(10, 2) NOT NULL,
+    FOREIGN KEY (invoice_id) REFERENCES invoices(invoice_id) ON DELETE CASCADE,
+    FOREIGN KEY (product_id) REFERENCES products(product_id) -- No CASCADE DELETE (soft delete)
+);
+
+-- Daily sales rollups, kept up to date by invoice checkout (see rollups.py)
+CREATE TABLE IF NOT EXISTS daily_product_sales (
+    sales_date DATE NOT NULL,
+    product_id INT NOT NULL,
+    quantity_sold DECIMAL(14, 3) NOT NULL DEFAULT 0.000,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    line_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (sales_date, product_id),
+    FOREIGN KEY (product_id) REFERENCES products(product_id)
+);
+
+-- Idempotency keys of the JSON checkout API (POST /api/invoices)
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    idempotency_key VARCHAR(64) PRIMARY KEY,
+    request_hash CHAR(64) NOT NULL,
+    invoice_id INT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (invoice_id) REFERENCES invoices(invoice_id) ON DELETE CASCADE
+);
+
+-- Stock holds taken when products are added to a cart
+CREATE TABLE IF NOT EXISTS stock_reservations (
+    cart_id VARCHAR(32) NOT NULL,
+    product_id INT NOT NULL,
+    quantity DECIMAL(10, 3) NOT NULL,
+    expires_at DATETIME NOT NULL,
+    PRIMARY KEY (cart_id, product_id),
+    INDEX idx_stock_reservations_expires_at (expires_at),
+    FOREIGN KEY (product_id) REFERENCES products(product_id)
+);
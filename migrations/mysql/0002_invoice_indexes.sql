@@ -0,0 +1,17 @@
+-- Indexes for the hot invoice queries (checked by `python migrate.py check`).
+
+-- Invoice listing: keyset pagination on (invoice_date, invoice_id) and date
+-- range filters. Carries the listed columns, so a page is read from the index
+-- alone; the rollup backfill and export use it for their date ranges too.
+CREATE INDEX idx_invoices_listing
+    ON invoices (invoice_date, invoice_id, customer_name, grand_total);
+
+-- Customer name search: word-prefix MATCH ... AGAINST instead of LIKE '%name%'.
+-- The first FULLTEXT index on a table rebuilds it; run this off-peak.
+CREATE FULLTEXT INDEX ft_invoices_customer_name ON invoices (customer_name);
+
+-- Invoice detail and rollup backfill: items by invoice, covering the summed
+-- columns. Replaces the index MySQL created implicitly for the invoice_id
+-- foreign key.
+CREATE INDEX idx_invoice_items_invoice_product
+    ON invoice_items (invoice_id, product_id, quantity_sold, item_total);
@@ -0,0 +1,7 @@
+-- Indexes for the paginated product listing (Product.get_page).
+
+-- Sorting by stock (and the low-stock filter) and by last update. InnoDB
+-- appends the primary key, so each index is in (column, product_id) order,
+-- the listing's keyset order. Sorting by name uses the UNIQUE product_name index.
+CREATE INDEX idx_products_quantity ON products (quantity_available);
+CREATE INDEX idx_products_last_updated ON products (last_updated);
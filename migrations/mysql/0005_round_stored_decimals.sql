@@ -0,0 +1,3 @@
+-- Nothing to do on MySQL: its DECIMAL arithmetic is exact. The SQLite version
+-- of this migration rounds stock and rollup values stored with float error;
+-- it exists here too so both backends share one version sequence.
@@ -0,0 +1,49 @@
+-- Baseline schema, mirroring migrations/mysql/0001_initial_schema.sql. SQLite
+-- has no ON UPDATE for timestamps; every write path sets last_updated explicitly.
+
+CREATE TABLE IF NOT EXISTS products (
+    product_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_name VARCHAR(255) NOT NULL UNIQUE,
+    quantity_available DECIMAL(10, 3) NOT NULL DEFAULT 0.000,
+    unit_price DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    is_active TINYINT(1) DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS invoices (
+    invoice_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_name VARCHAR(255) NOT NULL,
+    grand_total DECIMAL(10, 2) NOT NULL,
+    invoice_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS invoice_items (
+    item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    invoice_id INT NOT NULL REFERENCES invoices (invoice_id) ON DELETE CASCADE,
+    product_id INT NOT NULL REFERENCES products (product_id),
+    quantity_sold DECIMAL(10, 3) NOT NULL,
+    unit_price DECIMAL(10, 2) NOT NULL,
+    item_total DECIMAL(10, 2) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_invoice_items_invoice_id ON invoice_items (invoice_id);
+CREATE TABLE IF NOT EXISTS daily_product_sales (
+    sales_date DATE NOT NULL,
+    product_id INT NOT NULL REFERENCES products (product_id),
+    quantity_sold DECIMAL(14, 3) NOT NULL DEFAULT 0.000,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    line_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (sales_date, product_id)
+);
+CREATE TABLE IF NOT EXISTS stock_reservations (
+    cart_id VARCHAR(32) NOT NULL,
+    product_id INT NOT NULL REFERENCES products (product_id),
+    quantity DECIMAL(10, 3) NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (cart_id, product_id)
+);
+CREATE INDEX IF NOT EXISTS idx_stock_reservations_expires_at ON stock_reservations (expires_at);
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    idempotency_key VARCHAR(64) PRIMARY KEY,
+    request_hash CHAR(64) NOT NULL,
+    invoice_id INT NOT NULL REFERENCES invoices (invoice_id) ON DELETE CASCADE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,11 @@
+-- Indexes for the hot invoice queries (checked by `python migrate.py check`).
+
+-- Invoice listing: keyset pagination, date range filters and the customer name
+-- LIKE, all answered from the index without reading the table.
+CREATE INDEX IF NOT EXISTS idx_invoices_listing
+    ON invoices (invoice_date, invoice_id, customer_name, grand_total);
+
+-- Invoice detail and rollup backfill: items by invoice, covering the summed columns.
+CREATE INDEX IF NOT EXISTS idx_invoice_items_invoice_product
+    ON invoice_items (invoice_id, product_id, quantity_sold, item_total);
+DROP INDEX IF EXISTS idx_invoice_items_invoice_id;
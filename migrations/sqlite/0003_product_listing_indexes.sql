@@ -0,0 +1,7 @@
+-- Indexes for the paginated product listing (Product.get_page).
+
+-- Sorting by stock (and the low-stock filter) and by last update. Index
+-- entries end with the rowid (product_id), the listing's tie-breaker. Sorting
+-- by name uses the UNIQUE product_name index.
+CREATE INDEX IF NOT EXISTS idx_products_quantity ON products (quantity_available);
+CREATE INDEX IF NOT EXISTS idx_products_last_updated ON products (last_updated);
@@ -0,0 +1,7 @@
+-- Per-product reorder levels for low-stock alerting (see low_stock.py).
+
+-- Stock (kgs) at or below which a product is reported as low; NULL = not tracked.
+ALTER TABLE products ADD COLUMN reorder_level DECIMAL(10, 3) DEFAULT NULL;
+
+-- Loading the tracked products reads only those with a reorder level.
+CREATE INDEX IF NOT EXISTS idx_products_reorder_level ON products (reorder_level);
@@ -0,0 +1,13 @@
+-- DECIMAL columns are stored as REAL in SQLite, and stock and rollup sums used
+-- to be written without rounding, leaving values such as 0.19999999999999998
+-- that refuse an exact sale of the remaining stock. Writes now round to the
+-- column's scale (SQLiteDialect.decimal); this repairs values already stored.
+
+UPDATE products SET quantity_available = ROUND(quantity_available, 3)
+WHERE quantity_available <> ROUND(quantity_available, 3);
+
+UPDATE stock_reservations SET quantity = ROUND(quantity, 3)
+WHERE quantity <> ROUND(quantity, 3);
+
+UPDATE daily_product_sales SET quantity_sold = ROUND(quantity_sold, 3), revenue = ROUND(revenue, 2)
+WHERE quantity_sold <> ROUND(quantity_sold, 3) OR revenue <> ROUND(revenue, 2);
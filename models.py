@@ -4,9 +4,159 @@ Business logic and database operations for the Retail Invoice Management System.
 Defines Product and Invoice classes for interacting with the database.
 """
 
-from database import get_db_connection, close_db_connection
-from datetime import datetime
-import mysql.connector
+from database import (
+    get_db_connection,
+    close_db_connection,
+    discard_db_connection,
+    dialect,
+    DatabaseError,
+    IntegrityError,
+)
+from cache import TTLCache, MISSING
+from money import to_paise, to_grams, rupees, kgs
+from rows import ProductRow, InvoiceRow, InvoiceItemRow
+from search_index import ProductSearchIndex
+from stock_log import StockLog, StockHistory
+from low_stock import AlertSink, LowStockIndex
+from change_feed import ChangeFeed, EVERYTHING
+from config import Config
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+import time
+
+# Read-through catalog caches. Rows are keyed by product_id; get_all() and name
+# searches are keyed by their normalized arguments. Every write path invalidates.
+_products_by_id = TTLCache(Config.PRODUCT_CACHE_SIZE, Config.PRODUCT_CACHE_TTL)
+_product_lists = TTLCache(Config.PRODUCT_CACHE_SIZE, Config.PRODUCT_CACHE_TTL)
+
+# Autocomplete index over product names, kept in sync by the write paths below.
+_search_index = ProductSearchIndex()
+
+# Every change to quantity_available is logged once committed (see stock_log.py).
+_stock_log = StockLog(
+    Config.STOCK_LOG_PATH, Config.STOCK_LOG_FLUSH_INTERVAL, Config.STOCK_LOG_BATCH_SIZE
+)
+_stock_history = StockHistory(Config.STOCK_LOG_PATH)
+
+# Products at or below their reorder level, re-checked on every stock change (see low_stock.py).
+_low_stock = LowStockIndex(
+    AlertSink(
+        Config.LOW_STOCK_ALERT_PATH, Config.LOW_STOCK_FLUSH_INTERVAL, Config.LOW_STOCK_BATCH_SIZE
+    )
+)
+
+# Product changes announced to the other worker processes once shared (see serve.py).
+_change_feed = ChangeFeed(Config.CHANGE_FEED_SLOTS)
+
+# Column list shared by every product read (also used by async_models.py), in ProductRow order.
+_PRODUCT_SELECT = (
+    "SELECT product_id, product_name, quantity_available, unit_price, last_updated, "
+    "is_active FROM products"
+)
+
+
+def _invalidate_product_cache(product_ids=None, stock=None, catalog=False):
+    """
+    Drop cached catalog data after a write, in this process and in the other workers.
+
+    Remove the rows for ``product_ids`` (every row if None) and all cached lists,
+    since any change can affect ordering, search results or the full listing.
+    The other workers also get ``stock`` (product_id -> committed change in
+    grams) for their low-stock indexes; ``catalog`` (a name, status or reorder
+    level changed) makes them reload their search and low-stock indexes.
+    """
+    _drop_cached_products(product_ids)
+    _change_feed.publish(product_ids, stock, catalog)
+
+
+def _drop_cached_products(product_ids=None):
+    """Drop this process's cached rows for ``product_ids`` (every row if None) and lists."""
+    if product_ids is None:
+        _products_by_id.clear()
+    else:
+        for product_id in product_ids:
+            _products_by_id.pop(int(product_id))
+    _product_lists.clear()
+
+
+def _stock_by_name(cursor, product_names, lock=False):
+    """Return {product_id: grams available} for the named products, optionally locking them."""
+    placeholders = ", ".join(["%s"] * len(product_names))
+    cursor.execute(
+        "SELECT product_id, quantity_available FROM products "
+        f"WHERE product_name IN ({placeholders})" + (dialect.for_update if lock else ""),
+        tuple(product_names),
+    )
+    return {product_id: to_grams(quantity) for product_id, quantity in cursor.fetchall()}
+
+
+# Products with a reorder level. Levels are never negative, so ">= 0" selects
+# them with a range scan of idx_products_reorder_level (SQLite will not use the
+# index for IS NOT NULL).
+_REORDER_LEVEL_COLUMNS = (
+    "product_id",
+    "product_name",
+    "quantity_available",
+    "reorder_level",
+    "is_active",
+)
+_REORDER_LEVELS_SQL = (
+    f"SELECT {', '.join(_REORDER_LEVEL_COLUMNS)} FROM products WHERE reorder_level >= 0"
+)
+
+
+def _load_low_stock(rows):
+    """Load the low-stock index from _REORDER_LEVELS_SQL rows (also used by async_models.py)."""
+    _low_stock.load(
+        (product_id, product_name, to_grams(quantity), to_grams(reorder_level), bool(is_active))
+        for product_id, product_name, quantity, reorder_level, is_active in rows
+    )
+
+
+def _refresh_low_stock(cursor=None):
+    """
+    Reload the low-stock index from the database if it is stale; return False on error.
+
+    Write paths pass the (plain or dictionary) ``cursor`` of the connection
+    they still hold, so that a reload does not check out a second one.
+    """
+    if not _low_stock.is_stale(Config.LOW_STOCK_REFRESH):
+        return True
+    if cursor is not None:
+        return _reload_low_stock(cursor)
+    conn = get_db_connection()
+    if not conn:
+        return False
+    cursor = conn.cursor()
+    try:
+        return _reload_low_stock(cursor)
+    finally:
+        close_db_connection(conn, cursor)
+
+
+def _reload_low_stock(cursor):
+    """Load the low-stock index with _REORDER_LEVELS_SQL on ``cursor``; return False on error."""
+    try:
+        cursor.execute(_REORDER_LEVELS_SQL)
+        rows = cursor.fetchall()
+    except DatabaseError as e:
+        print(f"Error loading reorder levels: {e}")
+        return False
+    if rows and isinstance(rows[0], dict):
+        rows = [tuple(row[column] for column in _REORDER_LEVEL_COLUMNS) for row in rows]
+    _load_low_stock(rows)
+    return True
+
+
+def _stock_changed(reason, changes, invoice_id=None, cursor=None):
+    """
+    Log committed stock changes and re-check the reorder levels of the products they touch.
+
+    ``cursor`` is the caller's, for a reload of the index (see _refresh_low_stock).
+    """
+    _stock_log.record(reason, changes, invoice_id)
+    _low_stock.apply(changes)
+    _refresh_low_stock(cursor)
 
 
 class Product:
@@ -24,11 +174,55 @@ class Product:
         """Initialize a Product instance."""
         self.product_id = product_id
         self.product_name = product_name
-        self.quantity_available = float(quantity_available)
-        self.unit_price = float(unit_price)
+        self.quantity_available = kgs(to_grams(quantity_available))
+        self.unit_price = rupees(to_paise(unit_price))
         self.last_updated = last_updated if last_updated else datetime.now()
         self.is_active = is_active
 
+    @staticmethod
+    def parse_fields(product_name, quantity_available, unit_price):
+        """
+        Validate raw product form/import values.
+
+        Return a (product_name, quantity_available, unit_price) tuple with the
+        numbers converted to Decimal kgs and rupees (rounded to whole grams and
+        paise). Raise ValueError with a user-facing message if a field is
+        missing, not a number or out of range.
+        """
+        product_name = str(product_name or "").strip()
+        quantity_str = str(quantity_available if quantity_available is not None else "").strip()
+        price_str = str(unit_price if unit_price is not None else "").strip()
+        if not product_name or not quantity_str or not price_str:
+            raise ValueError("All fields are required!")
+        try:
+            quantity = kgs(to_grams(quantity_str))
+            price = rupees(to_paise(price_str))
+        except ValueError:
+            raise ValueError("Invalid quantity or price format. Please enter numbers.") from None
+        if quantity < 0 or price <= 0:
+            raise ValueError("Quantity must be non-negative, Unit Price must be positive!")
+        return product_name, quantity, price
+
+    @staticmethod
+    def parse_reorder_level(reorder_level):
+        """
+        Validate a raw reorder level form value.
+
+        Return Decimal kgs (rounded to whole grams), or None if the value is
+        blank (no reorder level). Raise ValueError with a user-facing message if
+        it is not a non-negative number.
+        """
+        reorder_str = str(reorder_level if reorder_level is not None else "").strip()
+        if not reorder_str:
+            return None
+        try:
+            level = kgs(to_grams(reorder_str))
+        except ValueError:
+            raise ValueError("Invalid reorder level format. Please enter a number.") from None
+        if level < 0:
+            raise ValueError("Reorder level must be non-negative!")
+        return level
+
     def save(self):
         """
         Add a new product to the database.
@@ -63,11 +257,16 @@ class Product:
             )
             conn.commit()
             self.product_id = cursor.lastrowid
+            _invalidate_product_cache([self.product_id], catalog=True)
+            _stock_changed(
+                "create", {self.product_id: to_grams(self.quantity_available)}, cursor=cursor
+            )
+            _search_index.upsert(self.product_id, self.product_name, self.is_active)
             print(
                 f"Product '{self.product_name}' added successfully with ID " f"{self.product_id}!"
             )
             return True
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Error saving product: {e}")
             conn.rollback()
             return False
@@ -78,7 +277,11 @@ class Product:
         """
         Update an existing product in the database.
 
-        Return True on success, False otherwise.
+        ``quantity_available`` is taken as the stock on hand, e.g. a physical
+        count: it includes stock held for carts (StockReservation), which stays
+        held. The holds are subtracted before it is stored, so that their
+        release or sale does not count them twice. Return True on success,
+        False otherwise (also when more is held than is on hand).
         """
         if not self.product_id:
             print("Error: Cannot update product without product_id.")
@@ -88,6 +291,24 @@ class Product:
             return False
         cursor = conn.cursor()
         try:
+            conn.start_transaction()
+            cursor.execute(
+                "SELECT quantity_available FROM products WHERE product_id = %s"
+                + dialect.for_update,
+                (self.product_id,),
+            )
+            previous = cursor.fetchone()
+            # Holds change only together with the product row, which is now locked.
+            cursor.execute(_HELD_SQL, (self.product_id,))
+            held = to_grams(cursor.fetchone()[0])
+            available = to_grams(self.quantity_available) - held
+            if available < 0:
+                print(
+                    f"Error updating product: {kgs(held)} kgs are held for carts, more than "
+                    f"the {self.quantity_available} kgs on hand."
+                )
+                conn.rollback()
+                return False
             sql = (
                 "UPDATE products SET product_name = %s, quantity_available = %s, "
                 "unit_price = %s, last_updated = %s, is_active = %s "
@@ -97,7 +318,7 @@ class Product:
                 sql,
                 (
                     self.product_name,
-                    self.quantity_available,
+                    kgs(available),
                     self.unit_price,
                     datetime.now(),
                     self.is_active,
@@ -105,15 +326,80 @@ class Product:
                 ),
             )
             conn.commit()
+            _invalidate_product_cache([self.product_id], catalog=True)
+            _search_index.upsert(self.product_id, self.product_name, self.is_active)
+            _low_stock.set_product(self.product_id, self.product_name, self.is_active)
+            if previous:
+                change = available - to_grams(previous[0])
+                _stock_changed("edit", {self.product_id: change}, cursor=cursor)
             print(f"Product '{self.product_name}' (ID: {self.product_id}) updated " "successfully!")
             return True
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Error updating product: {e}")
             conn.rollback()
             return False
         finally:
             close_db_connection(conn, cursor)
 
+    @staticmethod
+    def bulk_upsert(rows, chunk_size=1000):
+        """
+        Insert or update many products by name with one upsert statement per chunk.
+
+        ``rows`` is a list of validated (product_name, quantity_available,
+        unit_price) tuples. New products are created active; existing ones get
+        the new quantity and price and keep their active flag. Each chunk of
+        ``chunk_size`` rows is one multi-row statement and one commit. Return the
+        number of rows written, or None if the import failed (earlier chunks stay
+        committed).
+        """
+        conn = get_db_connection()
+        if not conn:
+            return None
+        cursor = conn.cursor()
+        written = 0
+        try:
+            sql = (
+                "INSERT INTO products (product_name, quantity_available, unit_price, "
+                "last_updated, is_active) VALUES (%s, %s, %s, %s, 1) "
+                + dialect.upsert(
+                    ["product_name"],
+                    replace=["quantity_available", "unit_price", "last_updated"],
+                )
+            )
+            for start in range(0, len(rows), chunk_size):
+                end = start + chunk_size
+                now = datetime.now()
+                chunk = [(name, qty, price, now) for name, qty, price in rows[start:end]]
+                if _stock_log.enabled:
+                    names = [row[0] for row in chunk]
+                    conn.start_transaction()
+                    previous = _stock_by_name(cursor, names, lock=True)
+                    cursor.executemany(sql, chunk)
+                    changes = {
+                        product_id: grams - previous.get(product_id, 0)
+                        for product_id, grams in _stock_by_name(cursor, names).items()
+                    }
+                    conn.commit()
+                    _stock_changed("import", changes, cursor=cursor)
+                else:
+                    cursor.executemany(sql, chunk)
+                    conn.commit()
+                written += len(chunk)
+            print(f"Bulk upserted {written} products.")
+            return written
+        except DatabaseError as e:
+            print(f"Error bulk upserting products after {written} rows: {e}")
+            conn.rollback()
+            return None
+        finally:
+            close_db_connection(conn, cursor)
+            if written:
+                _invalidate_product_cache(catalog=True)
+                _search_index.invalidate()
+                if not _stock_log.enabled:
+                    _low_stock.invalidate()  # Stock changes were not read back
+
     @staticmethod
     def inactivate(product_id):
         """
@@ -129,9 +415,13 @@ class Product:
             sql = "UPDATE products SET is_active = 0, last_updated = %s " "WHERE product_id = %s"
             cursor.execute(sql, (datetime.now(), product_id))
             conn.commit()
+            _invalidate_product_cache([product_id], catalog=True)
+            if not _search_index.set_active(product_id, False):
+                _search_index.invalidate()
+            _low_stock.set_product(product_id, is_active=False)
             print(f"Product with ID {product_id} inactivated successfully " "(soft deleted)!")
             return True
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Error inactivating product: {e}")
             conn.rollback()
             return False
@@ -153,9 +443,13 @@ class Product:
             sql = "UPDATE products SET is_active = 1, last_updated = %s " "WHERE product_id = %s"
             cursor.execute(sql, (datetime.now(), product_id))
             conn.commit()
+            _invalidate_product_cache([product_id], catalog=True)
+            if not _search_index.set_active(product_id, True):
+                _search_index.invalidate()
+            _low_stock.set_product(product_id, is_active=True)
             print(f"Product with ID {product_id} activated successfully!")
             return True
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Error activating product: {e}")
             conn.rollback()
             return False
@@ -167,80 +461,367 @@ class Product:
         """
         Fetch all products from the database (both active and inactive).
 
-        Return a list of dictionaries, each representing a product.
+        Return a list of ProductRow. Results are served from the catalog cache
+        when possible.
         """
+        cached = _product_lists.get(("all",))
+        if cached is not MISSING:
+            return list(cached)
         conn = get_db_connection()
         if not conn:
             return []
-        cursor = conn.cursor(dictionary=True)
+        cursor = conn.cursor()
         try:
-            cursor.execute(
-                "SELECT product_id, product_name, quantity_available, unit_price, "
-                "last_updated, is_active FROM products ORDER BY product_name ASC"
-            )
-            products = cursor.fetchall()
-            return products
-        except mysql.connector.Error as e:
+            cursor.execute(_PRODUCT_SELECT + " ORDER BY product_name ASC")
+            products = list(map(ProductRow._make, cursor.fetchall()))
+            _product_lists.set(("all",), products)
+            return list(products)
+        except DatabaseError as e:
             print(f"Error fetching products: {e}")
             return []
         finally:
             close_db_connection(conn, cursor)
 
+    @staticmethod
+    def get_page(
+        page_size,
+        cursor=None,
+        direction="next",
+        sort="name",
+        descending=False,
+        active=None,
+        max_stock=None,
+        min_price=None,
+        max_price=None,
+        search=None,
+    ):
+        """
+        Fetch one keyset-paginated page of products.
+
+        Products are ordered by ``sort`` (a PRODUCT_SORTS key), ascending unless
+        ``descending``, then by product_id, and filtered as described in
+        _product_filters. ``cursor`` is a value from a previous page of the same
+        ordering and ``direction`` is "next" or "prev". Return a dictionary with
+        keys ``products`` (a list of ProductRow), ``next_cursor`` and
+        ``prev_cursor``.
+        """
+        empty = {"products": [], "next_cursor": None, "prev_cursor": None}
+        conn = get_db_connection()
+        if not conn:
+            return empty
+        db_cursor = conn.cursor()
+        try:
+            conditions, params = _product_filters(active, max_stock, min_price, max_price, search)
+            sql, page_params, position, backwards = _product_page_query(
+                conditions, params, sort, descending, page_size, cursor, direction
+            )
+            db_cursor.execute(sql, page_params)
+            products, next_cursor, prev_cursor = _keyset_page(
+                list(map(ProductRow._make, db_cursor.fetchall())),
+                page_size,
+                position,
+                backwards,
+                lambda product: _encode_product_cursor(sort, product),
+            )
+            return {"products": products, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
+        except DatabaseError as e:
+            print(f"Error fetching products: {e}")
+            return empty
+        finally:
+            close_db_connection(conn, db_cursor)
+
     @staticmethod
     def get_by_id(product_id):
         """
         Fetch a single product by its ID.
 
-        Return a dictionary if found, None otherwise.
+        Return a ProductRow if found, None otherwise. The row may come from the
+        catalog cache; checkout re-reads stock under a row lock in Invoice.save.
         """
+        cached = _products_by_id.get(int(product_id))
+        if cached is not MISSING:
+            return cached
         conn = get_db_connection()
         if not conn:
             return None
-        cursor = conn.cursor(dictionary=True)
+        cursor = conn.cursor()
         try:
-            cursor.execute(
-                "SELECT product_id, product_name, quantity_available, unit_price, "
-                "last_updated, is_active FROM products WHERE product_id = %s",
-                (product_id,),
-            )
-            product = cursor.fetchone()
-            return product
-        except mysql.connector.Error as e:
+            cursor.execute(_PRODUCT_SELECT + " WHERE product_id = %s", (product_id,))
+            row = cursor.fetchone()
+            if row:
+                product = ProductRow._make(row)
+                _products_by_id.set(int(product_id), product)
+                return product
+            return None
+        except DatabaseError as e:
             print(f"Error fetching product by ID: {e}")
             return None
         finally:
             close_db_connection(conn, cursor)
 
+    @staticmethod
+    def get_by_ids(product_ids):
+        """
+        Fetch several products by ID with at most one query.
+
+        Cached rows are used where available and the rest are read with a single
+        ``WHERE product_id IN (...)``. Return a dictionary mapping product_id to
+        ProductRow; unknown IDs are absent.
+        """
+        found = {}
+        missing = []
+        for product_id in {int(pid) for pid in product_ids}:
+            cached = _products_by_id.get(product_id)
+            if cached is not MISSING:
+                found[product_id] = cached
+            else:
+                missing.append(product_id)
+        if not missing:
+            return found
+        conn = get_db_connection()
+        if not conn:
+            return found
+        cursor = conn.cursor()
+        try:
+            placeholders = ", ".join(["%s"] * len(missing))
+            cursor.execute(
+                _PRODUCT_SELECT + f" WHERE product_id IN ({placeholders})", tuple(missing)
+            )
+            for product in map(ProductRow._make, cursor.fetchall()):
+                _products_by_id.set(product.product_id, product)
+                found[product.product_id] = product
+            return found
+        except DatabaseError as e:
+            print(f"Error fetching products by ID: {e}")
+            return found
+        finally:
+            close_db_connection(conn, cursor)
+
     @staticmethod
     def get_by_name_like(search_term, include_inactive=False):
         """
         Search for products by name (case-insensitive, partial match).
 
         By default, only return active products. Set include_inactive=True to get
-        all. Return a list of dictionaries.
+        all. Return a list of ProductRow (cached by normalized term).
         """
+        cache_key = ("name", search_term.strip().lower(), bool(include_inactive))
+        cached = _product_lists.get(cache_key)
+        if cached is not MISSING:
+            return list(cached)
         conn = get_db_connection()
         if not conn:
             return []
-        cursor = conn.cursor(dictionary=True)
+        cursor = conn.cursor()
         try:
-            sql = (
-                "SELECT product_id, product_name, quantity_available, unit_price, "
-                "last_updated, is_active FROM products WHERE product_name LIKE %s"
-            )
+            sql = _PRODUCT_SELECT + " WHERE product_name LIKE %s"
             params = [f"%{search_term}%"]
             if not include_inactive:
                 sql += " AND is_active = 1"
             sql += " ORDER BY product_name ASC"
             cursor.execute(sql, tuple(params))
-            products = cursor.fetchall()
-            return products
-        except mysql.connector.Error as e:
+            products = list(map(ProductRow._make, cursor.fetchall()))
+            _product_lists.set(cache_key, products)
+            return list(products)
+        except DatabaseError as e:
             print(f"Error searching products by name: {e}")
             return []
         finally:
             close_db_connection(conn, cursor)
 
+    @staticmethod
+    def search_names(search_term, limit=10, include_inactive=False):
+        """
+        Return ranked autocomplete matches for ``search_term`` from the in-memory index.
+
+        The index is (re)built from the catalog on first use and every
+        SEARCH_INDEX_REFRESH seconds. Return a list of dictionaries with
+        product_id and product_name.
+        """
+        if _search_index.is_stale(Config.SEARCH_INDEX_REFRESH):
+            _search_index.load(Product.get_all())
+        return [
+            {"product_id": product_id, "product_name": product_name}
+            for product_id, product_name in _search_index.search(
+                search_term, limit=limit, include_inactive=include_inactive
+            )
+        ]
+
+    @staticmethod
+    def cache_stats():
+        """Return hit/miss counters for the product row and list caches."""
+        return {"rows": _products_by_id.stats(), "lists": _product_lists.stats()}
+
+    @staticmethod
+    def stock_at(product_id, at=None, include_holds=True):
+        """
+        Return a product's stock in grams at ``at`` (a datetime, default now), from the stock log.
+
+        Events queued by this process are written first; see StockHistory.stock_at
+        for ``include_holds``.
+        """
+        _stock_log.flush()
+        return _stock_history.stock_at(int(product_id), at, include_holds)
+
+    @staticmethod
+    def stock_movements(product_id, start=None, end=None):
+        """Return a product's stock log events between two datetimes; see StockHistory.events."""
+        _stock_log.flush()
+        return _stock_history.events(int(product_id), start, end)
+
+    @staticmethod
+    def stock_log_stats():
+        """Return the stock log writer's queue and write counters."""
+        return _stock_log.stats()
+
+    @staticmethod
+    def set_reorder_level(product_id, reorder_level):
+        """
+        Set a product's reorder level in kgs, or stop tracking its stock with None.
+
+        Return True on success, False otherwise.
+        """
+        conn = get_db_connection()
+        if not conn:
+            return False
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "UPDATE products SET reorder_level = %s, last_updated = %s WHERE product_id = %s",
+                (reorder_level, datetime.now(), product_id),
+            )
+            cursor.execute(
+                "SELECT product_name, quantity_available, is_active FROM products "
+                "WHERE product_id = %s",
+                (product_id,),
+            )
+            row = cursor.fetchone()
+            conn.commit()
+            if row is None:
+                print(f"Error: Product with ID {product_id} not found.")
+                return False
+            _invalidate_product_cache([product_id], catalog=True)
+            product_name, quantity, is_active = row
+            _low_stock.set_reorder_level(
+                product_id,
+                product_name,
+                to_grams(quantity),
+                None if reorder_level is None else to_grams(reorder_level),
+                is_active,
+            )
+            return True
+        except DatabaseError as e:
+            print(f"Error setting reorder level: {e}")
+            conn.rollback()
+            return False
+        finally:
+            close_db_connection(conn, cursor)
+
+    @staticmethod
+    def reorder_level(product_id):
+        """Return a product's reorder level as Decimal kgs, or None if it has none."""
+        _refresh_low_stock()
+        grams = _low_stock.reorder_level(product_id)
+        return None if grams is None else kgs(grams)
+
+    @staticmethod
+    def low_stock(limit=None):
+        """
+        Return active products at or below their reorder level, longest low first.
+
+        Answered from the in-memory low-stock index; see LowStockIndex.low.
+        """
+        _refresh_low_stock()
+        return _low_stock.low(limit)
+
+    @staticmethod
+    def low_stock_stats():
+        """Return the low-stock index and alert sink counters."""
+        return _low_stock.stats()
+
+    @staticmethod
+    def preload_catalog():
+        """
+        Fill the product caches, search index and low-stock index from the database.
+
+        The pre-fork server (serve.py) calls this in its master process, so that
+        workers start warm and share the loaded data copy-on-write. Return the
+        number of products loaded.
+        """
+        products = Product.get_all()
+        for product in products:
+            _products_by_id.set(product.product_id, product)
+        _search_index.load(products)
+        _refresh_low_stock()
+        return len(products)
+
+    @staticmethod
+    def apply_remote_changes():
+        """
+        Catch up with product changes other worker processes have published.
+
+        Their cached rows are dropped and their stock changes applied to the
+        low-stock index (without alerts: the publishing worker raised them). A
+        name, status or reorder level change reloads the search and low-stock
+        indexes. Does nothing unless the change feed is shared (see serve.py).
+        """
+        changes = _change_feed.poll()
+        if changes is None:
+            return
+        if changes is EVERYTHING:
+            _drop_cached_products()
+            _search_index.invalidate()
+            _low_stock.invalidate(alerts=False)
+            return
+        product_ids, stock, catalog = changes
+        _drop_cached_products(product_ids)
+        if catalog:
+            _search_index.invalidate()
+            _low_stock.invalidate(alerts=False)
+        else:
+            _low_stock.apply(stock, alerts=False)
+
+    @staticmethod
+    def change_feed_stats():
+        """Return this process's cross-worker change feed counters."""
+        return _change_feed.stats()
+
+    @staticmethod
+    def record_opening_stock():
+        """
+        Log the current stock of every product that has no stock log events yet.
+
+        Run once when the log is started on a database that already holds stock,
+        while no sales are being made, so that replays start from the right
+        quantity. Return the number of products logged, or None on error.
+        """
+        if not _stock_log.enabled:
+            print("Error: the stock log is disabled (Config.STOCK_LOG_PATH).")
+            return None
+        conn = get_db_connection()
+        if not conn:
+            return None
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT product_id, quantity_available FROM products")
+            rows = cursor.fetchall()
+        except DatabaseError as e:
+            print(f"Error reading product stock: {e}")
+            return None
+        finally:
+            close_db_connection(conn, cursor)
+        _stock_log.flush()
+        logged = _stock_history.product_ids()
+        opening = {
+            product_id: to_grams(quantity)
+            for product_id, quantity in rows
+            if product_id not in logged and quantity
+        }
+        _stock_log.record("opening", opening)
+        _stock_log.flush()
+        print(f"Logged the opening stock of {len(opening)} products.")
+        return len(opening)
+
     @staticmethod
     def update_quantity(product_id, quantity_change):
         """
@@ -255,13 +836,19 @@ class Product:
         cursor = conn.cursor()
         try:
             sql = (
-                "UPDATE products SET quantity_available = quantity_available + %s, "
+                "UPDATE products SET quantity_available = "
+                f"{dialect.decimal('quantity_available + %s', 3)}, "
                 "last_updated = %s WHERE product_id = %s"
             )
-            cursor.execute(sql, (float(quantity_change), datetime.now(), product_id))
+            change = to_grams(quantity_change)
+            cursor.execute(sql, (kgs(change), datetime.now(), product_id))
+            updated = cursor.rowcount
             conn.commit()
+            _invalidate_product_cache([product_id], stock={product_id: change} if updated else None)
+            if updated:
+                _stock_changed("adjust", {product_id: change}, cursor=cursor)
             return True
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Error updating product quantity: {e}")
             conn.rollback()
             return False
@@ -269,6 +856,468 @@ class Product:
             close_db_connection(conn, cursor)
 
 
+# Product listing sort keys -> indexed column; product_id breaks ties.
+PRODUCT_SORTS = {
+    "name": "product_name",
+    "stock": "quantity_available",
+    "last_updated": "last_updated",
+}
+
+
+def _encode_product_cursor(sort, product):
+    """Encode a product row's position in a ``sort`` ordering as a URL-safe string."""
+    value = product[PRODUCT_SORTS[sort]]
+    if sort == "last_updated":
+        value = f"{value:%Y%m%d%H%M%S}"
+    return f"{value}-{product['product_id']}"
+
+
+def _decode_product_cursor(sort, value):
+    """
+    Decode a cursor produced by _encode_product_cursor for the same ``sort``.
+
+    Return a (sort value, product_id) tuple, or None if the cursor is malformed.
+    """
+    try:
+        sort_part, id_part = value.rsplit("-", 1)
+        if sort == "stock":
+            sort_part = Decimal(sort_part)
+        elif sort == "last_updated":
+            sort_part = datetime.strptime(sort_part, "%Y%m%d%H%M%S")
+        return sort_part, int(id_part)
+    except (AttributeError, ValueError, InvalidOperation):
+        return None
+
+
+def _product_filters(active=None, max_stock=None, min_price=None, max_price=None, search=None):
+    """
+    Build the WHERE conditions of a product listing.
+
+    ``active`` is True/False to keep only active/inactive products, ``max_stock``
+    a low-stock threshold in kgs and ``min_price``/``max_price`` a unit price
+    range. ``search`` is a substring of the product name. Return a
+    (conditions, params) pair.
+    """
+    conditions = []
+    params = []
+    if active is not None:
+        conditions.append("is_active = %s")
+        params.append(1 if active else 0)
+    if max_stock is not None:
+        conditions.append("quantity_available <= %s")
+        params.append(max_stock)
+    if min_price is not None:
+        conditions.append("unit_price >= %s")
+        params.append(min_price)
+    if max_price is not None:
+        conditions.append("unit_price <= %s")
+        params.append(max_price)
+    if search:
+        conditions.append("product_name LIKE %s")
+        params.append(f"%{search}%")
+    return conditions, params
+
+
+def _product_page_query(conditions, params, sort, descending, page_size, cursor, direction):
+    """
+    Build the keyset query for one page of products sorted by ``sort``.
+
+    Rows are read along the sort column's index from the cursor position, so a
+    page costs the same however deep it is. One extra row is requested to tell
+    whether another page follows. Return a (sql, params, position, backwards)
+    tuple to pass on to _keyset_page.
+    """
+    column = PRODUCT_SORTS[sort]
+    position = _decode_product_cursor(sort, cursor) if cursor else None
+    backwards = direction == "prev" and position is not None
+    reverse = descending != backwards
+    page_conditions = list(conditions)
+    page_params = list(params)
+    if position:
+        op = "<" if reverse else ">"
+        page_conditions.append(f"({column} {op} %s OR ({column} = %s AND product_id {op} %s))")
+        page_params.extend([position[0], position[0], position[1]])
+    order = "DESC" if reverse else "ASC"
+    sql = _PRODUCT_SELECT
+    if page_conditions:
+        sql += " WHERE " + " AND ".join(page_conditions)
+    sql += f" ORDER BY {column} {order}, product_id {order} LIMIT %s"
+    page_params.append(int(page_size) + 1)
+    return sql, tuple(page_params), position, backwards
+
+
+def _keyset_page(rows, page_size, position, backwards, encode):
+    """
+    Turn the rows fetched by a keyset page query into a page.
+
+    ``encode`` turns a row into a cursor. Return a (rows, next_cursor,
+    prev_cursor) tuple in listing order.
+    """
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+    next_cursor = prev_cursor = None
+    if rows:
+        if has_more or backwards:
+            next_cursor = encode(rows[-1])
+        if (has_more and backwards) or (position and not backwards):
+            prev_cursor = encode(rows[0])
+    return rows, next_cursor, prev_cursor
+
+
+def _encode_cursor(invoice):
+    """Encode an invoice row's (invoice_date, invoice_id) position as a URL-safe string."""
+    return f"{invoice['invoice_date']:%Y%m%d%H%M%S}-{invoice['invoice_id']}"
+
+
+def _decode_cursor(value):
+    """
+    Decode a pagination cursor produced by _encode_cursor.
+
+    Return an (invoice_date, invoice_id) tuple, or None if the cursor is malformed.
+    """
+    try:
+        date_part, id_part = value.split("-", 1)
+        return datetime.strptime(date_part, "%Y%m%d%H%M%S"), int(id_part)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _invoice_filters(start_date, end_date, customer_name, alias=""):
+    """
+    Build the WHERE conditions shared by the invoice listing and export queries.
+
+    ``alias`` is the table alias prefix (e.g. "i.") used in joined queries.
+    The customer name is matched with dialect.name_search. Return a
+    (conditions, params) pair.
+    """
+    conditions = []
+    params = []
+    if start_date:
+        conditions.append(f"{alias}invoice_date >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append(f"{alias}invoice_date <= %s")
+        params.append(end_date)
+    if customer_name:
+        condition, name_params = dialect.name_search(f"{alias}customer_name", customer_name)
+        conditions.append(condition)
+        params.extend(name_params)
+    return conditions, params
+
+
+_INVOICE_HEADER_SELECT = "SELECT invoice_id, invoice_date, customer_name, grand_total FROM invoices"
+
+_INVOICE_ITEMS_SELECT = (
+    "SELECT ii.invoice_id, ii.item_id, ii.product_id, ii.quantity_sold, ii.unit_price, "
+    "ii.item_total, p.product_name FROM invoice_items ii "
+    "JOIN products p ON ii.product_id = p.product_id"
+)
+
+_IDEMPOTENCY_LOOKUP_SQL = (
+    "SELECT k.invoice_id, k.request_hash, i.grand_total FROM idempotency_keys k "
+    "JOIN invoices i ON i.invoice_id = k.invoice_id WHERE k.idempotency_key = %s"
+)
+_INSERT_INVOICE_SQL = (
+    "INSERT INTO invoices (customer_name, grand_total, invoice_date) VALUES (%s, %s, %s)"
+)
+_INSERT_IDEMPOTENCY_KEY_SQL = (
+    "INSERT INTO idempotency_keys (idempotency_key, request_hash, invoice_id, created_at) "
+    "VALUES (%s, %s, %s, %s)"
+)
+_INSERT_INVOICE_ITEM_SQL = (
+    "INSERT INTO invoice_items (invoice_id, product_id, quantity_sold, unit_price, item_total) "
+    "VALUES (%s, %s, %s, %s, %s)"
+)
+
+
+def _lookup_idempotency_key(cursor, idempotency_key):
+    """Return the stored row (invoice_id, request_hash, grand_total) for a key, or None."""
+    cursor.execute(_IDEMPOTENCY_LOOKUP_SQL, (idempotency_key,))
+    return cursor.fetchone()
+
+
+def _invoice_page_query(conditions, params, page_size, cursor, direction):
+    """
+    Build the keyset query for one page of invoices.
+
+    ``conditions`` and ``params`` come from _invoice_filters. Each row carries
+    its ``item_count``, counted in the same query from the invoice_items index.
+    One extra row is requested to tell whether another page follows. Return a (sql, params,
+    position, backwards) tuple to pass on to _invoice_page.
+    """
+    position = _decode_cursor(cursor) if cursor else None
+    backwards = direction == "prev" and position is not None
+    page_conditions = list(conditions)
+    page_params = list(params)
+    if position:
+        op = ">" if backwards else "<"
+        page_conditions.append(
+            f"(invoice_date {op} %s OR (invoice_date = %s AND invoice_id {op} %s))"
+        )
+        page_params.extend([position[0], position[0], position[1]])
+    order = "ASC" if backwards else "DESC"
+    sql = (
+        "SELECT invoice_id, invoice_date, customer_name, grand_total, "
+        "(SELECT COUNT(*) FROM invoice_items ii WHERE ii.invoice_id = invoices.invoice_id) "
+        "AS item_count FROM invoices"
+    )
+    if page_conditions:
+        sql += " WHERE " + " AND ".join(page_conditions)
+    sql += f" ORDER BY invoice_date {order}, invoice_id {order} LIMIT %s"
+    page_params.append(int(page_size) + 1)
+    return sql, tuple(page_params), position, backwards
+
+
+def _invoice_batch_queries(invoice_ids):
+    """
+    Build the two set-based queries behind Invoice.get_many.
+
+    Return ((header_sql, params), (items_sql, params)) for the given invoice IDs.
+    """
+    placeholders = ", ".join(["%s"] * len(invoice_ids))
+    params = tuple(invoice_ids)
+    return (
+        (_INVOICE_HEADER_SELECT + f" WHERE invoice_id IN ({placeholders})", params),
+        (
+            _INVOICE_ITEMS_SELECT
+            + f" WHERE ii.invoice_id IN ({placeholders}) ORDER BY ii.invoice_id, ii.item_id",
+            params,
+        ),
+    )
+
+
+def _group_invoice_items(headers, items):
+    """
+    Build InvoiceRows with their InvoiceItemRows from the rows of _invoice_batch_queries.
+
+    Return a dictionary keyed by invoice_id.
+    """
+    invoices = {}
+    for header in headers:
+        invoices[header[0]] = InvoiceRow(*header, items=[])
+    for item in map(InvoiceItemRow._make, items):
+        invoice = invoices.get(item.invoice_id)
+        if invoice:
+            invoice.items.append(item)
+    return invoices
+
+
+def _invoice_page(invoices, page_size, position, backwards):
+    """
+    Turn the rows fetched by an _invoice_page_query into a page.
+
+    Return an (invoices, next_cursor, prev_cursor) tuple with a list of InvoiceRow,
+    newest invoice first.
+    """
+    invoices = [InvoiceRow(*row) for row in invoices]
+    return _keyset_page(invoices, page_size, position, backwards, _encode_cursor)
+
+
+def _aggregate_invoice_lines(items):
+    """
+    Sum an invoice's lines per product.
+
+    Repeated lines for the same product must be checked against stock together.
+    Return (quantities, revenues, line_counts) dictionaries keyed by product_id,
+    in grams and paise. Raise ValueError if there are no lines.
+    """
+    quantities = {}
+    revenues = {}
+    line_counts = {}
+    for item in items:
+        product_id = int(item["product_id"])
+        quantities[product_id] = quantities.get(product_id, 0) + item["quantity_grams"]
+        revenues[product_id] = revenues.get(product_id, 0) + item["item_total_paise"]
+        line_counts[product_id] = line_counts.get(product_id, 0) + 1
+    if not quantities:
+        raise ValueError("Cannot save an invoice without items.")
+    return quantities, revenues, line_counts
+
+
+def _stock_rows_sql(product_count):
+    """Return the statement reading the stock columns of ``product_count`` products."""
+    placeholders = ", ".join(["%s"] * product_count)
+    return (
+        "SELECT product_id, product_name, quantity_available, is_active "
+        f"FROM products WHERE product_id IN ({placeholders})"
+    )
+
+
+def _check_stock(quantities, products):
+    """
+    Explain why ``quantities`` (grams) cannot be taken from ``products`` (rows keyed by product_id).
+
+    Raise ValueError if a product is missing, inactive or short of stock;
+    otherwise (the stock changed under us) raise a ValueError asking to retry.
+    """
+    for product_id, quantity_sold in quantities.items():
+        product_in_db = products.get(product_id)
+        if not product_in_db:
+            raise ValueError(f"Product with ID {product_id} not found.")
+        elif product_in_db["is_active"] == 0:
+            raise ValueError(
+                f"Product '{product_in_db['product_name']}' is currently "
+                "inactive and cannot be sold."
+            )
+        elif to_grams(product_in_db["quantity_available"]) < quantity_sold:
+            raise ValueError(
+                f"Insufficient stock for product: "
+                f"{product_in_db['product_name']}. Only "
+                f"{product_in_db['quantity_available']:.3f} kgs "
+                f"available, tried to sell {kgs(quantity_sold)} kgs."
+            )
+    raise ValueError("Stock changed while the sale was being saved. Please try again.")
+
+
+def _invoice_item_rows(invoice_id, items):
+    """Return the invoice_items parameter tuples for an invoice's lines."""
+    return [
+        (
+            invoice_id,
+            item["product_id"],
+            kgs(item["quantity_grams"]),
+            rupees(item["unit_price_paise"]),
+            rupees(item["item_total_paise"]),
+        )
+        for item in items
+    ]
+
+
+def _case_params(quantities):
+    """Return the (product_id, kgs) pairs of a stock CASE expression, flattened."""
+    params = []
+    for product_id, quantity_grams in quantities.items():
+        params.append(product_id)
+        params.append(kgs(quantity_grams))
+    return params
+
+
+def _take_stock(quantities):
+    """
+    Return (sql, params) atomically decrementing stock by ``quantities`` (grams per product).
+
+    A product is only updated if it is active and has at least the requested
+    quantity available, so there is no read-then-write race: the statement's
+    rowcount equals ``len(quantities)`` exactly when every product had enough.
+    """
+    case = "CASE product_id " + " ".join(["WHEN %s THEN %s"] * len(quantities)) + " END"
+    case_params = _case_params(quantities)
+    placeholders = ", ".join(["%s"] * len(quantities))
+    sql = (
+        "UPDATE products SET quantity_available = "
+        f"{dialect.decimal(f'quantity_available - {case}', 3)}, "
+        f"last_updated = %s WHERE product_id IN ({placeholders}) AND is_active = 1 "
+        f"AND quantity_available >= {case}"
+    )
+    params = case_params + [datetime.now()] + list(quantities) + case_params
+    return sql, tuple(params)
+
+
+def _return_stock(quantities):
+    """Return (sql, params) adding ``quantities`` (grams per product) back to stock."""
+    case = "CASE product_id " + " ".join(["WHEN %s THEN %s"] * len(quantities)) + " END"
+    placeholders = ", ".join(["%s"] * len(quantities))
+    sql = (
+        "UPDATE products SET quantity_available = "
+        f"{dialect.decimal(f'quantity_available + {case}', 3)}, "
+        f"last_updated = %s WHERE product_id IN ({placeholders})"
+    )
+    params = _case_params(quantities)
+    params.append(datetime.now())
+    params.extend(quantities)
+    return sql, tuple(params)
+
+
+def _take_stock_or_raise(cursor, quantities):
+    """
+    Decrement stock for ``quantities`` with _take_stock on the caller's (dictionary) cursor.
+
+    If any product is short, raise ValueError explaining which one; the caller
+    rolls back, undoing the products that were decremented.
+    """
+    cursor.execute(*_take_stock(quantities))
+    if cursor.rowcount != len(quantities):
+        cursor.execute(_stock_rows_sql(len(quantities)), tuple(quantities))
+        _check_stock(quantities, {row["product_id"]: row for row in cursor.fetchall()})
+
+
+# Stock of one product held for carts (stock_reservations is small: holds are short-lived).
+_HELD_SQL = "SELECT COALESCE(SUM(quantity), 0) FROM stock_reservations WHERE product_id = %s"
+
+
+def _consume_holds(cursor, cart_id):
+    """
+    Lock and delete a cart's stock holds on the caller's (dictionary) cursor.
+
+    Return a dictionary mapping product_id to the held grams. Expired holds
+    that have not been swept yet still count: their stock was never returned.
+    """
+    cursor.execute(
+        "SELECT product_id, quantity FROM stock_reservations WHERE cart_id = %s"
+        + dialect.for_update,
+        (cart_id,),
+    )
+    held = {row["product_id"]: to_grams(row["quantity"]) for row in cursor.fetchall()}
+    if held:
+        cursor.execute("DELETE FROM stock_reservations WHERE cart_id = %s", (cart_id,))
+    return held
+
+
+def _settle_holds(held, quantities):
+    """
+    Compare a cart's stock holds with the quantities being sold (both in grams).
+
+    Return (shortfall, surplus): what must still be taken from stock because no
+    (or too small a) hold covers it, and held stock that was not sold and goes back.
+    """
+    shortfall = {}
+    for product_id, quantity in quantities.items():
+        missing = quantity - held.get(product_id, 0)
+        if missing > 0:
+            shortfall[product_id] = missing
+    surplus = {}
+    for product_id, quantity in held.items():
+        extra = quantity - quantities.get(product_id, 0)
+        if extra > 0:
+            surplus[product_id] = extra
+    return shortfall, surplus
+
+
+def _daily_sales_rows(quantities, revenues, line_counts):
+    """Return the DailySales.record lines for an invoice's aggregated totals."""
+    return [
+        (
+            product_id,
+            kgs(quantities[product_id]),
+            rupees(revenues[product_id]),
+            line_counts[product_id],
+        )
+        for product_id in quantities
+    ]
+
+
+def _sale_committed(invoice_id, quantities, held, cursor=None):
+    """
+    Act on a committed sale of ``quantities`` that consumed the stock holds ``held``.
+
+    Drop the products' cached rows, then log the holds going back and the
+    quantities sold going out. Reorder levels are re-checked on the net change,
+    so releasing a hold just before its sale raises no "restocked" alert.
+    ``cursor`` is the caller's, for a reload of the index (see _refresh_low_stock).
+    """
+    sold = {product_id: -grams for product_id, grams in quantities.items()}
+    net = dict(held)
+    for product_id, change in sold.items():
+        net[product_id] = net.get(product_id, 0) + change
+    _invalidate_product_cache(net, stock=net)
+    _stock_log.record("release", held, invoice_id)
+    _stock_log.record("sale", sold, invoice_id)
+    _low_stock.apply(net)
+    _refresh_low_stock(cursor)
+
+
 class Invoice:
     """Manage operations related to the 'invoices' and 'invoice_items' tables."""
 
@@ -276,178 +1325,676 @@ class Invoice:
         self,
         invoice_id=None,
         customer_name=None,
-        grand_total=0.0,
+        grand_total_paise=0,
         invoice_date=None,
         items=None,
     ):
-        """Initialize an Invoice instance."""
+        """
+        Initialize an Invoice instance.
+
+        ``items`` are lines built with money.sale_line (integer paise and grams)
+        and ``grand_total_paise`` is their money.cart_total.
+        """
         self.invoice_id = invoice_id
         self.customer_name = customer_name
-        self.grand_total = float(grand_total)
+        self.grand_total_paise = grand_total_paise
         self.invoice_date = invoice_date if invoice_date else datetime.now()
         self.items = items if items is not None else []
+        self.replayed = False
+        self.idempotency_conflict = False
+        self.stock_error = None
 
-    def save(self):
+    def save(self, idempotency_key=None, request_hash=None, cart_id=None):
         """
         Save a new invoice and its items to the database.
 
-        Handle transactions to ensure atomicity and update product quantities.
-        Return the new invoice_id on success, None otherwise.
+        Everything runs on a single connection inside one transaction: stock is
+        taken with one conditional UPDATE (only products with enough stock are
+        decremented, so nothing has to be read and revalidated first) and all
+        invoice_items rows go in with one multi-row INSERT, so the number of
+        round trips does not grow with the cart size.
+
+        With ``cart_id``, the stock held for that cart by StockReservation.hold
+        is consumed instead: only quantities not covered by a hold are taken
+        from stock, and held stock that is not sold is returned.
+
+        When ``idempotency_key`` is given it is recorded in the same transaction.
+        A retry with a key that was already used returns the original invoice_id
+        (and sets ``replayed``) instead of selling the stock twice; if its
+        ``request_hash`` differs, ``idempotency_conflict`` is set and None returned.
+        If a product is missing, inactive or short of stock, ``stock_error``
+        explains which. Return the new invoice_id on success, None otherwise.
         """
         conn = get_db_connection()
         if not conn:
             return None
-        cursor = conn.cursor()
+        cursor = conn.cursor(dictionary=True)
         try:
             conn.start_transaction()
-            sql_invoice = (
-                "INSERT INTO invoices (customer_name, grand_total, invoice_date) "
-                "VALUES (%s, %s, %s)"
-            )
+            quantities, revenues, line_counts = _aggregate_invoice_lines(self.items)
+
             cursor.execute(
-                sql_invoice,
-                (self.customer_name, self.grand_total, self.invoice_date),
+                _INSERT_INVOICE_SQL,
+                (self.customer_name, rupees(self.grand_total_paise), self.invoice_date),
             )
             self.invoice_id = cursor.lastrowid
-            sql_item = (
-                "INSERT INTO invoice_items (invoice_id, product_id, quantity_sold, "
-                "unit_price, item_total) VALUES (%s, %s, %s, %s, %s)"
+
+            if idempotency_key:
+                # A concurrent retry blocks here on the primary key until we finish.
+                try:
+                    cursor.execute(
+                        _INSERT_IDEMPOTENCY_KEY_SQL,
+                        (idempotency_key, request_hash, self.invoice_id, datetime.now()),
+                    )
+                except IntegrityError:
+                    conn.rollback()
+                    self.invoice_id = None
+                    existing = _lookup_idempotency_key(cursor, idempotency_key)
+                    if existing and (
+                        request_hash is None or existing["request_hash"] == request_hash
+                    ):
+                        self.invoice_id = existing["invoice_id"]
+                        self.replayed = True
+                        return self.invoice_id
+                    self.idempotency_conflict = True
+                    print(f"Idempotency key '{idempotency_key}' reused for a different request.")
+                    return None
+
+            held = _consume_holds(cursor, cart_id) if cart_id else {}
+            shortfall, surplus = _settle_holds(held, quantities)
+            if shortfall:
+                _take_stock_or_raise(cursor, shortfall)
+            if surplus:
+                cursor.execute(*_return_stock(surplus))
+
+            # mysql.connector rewrites an INSERT executemany into one multi-row INSERT;
+            # SQLite steps one prepared statement per row.
+            cursor.executemany(
+                _INSERT_INVOICE_ITEM_SQL, _invoice_item_rows(self.invoice_id, self.items)
             )
-            sql_update_qty = (
-                "UPDATE products SET quantity_available = quantity_available - %s, "
-                "last_updated = %s WHERE product_id = %s"
+            DailySales.record(
+                cursor,
+                self.invoice_date.date(),
+                _daily_sales_rows(quantities, revenues, line_counts),
             )
-            for item in self.items:
-                quantity_sold = float(item["quantity_sold"])
-                unit_price = float(item["unit_price"])
-                item_total = float(item["item_total"])
-                product_in_db = Product.get_by_id(item["product_id"])
-                if (
-                    not product_in_db
-                    or product_in_db["is_active"] == 0
-                    or float(product_in_db["quantity_available"]) < quantity_sold
-                ):
-                    product_name_for_error = (
-                        product_in_db["product_name"] if product_in_db else "Unknown Product"
-                    )
-                    if not product_in_db:
-                        raise ValueError(f"Product '{product_name_for_error}' not found.")
-                    elif product_in_db["is_active"] == 0:
-                        raise ValueError(
-                            f"Product '{product_name_for_error}' is currently "
-                            "inactive and cannot be sold."
-                        )
-                    else:
-                        raise ValueError(
-                            f"Insufficient stock for product: "
-                            f"{product_name_for_error}. Only "
-                            f"{product_in_db['quantity_available']:.3f} kgs "
-                            f"available, tried to sell {quantity_sold:.3f} kgs."
-                        )
-                cursor.execute(
-                    sql_item,
-                    (
-                        self.invoice_id,
-                        item["product_id"],
-                        quantity_sold,
-                        unit_price,
-                        item_total,
-                    ),
-                )
-                cursor.execute(
-                    sql_update_qty,
-                    (quantity_sold, datetime.now(), item["product_id"]),
-                )
+
             conn.commit()
-            print(
-                f"Invoice {self.invoice_id} saved successfully! Grand Total: "
-                f"{self.grand_total:.2f}"
-            )
-            return self.invoice_id
         except ValueError as ve:
             print(f"Stock/Product status error: {ve}")
             conn.rollback()
+            self.invoice_id = None
+            self.stock_error = str(ve)
             return None
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             print(f"Error saving invoice: {e}")
             conn.rollback()
+            self.invoice_id = None
             return None
         except Exception as e:
             print(f"An unexpected error occurred during invoice saving: {e}")
             conn.rollback()
+            self.invoice_id = None
             return None
+        else:
+            # Committed: the invoice exists even if the bookkeeping below fails.
+            _sale_committed(self.invoice_id, quantities, held, cursor=cursor)
+            print(
+                f"Invoice {self.invoice_id} saved successfully! Grand Total: "
+                f"{rupees(self.grand_total_paise)}"
+            )
+            return self.invoice_id
         finally:
             close_db_connection(conn, cursor)
 
     @staticmethod
-    def get_all(start_date=None, end_date=None, customer_name=None):
+    def get_all(
+        start_date=None,
+        end_date=None,
+        customer_name=None,
+        page_size=None,
+        cursor=None,
+        direction="next",
+        include_total=False,
+    ):
         """
         Fetch invoices from the database, with optional filtering by date range and customer name.
 
-        Return a list of dictionaries.
+        Without ``page_size``, return a list of InvoiceRow (newest first).
+
+        With ``page_size``, return one keyset-paginated page ordered by
+        (invoice_date, invoice_id) descending as a dictionary with keys
+        ``invoices``, ``next_cursor`` (older rows), ``prev_cursor`` (newer rows)
+        and ``total_estimate`` (optimizer row estimate when ``include_total`` is
+        set, else None). ``cursor`` is a value from a previous page and
+        ``direction`` is "next" or "prev". Page rows also carry ``item_count``.
+        Each page costs an index range scan of ``page_size`` rows no matter how
+        deep into the history it is.
         """
+        paginated = page_size is not None
+        empty = (
+            {"invoices": [], "next_cursor": None, "prev_cursor": None, "total_estimate": None}
+            if paginated
+            else []
+        )
         conn = get_db_connection()
         if not conn:
-            return []
+            return empty
+        db_cursor = conn.cursor()
+        try:
+            conditions, params = _invoice_filters(start_date, end_date, customer_name)
+            where = " WHERE " + " AND ".join(conditions) if conditions else ""
+
+            if not paginated:
+                sql = (
+                    "SELECT invoice_id, invoice_date, customer_name, grand_total "
+                    "FROM invoices" + where + " ORDER BY invoice_date DESC, invoice_id DESC"
+                )
+                db_cursor.execute(sql, tuple(params))
+                return [InvoiceRow(*row) for row in db_cursor.fetchall()]
+
+            sql, page_params, position, backwards = _invoice_page_query(
+                conditions, params, page_size, cursor, direction
+            )
+            db_cursor.execute(sql, page_params)
+            invoices, next_cursor, prev_cursor = _invoice_page(
+                db_cursor.fetchall(), page_size, position, backwards
+            )
+
+            total_estimate = None
+            if include_total:
+                total_estimate = dialect.estimate_rows(
+                    db_cursor, "SELECT invoice_id FROM invoices" + where, tuple(params)
+                )
+
+            return {
+                "invoices": invoices,
+                "next_cursor": next_cursor,
+                "prev_cursor": prev_cursor,
+                "total_estimate": total_estimate,
+            }
+        except DatabaseError as e:
+            print(f"Error fetching invoices: {e}")
+            return empty
+        finally:
+            close_db_connection(conn, db_cursor)
+
+    @staticmethod
+    def get_by_id(invoice_id):
+        """
+        Fetch a single invoice and its items by invoice_id.
+
+        Return an InvoiceRow whose ``items`` is a list of InvoiceItemRow, or None.
+        """
+        conn = get_db_connection()
+        if not conn:
+            return None
+        cursor = conn.cursor()
+        try:
+            cursor.execute(_INVOICE_HEADER_SELECT + " WHERE invoice_id = %s", (invoice_id,))
+            invoice_header = cursor.fetchone()
+            if not invoice_header:
+                return None
+            cursor.execute(_INVOICE_ITEMS_SELECT + " WHERE ii.invoice_id = %s", (invoice_id,))
+            items = list(map(InvoiceItemRow._make, cursor.fetchall()))
+            return InvoiceRow(*invoice_header, items=items)
+        except DatabaseError as e:
+            print(f"Error fetching invoice details: {e}")
+            return None
+        finally:
+            close_db_connection(conn, cursor)
+
+    @staticmethod
+    def get_many(invoice_ids):
+        """
+        Fetch several invoices and their items with two queries.
+
+        Return a dictionary mapping invoice_id to an InvoiceRow like the one
+        get_by_id returns (items ordered by item_id); unknown IDs are absent.
+        """
+        invoice_ids = sorted({int(invoice_id) for invoice_id in invoice_ids})
+        if not invoice_ids:
+            return {}
+        conn = get_db_connection()
+        if not conn:
+            return {}
+        cursor = conn.cursor()
+        try:
+            (header_sql, params), (items_sql, _) = _invoice_batch_queries(invoice_ids)
+            cursor.execute(header_sql, params)
+            headers = cursor.fetchall()
+            if not headers:
+                return {}
+            cursor.execute(items_sql, params)
+            return _group_invoice_items(headers, cursor.fetchall())
+        except DatabaseError as e:
+            print(f"Error fetching invoices by ID: {e}")
+            return {}
+        finally:
+            close_db_connection(conn, cursor)
+
+    @staticmethod
+    def get_by_idempotency_key(idempotency_key):
+        """
+        Look up the invoice created under an Idempotency-Key.
+
+        Return a dictionary with invoice_id, request_hash and grand_total, or None.
+        """
+        conn = get_db_connection()
+        if not conn:
+            return None
         cursor = conn.cursor(dictionary=True)
         try:
-            sql = "SELECT invoice_id, invoice_date, customer_name, grand_total " "FROM invoices"
-            conditions = []
-            params = []
+            return _lookup_idempotency_key(cursor, idempotency_key)
+        except DatabaseError as e:
+            print(f"Error fetching idempotency key: {e}")
+            return None
+        finally:
+            close_db_connection(conn, cursor)
+
+    @staticmethod
+    def iter_export(start_date=None, end_date=None, customer_name=None, batch_size=1000):
+        """
+        Stream invoice lines joined with their invoice header and product name.
+
+        Use the same filters as get_all. Rows are read through an unbuffered
+        cursor in batches of ``batch_size``, so memory stays flat however many
+        invoices match. Yield one dictionary per invoice item, ordered by
+        invoice_date, invoice_id and item_id.
+
+        A database error, even after rows have been yielded, is raised to the
+        consumer once the connection is discarded, and ConnectionError is
+        raised if there is no connection: a failed export must not end like a
+        complete one.
+        """
+        conn = get_db_connection()
+        if not conn:
+            raise ConnectionError("No database connection for the invoice export.")
+        cursor = conn.cursor(dictionary=True, buffered=False)
+        finished = False
+        try:
+            conditions, params = _invoice_filters(start_date, end_date, customer_name, alias="i.")
+            sql = (
+                "SELECT i.invoice_id, i.invoice_date, i.customer_name, i.grand_total, "
+                "ii.item_id, ii.product_id, p.product_name, ii.quantity_sold, "
+                "ii.unit_price, ii.item_total FROM invoices i "
+                "JOIN invoice_items ii ON ii.invoice_id = i.invoice_id "
+                "JOIN products p ON p.product_id = ii.product_id"
+            )
+            if conditions:
+                sql += " WHERE " + " AND ".join(conditions)
+            sql += " ORDER BY i.invoice_date, i.invoice_id, ii.item_id"
+            cursor.execute(sql, tuple(params))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+            finished = True
+        except DatabaseError as e:
+            print(f"Error exporting invoices: {e}")
+            raise
+        finally:
+            if finished:
+                close_db_connection(conn, cursor)
+            else:
+                # Unread rows would poison a pooled connection; drop it instead.
+                discard_db_connection(conn)
+
+
+class DailySales:
+    """
+    Manage the 'daily_product_sales' rollup table.
+
+    One row per (sales_date, product_id) holds the quantity sold, revenue and
+    number of invoice lines for that day. Invoice.save keeps it current inside
+    the checkout transaction, so reports never have to scan invoice_items.
+    """
+
+    PERIODS = dialect.periods  # Period name -> SQL expression for the period's first day
+    RECORD_SQL = (
+        "INSERT INTO daily_product_sales (sales_date, product_id, quantity_sold, revenue, "
+        "line_count) VALUES (%s, %s, %s, %s, %s) "
+        + dialect.upsert(
+            ["sales_date", "product_id"], add=["quantity_sold", "revenue", "line_count"]
+        )
+    )
+
+    @staticmethod
+    def record(cursor, sales_date, lines):
+        """
+        Add one invoice's totals to the rollup using the caller's cursor.
+
+        ``lines`` is a list of (product_id, quantity_sold, revenue, line_count)
+        tuples. Run inside the caller's transaction; does not commit.
+        """
+        cursor.executemany(DailySales.RECORD_SQL, DailySales.record_rows(sales_date, lines))
+
+    @staticmethod
+    def record_rows(sales_date, lines):
+        """Return the RECORD_SQL parameter tuples for ``lines`` sold on ``sales_date``."""
+        return [(sales_date,) + tuple(line) for line in lines]
+
+    @staticmethod
+    def backfill(start_date=None, end_date=None):
+        """
+        Rebuild rollup rows from invoices for an inclusive date range (all history if None).
+
+        Existing rollup rows in the range are replaced, so the command is safe to
+        re-run. Return the number of rollup rows written, or None on error.
+        """
+        conn = get_db_connection()
+        if not conn:
+            return None
+        cursor = conn.cursor()
+        try:
+            rollup_conditions, rollup_params = [], []
+            invoice_conditions, invoice_params = [], []
             if start_date:
-                conditions.append("invoice_date >= %s")
-                params.append(start_date)
+                rollup_conditions.append("sales_date >= %s")
+                rollup_params.append(start_date)
+                invoice_conditions.append("i.invoice_date >= %s")
+                invoice_params.append(start_date)
             if end_date:
-                conditions.append("invoice_date <= %s")
-                params.append(end_date)
-            if customer_name:
-                conditions.append("customer_name LIKE %s")
-                params.append(f"%{customer_name}%")
+                rollup_conditions.append("sales_date <= %s")
+                rollup_params.append(end_date)
+                invoice_conditions.append("i.invoice_date < " + dialect.next_day)
+                invoice_params.append(end_date)
+
+            conn.start_transaction()
+            sql_delete = "DELETE FROM daily_product_sales"
+            if rollup_conditions:
+                sql_delete += " WHERE " + " AND ".join(rollup_conditions)
+            cursor.execute(sql_delete, tuple(rollup_params))
+
+            sql_insert = (
+                "INSERT INTO daily_product_sales (sales_date, product_id, quantity_sold, "
+                "revenue, line_count) "
+                "SELECT DATE(i.invoice_date), ii.product_id, "
+                f"{dialect.decimal('SUM(ii.quantity_sold)', 3)}, "
+                f"{dialect.decimal('SUM(ii.item_total)', 2)}, COUNT(*) FROM invoices i "
+                "JOIN invoice_items ii ON ii.invoice_id = i.invoice_id"
+            )
+            if invoice_conditions:
+                sql_insert += " WHERE " + " AND ".join(invoice_conditions)
+            sql_insert += " GROUP BY DATE(i.invoice_date), ii.product_id"
+            cursor.execute(sql_insert, tuple(invoice_params))
+            written = cursor.rowcount
+            conn.commit()
+            print(f"Backfilled {written} daily sales rollup rows.")
+            return written
+        except DatabaseError as e:
+            print(f"Error backfilling daily sales: {e}")
+            conn.rollback()
+            return None
+        finally:
+            close_db_connection(conn, cursor)
+
+    @staticmethod
+    def by_period(period="day", start_date=None, end_date=None):
+        """
+        Return sales totals grouped by day, week (Monday start) or month.
+
+        Return a list of dictionaries with period_start, quantity_sold, revenue
+        and invoice_lines, newest period first.
+        """
+        period_expr = DailySales.PERIODS.get(period)
+        if period_expr is None:
+            raise ValueError(f"Unsupported period: {period}")
+        conn = get_db_connection()
+        if not conn:
+            return []
+        cursor = conn.cursor(dictionary=True)
+        try:
+            conditions, params = DailySales._date_filters(start_date, end_date)
+            sql = (
+                f"SELECT {dialect.date_column(period_expr, 'period_start')}, "
+                f"{dialect.decimal('SUM(quantity_sold)', 3)} AS quantity_sold, "
+                f"{dialect.decimal('SUM(revenue)', 2)} AS revenue, "
+                "SUM(line_count) AS invoice_lines "
+                "FROM daily_product_sales"
+            )
             if conditions:
                 sql += " WHERE " + " AND ".join(conditions)
-            sql += " ORDER BY invoice_date DESC"
+            sql += " GROUP BY 1 ORDER BY 1 DESC"
             cursor.execute(sql, tuple(params))
-            invoices = cursor.fetchall()
-            return invoices
-        except mysql.connector.Error as e:
-            print(f"Error fetching invoices: {e}")
+            return cursor.fetchall()
+        except DatabaseError as e:
+            print(f"Error fetching sales by {period}: {e}")
             return []
         finally:
             close_db_connection(conn, cursor)
 
     @staticmethod
-    def get_by_id(invoice_id):
+    def top_products(start_date=None, end_date=None, limit=5, order_by="revenue"):
         """
-        Fetch a single invoice and its items by invoice_id.
+        Return the top ``limit`` products by revenue or quantity_sold in a date range.
+
+        Return a list of dictionaries with product_id, product_name,
+        quantity_sold and revenue.
+        """
+        if order_by not in ("revenue", "quantity_sold"):
+            raise ValueError(f"Unsupported ordering: {order_by}")
+        conn = get_db_connection()
+        if not conn:
+            return []
+        cursor = conn.cursor(dictionary=True)
+        try:
+            conditions, params = DailySales._date_filters(start_date, end_date, alias="d.")
+            sql = (
+                "SELECT d.product_id, p.product_name, "
+                f"{dialect.decimal('SUM(d.quantity_sold)', 3)} AS quantity_sold, "
+                f"{dialect.decimal('SUM(d.revenue)', 2)} AS revenue FROM daily_product_sales d "
+                "JOIN products p ON p.product_id = d.product_id"
+            )
+            if conditions:
+                sql += " WHERE " + " AND ".join(conditions)
+            sql += f" GROUP BY d.product_id, p.product_name ORDER BY {order_by} DESC LIMIT %s"
+            params.append(int(limit))
+            cursor.execute(sql, tuple(params))
+            return cursor.fetchall()
+        except DatabaseError as e:
+            print(f"Error fetching top products: {e}")
+            return []
+        finally:
+            close_db_connection(conn, cursor)
+
+    @staticmethod
+    def _date_filters(start_date, end_date, alias=""):
+        """Build inclusive sales_date range conditions; return (conditions, params)."""
+        conditions, params = [], []
+        if start_date:
+            conditions.append(f"{alias}sales_date >= %s")
+            params.append(start_date)
+        if end_date:
+            conditions.append(f"{alias}sales_date <= %s")
+            params.append(end_date)
+        return conditions, params
+
+
+class StockReservation:
+    """
+    Manage short-lived stock holds in the 'stock_reservations' table.
+
+    Adding a product to a cart takes the quantity out of quantity_available
+    right away with a conditional UPDATE and records a hold for (cart_id,
+    product_id). Checkout (Invoice.save with ``cart_id``) turns the holds into
+    the sale; removing the line or letting the hold expire puts the stock back.
+    quantity_available is therefore the stock that is neither sold nor held.
+    """
 
-        Return a dictionary containing invoice details and a list of item
-        dictionaries.
+    _last_sweep = 0.0  # time.monotonic() of the last release_expired run in this process
+
+    @staticmethod
+    def held(product_id):
+        """Return the stock held for carts of one product as Decimal kgs (0 on error)."""
+        conn = get_db_connection()
+        if not conn:
+            return kgs(0)
+        cursor = conn.cursor()
+        try:
+            cursor.execute(_HELD_SQL, (product_id,))
+            return kgs(to_grams(cursor.fetchone()[0]))
+        except DatabaseError as e:
+            print(f"Error fetching held stock: {e}")
+            return kgs(0)
+        finally:
+            close_db_connection(conn, cursor)
+
+    @staticmethod
+    def hold(cart_id, product_id, quantity_grams):
+        """
+        Reserve ``quantity_grams`` of a product for a cart, adding to any existing hold.
+
+        All of the cart's holds get a fresh expiry (Config.RESERVATION_TTL
+        seconds). Return True on success, False if the product is inactive,
+        does not have enough unreserved stock, or on a database error.
         """
         conn = get_db_connection()
+        if not conn:
+            return False
+        cursor = conn.cursor()
+        try:
+            conn.start_transaction()
+            # Lock the cart's holds before the product row, in the same order as
+            # checkout and release, so concurrent calls cannot deadlock.
+            expires_at = datetime.now() + timedelta(seconds=Config.RESERVATION_TTL)
+            cursor.execute(
+                "INSERT INTO stock_reservations (cart_id, product_id, quantity, expires_at) "
+                "VALUES (%s, %s, %s, %s) "
+                + dialect.upsert(
+                    ["cart_id", "product_id"], replace=["expires_at"], add=["quantity"]
+                ),
+                (cart_id, product_id, kgs(quantity_grams), expires_at),
+            )
+            cursor.execute(
+                "UPDATE stock_reservations SET expires_at = %s WHERE cart_id = %s",
+                (expires_at, cart_id),
+            )
+            cursor.execute(*_take_stock({int(product_id): quantity_grams}))
+            if cursor.rowcount != 1:
+                conn.rollback()
+                return False
+            conn.commit()
+            _invalidate_product_cache([product_id], stock={product_id: -quantity_grams})
+            _stock_changed("hold", {product_id: -quantity_grams}, cursor=cursor)
+            return True
+        except DatabaseError as e:
+            print(f"Error reserving stock: {e}")
+            conn.rollback()
+            return False
+        finally:
+            close_db_connection(conn, cursor)
+
+    @staticmethod
+    def release(cart_id, product_id=None):
+        """
+        Return a cart's held stock, for one product or (by default) all of them.
+
+        Return the number of holds released, or None on a database error.
+        """
+        condition, params = "cart_id = %s", [cart_id]
+        if product_id is not None:
+            condition += " AND product_id = %s"
+            params.append(product_id)
+        return StockReservation._release(condition, tuple(params))
+
+    @staticmethod
+    def unhold(cart_id, product_id, quantity_grams):
+        """
+        Give back ``quantity_grams`` of a cart's hold on a product, undoing one hold() call.
+
+        Unlike release, the rest of the hold (for quantity added to the cart
+        earlier) stays in place; the hold is deleted once nothing is left of
+        it. Return True on success, False if the cart holds less than that or
+        on a database error.
+        """
+        conn = get_db_connection()
+        if not conn:
+            return False
+        cursor = conn.cursor()
+        try:
+            conn.start_transaction()
+            cursor.execute(
+                "UPDATE stock_reservations SET quantity = "
+                f"{dialect.decimal('quantity - %s', 3)} "
+                "WHERE cart_id = %s AND product_id = %s AND quantity >= %s",
+                (kgs(quantity_grams), cart_id, product_id, kgs(quantity_grams)),
+            )
+            if cursor.rowcount != 1:
+                conn.rollback()
+                return False
+            cursor.execute(
+                "DELETE FROM stock_reservations WHERE cart_id = %s AND product_id = %s "
+                "AND quantity <= 0",
+                (cart_id, product_id),
+            )
+            returned = {int(product_id): quantity_grams}
+            cursor.execute(*_return_stock(returned))
+            conn.commit()
+            _invalidate_product_cache(returned, stock=returned)
+            _stock_changed("release", returned, cursor=cursor)
+            return True
+        except DatabaseError as e:
+            print(f"Error releasing stock reservation: {e}")
+            conn.rollback()
+            return False
+        finally:
+            close_db_connection(conn, cursor)
+
+    @staticmethod
+    def release_expired():
+        """
+        Return the stock of every expired hold.
+
+        Return the number of holds released, or None on a database error.
+        """
+        return StockReservation._release("expires_at < %s", (datetime.now(),))
+
+    @staticmethod
+    def release_expired_if_due():
+        """Run release_expired at most once every Config.RESERVATION_SWEEP_INTERVAL seconds."""
+        now = time.monotonic()
+        if now - StockReservation._last_sweep < Config.RESERVATION_SWEEP_INTERVAL:
+            return None
+        StockReservation._last_sweep = now
+        return StockReservation.release_expired()
+
+    @staticmethod
+    def _release(condition, params):
+        """Delete the holds matching ``condition`` and add their quantities back to stock."""
+        conn = get_db_connection()
         if not conn:
             return None
         cursor = conn.cursor(dictionary=True)
         try:
+            conn.start_transaction()
             cursor.execute(
-                "SELECT invoice_id, invoice_date, customer_name, grand_total "
-                "FROM invoices WHERE invoice_id = %s",
-                (invoice_id,),
+                "SELECT cart_id, product_id, quantity FROM stock_reservations WHERE "
+                + condition
+                + dialect.for_update,
+                params,
             )
-            invoice_header = cursor.fetchone()
-            if not invoice_header:
-                return None
-            sql_items = (
-                "SELECT ii.item_id, ii.product_id, ii.quantity_sold, ii.unit_price, "
-                "ii.item_total, p.product_name FROM invoice_items ii "
-                "JOIN products p ON ii.product_id = p.product_id "
-                "WHERE ii.invoice_id = %s"
-            )
-            cursor.execute(sql_items, (invoice_id,))
-            invoice_items = cursor.fetchall()
-            invoice_header["items"] = invoice_items
-            return invoice_header
-        except mysql.connector.Error as e:
-            print(f"Error fetching invoice details: {e}")
+            holds = cursor.fetchall()
+            if not holds:
+                conn.rollback()
+                return 0
+            returned = {}
+            for hold in holds:
+                returned[hold["product_id"]] = returned.get(hold["product_id"], 0) + to_grams(
+                    hold["quantity"]
+                )
+            cursor.execute(*_return_stock(returned))
+            cursor.executemany(
+                "DELETE FROM stock_reservations WHERE cart_id = %s AND product_id = %s",
+                [(hold["cart_id"], hold["product_id"]) for hold in holds],
+            )
+            conn.commit()
+            _invalidate_product_cache(returned, stock=returned)
+            _stock_changed("release", returned, cursor=cursor)
+            return len(holds)
+        except DatabaseError as e:
+            print(f"Error releasing stock reservations: {e}")
+            conn.rollback()
             return None
         finally:
             close_db_connection(conn, cursor)
@@ -0,0 +1,82 @@
+"""
+Fixed-point money and quantity arithmetic for the Retail Invoice Management System.
+
+Prices and totals are handled as integer paise, quantities as integer grams,
+from the moment they enter the application (a form field, a JSON body or a
+DECIMAL column) until they are written back. Line and grand totals are then
+exact integer sums that match the DECIMAL(10,2) and DECIMAL(10,3) columns they
+are stored in, with no float rounding drift. Convert with to_paise/to_grams on
+the way in and rupees/kgs (Decimal) on the way out.
+"""
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+PAISE_PER_RUPEE = 100
+GRAMS_PER_KG = 1000
+
+_ONE = Decimal(1)
+# rupees() and kgs() multiply by these: exact for any amount under 10**26 units
+# (the default context keeps 28 digits), and twice as fast as Decimal.scaleb.
+_PAISA = Decimal("0.01")
+_GRAM = Decimal("0.001")
+
+
+def _to_units(value, places):
+    """Convert a number of rupees/kgs to whole paise/grams (10**places per unit), half up."""
+    if isinstance(value, Decimal):
+        pass
+    elif isinstance(value, str):
+        whole, _, fraction = value.strip().partition(".")
+        if whole.isdecimal() and len(fraction) <= places and (fraction.isdecimal() or not fraction):
+            # A plain "12.5" as forms send it: its digits are already the answer.
+            return int(whole + fraction.ljust(places, "0"))
+    elif isinstance(value, int):
+        return value * 10**places
+    try:
+        if not isinstance(value, Decimal):
+            # str() first, so a float such as 0.1 means 0.1 and not its binary value.
+            value = Decimal(str(value).strip())
+        return int(value.scaleb(places).quantize(_ONE, ROUND_HALF_UP))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"{value!r} is not a valid number.") from None
+
+
+def to_paise(rupees_value):
+    """Return an amount in rupees (Decimal, str, int or float) as integer paise."""
+    return _to_units(rupees_value, 2)
+
+
+def to_grams(kgs_value):
+    """Return a quantity in kgs (Decimal, str, int or float) as integer grams."""
+    return _to_units(kgs_value, 3)
+
+
+def rupees(paise):
+    """Return integer paise as a Decimal number of rupees with two places (e.g. 80.50)."""
+    return paise * _PAISA
+
+
+def kgs(grams):
+    """Return integer grams as a Decimal number of kgs with three places (e.g. 1.250)."""
+    return grams * _GRAM
+
+
+def line_total(quantity_grams, unit_price_paise):
+    """Return the price of ``quantity_grams`` at ``unit_price_paise`` per kg, in paise (half up)."""
+    return (quantity_grams * unit_price_paise + GRAMS_PER_KG // 2) // GRAMS_PER_KG
+
+
+def sale_line(product_id, product_name, unit_price_paise, quantity_grams):
+    """Build a cart/invoice line in the shape Invoice.save expects."""
+    return {
+        "product_id": product_id,
+        "product_name": product_name,
+        "unit_price_paise": unit_price_paise,
+        "quantity_grams": quantity_grams,
+        "item_total_paise": line_total(quantity_grams, unit_price_paise),
+    }
+
+
+def cart_total(lines):
+    """Return the grand total of cart/invoice lines in paise."""
+    return sum([line["item_total_paise"] for line in lines])
@@ -0,0 +1,57 @@
+"""
+Stock movement log commands for the Retail Invoice Management System.
+
+Replay the log written by stock_log.StockLog (Config.STOCK_LOG_PATH):
+
+    python movements.py stock 12 --at 2026-10-01T18:00
+    python movements.py history 12 --start 2026-10-01 --end 2026-10-02
+    python movements.py opening
+
+``opening`` logs the current stock of products that have no events yet; run
+it once when starting the log on a database that already holds stock.
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+from money import kgs
+from models import Product
+
+
+def main(argv=None):
+    """Parse command-line arguments and run the requested stock log command."""
+    parser = argparse.ArgumentParser(description="Query the stock movement log.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    stock = subcommands.add_parser("stock", help="Stock of a product at a point in time.")
+    stock.add_argument("product_id", type=int)
+    stock.add_argument("--at", type=datetime.fromisoformat, help="YYYY-MM-DDTHH:MM (default now)")
+    stock.add_argument(
+        "--on-hand", action="store_true", help="Count stock held for carts as not yet sold"
+    )
+    history = subcommands.add_parser("history", help="Stock movements of a product.")
+    history.add_argument("product_id", type=int)
+    history.add_argument("--start", type=datetime.fromisoformat, help="First moment to list")
+    history.add_argument("--end", type=datetime.fromisoformat, help="Last moment to list")
+    subcommands.add_parser("opening", help="Log the current stock of products with no events.")
+    args = parser.parse_args(argv)
+
+    if args.command == "stock":
+        grams = Product.stock_at(args.product_id, args.at, include_holds=not args.on_hand)
+        print(f"{kgs(grams)} kgs")
+        return 0
+    if args.command == "history":
+        for event in Product.stock_movements(args.product_id, args.start, args.end):
+            invoice = f" invoice {event['invoice_id']}" if event["invoice_id"] else ""
+            print(
+                f"{event['at']:%Y-%m-%d %H:%M:%S} {kgs(event['change_grams']):>+12} "
+                f"-> {kgs(event['quantity_grams'])} kgs  {event['reason']}{invoice}"
+            )
+        return 0
+    if args.command == "opening":
+        return 0 if Product.record_opening_stock() is not None else 1
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Bulk product import for the Retail Invoice Management System.
+
+Load a price list (CSV with a header row, or a JSON array of objects) with the
+columns product_name, quantity_available and unit_price. Rows are validated like
+the Add Product form, then upserted by product name in chunks:
+
+    python product_import.py weekly_prices.csv
+    python product_import.py weekly_prices.json --chunk-size 2000
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+
+from models import Product
+
+
+def read_rows(stream, fmt):
+    """
+    Parse an uploaded or on-disk price list.
+
+    ``stream`` is a text stream; ``fmt`` is "csv" or "json". Return a list of
+    dictionaries keyed by column name.
+    """
+    if fmt == "csv":
+        return list(csv.DictReader(stream))
+    if fmt == "json":
+        data = json.load(stream)
+        if not isinstance(data, list) or not all(isinstance(r, dict) for r in data):
+            raise ValueError("JSON import must be an array of objects.")
+        return data
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def detect_format(filename):
+    """Guess the import format from a file name (defaults to CSV)."""
+    return "json" if filename.lower().endswith(".json") else "csv"
+
+
+def import_products(records, chunk_size=1000):
+    """
+    Validate and upsert product records.
+
+    Invalid rows are skipped and reported; valid rows are written with
+    Product.bulk_upsert. Return a report dictionary with row counts, per-row
+    errors (1-based row numbers, header excluded) and throughput.
+    """
+    started = time.perf_counter()
+    valid = []
+    errors = []
+    for number, record in enumerate(records, start=1):
+        try:
+            valid.append(
+                Product.parse_fields(
+                    record.get("product_name"),
+                    record.get("quantity_available"),
+                    record.get("unit_price"),
+                )
+            )
+        except ValueError as e:
+            errors.append({"row": number, "error": str(e)})
+
+    written = Product.bulk_upsert(valid, chunk_size=chunk_size) if valid else 0
+    elapsed = time.perf_counter() - started
+    return {
+        "rows_total": len(records),
+        "rows_valid": len(valid),
+        "rows_written": written or 0,
+        "failed": written is None,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round((written or 0) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def import_upload(file_storage, chunk_size=1000):
+    """Import a file uploaded through Flask (a werkzeug FileStorage)."""
+    fmt = detect_format(file_storage.filename or "")
+    stream = io.TextIOWrapper(file_storage.stream, encoding="utf-8-sig", newline="")
+    return import_products(read_rows(stream, fmt), chunk_size=chunk_size)
+
+
+def main(argv=None):
+    """Import a price list from the command line and print the report as JSON."""
+    parser = argparse.ArgumentParser(description="Bulk import or update products.")
+    parser.add_argument("path", help="CSV or JSON price list")
+    parser.add_argument("--format", choices=["csv", "json"], help="Default: from extension")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    with open(args.path, encoding="utf-8-sig", newline="") as f:
+        records = read_rows(f, args.format or detect_format(args.path))
+    report = import_products(records, chunk_size=args.chunk_size)
+    print(json.dumps(report, indent=2))
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+"""
+Maintenance commands for the daily sales rollups of the Retail Invoice Management System.
+
+Rebuild the 'daily_product_sales' table from existing invoices, e.g. after
+creating the table on a database that already has sales history:
+
+    python rollups.py backfill
+    python rollups.py backfill --start-date 2025-04-01 --end-date 2025-04-30
+"""
+
+import argparse
+import sys
+
+from models import DailySales
+
+
+def main(argv=None):
+    """Parse command-line arguments and run the requested rollup command."""
+    parser = argparse.ArgumentParser(description="Manage daily sales rollups.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    backfill = subcommands.add_parser("backfill", help="Rebuild rollups from invoices.")
+    backfill.add_argument("--start-date", help="First sales date to rebuild (YYYY-MM-DD)")
+    backfill.add_argument("--end-date", help="Last sales date to rebuild (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+
+    if args.command == "backfill":
+        written = DailySales.backfill(start_date=args.start_date, end_date=args.end_date)
+        return 0 if written is not None else 1
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Typed row objects for the Retail Invoice Management System.
+
+Model reads build these straight from the tuples a cursor returns instead of a
+dictionary per row. A row is a named tuple without a per-instance __dict__, so
+it takes little more memory than the driver's tuple. Fields read as attributes
+(``product.unit_price``) or, like the dictionaries they replace, by name
+(``product["unit_price"]``), so templates and callers work with either.
+
+Rows are immutable: use ``_replace`` for a changed copy and ``dict(row)`` or
+``_asdict()`` for a plain dictionary.
+"""
+
+from collections import namedtuple
+
+
+class _Row:
+    """Mapping-style read access for the named tuples below."""
+
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Field name -> position, built once per row type: reads by name are one dict lookup.
+        cls._positions = {name: index for index, name in enumerate(cls._fields)}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            key = self._positions[key]
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        """Return the field called ``key``, or ``default`` if there is none."""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        """Return the field names, so that ``dict(row)`` gives a dictionary."""
+        return self._fields
+
+
+class ProductRow(
+    _Row,
+    namedtuple(
+        "ProductRow",
+        [
+            "product_id",
+            "product_name",
+            "quantity_available",
+            "unit_price",
+            "last_updated",
+            "is_active",
+        ],
+    ),
+):
+    """A 'products' row, in the column order of models._PRODUCT_SELECT."""
+
+    __slots__ = ()
+
+
+class InvoiceRow(
+    _Row,
+    namedtuple(
+        "InvoiceRow",
+        ["invoice_id", "invoice_date", "customer_name", "grand_total", "item_count", "items"],
+        defaults=(None, None),
+    ),
+):
+    """
+    An 'invoices' row, in the column order of models._INVOICE_HEADER_SELECT.
+
+    ``item_count`` is set on listing pages and ``items`` (a list of
+    InvoiceItemRow) on invoices fetched with their lines.
+    """
+
+    __slots__ = ()
+
+
+class InvoiceItemRow(
+    _Row,
+    namedtuple(
+        "InvoiceItemRow",
+        [
+            "invoice_id",
+            "item_id",
+            "product_id",
+            "quantity_sold",
+            "unit_price",
+            "item_total",
+            "product_name",
+        ],
+    ),
+):
+    """An 'invoice_items' row with its product name, as models._INVOICE_ITEMS_SELECT reads it."""
+
+    __slots__ = ()
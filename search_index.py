@@ -0,0 +1,135 @@
+"""
+In-memory product name search index for the Retail Invoice Management System.
+
+Answer autocomplete queries (substring and prefix matches) from a trigram index
+instead of a ``LIKE '%term%'`` scan of the products table.
+"""
+
+import heapq
+import threading
+import time
+from collections import defaultdict
+
+
+def _fold(name):
+    """Normalize a product name or search term for case-insensitive matching."""
+    return name.strip().lower()
+
+
+def _trigrams(text):
+    """Return the set of three-character substrings of ``text``."""
+    return {a + b + c for a, b, c in zip(text, text[1:], text[2:])}
+
+
+class ProductSearchIndex:
+    """
+    Trigram index over product names.
+
+    Every product is indexed together with its active flag so that activating or
+    deactivating a product is a flag flip rather than a re-index. Results are
+    ranked: exact match, then prefix match, then word-prefix match, then any
+    other substring match (earlier position first), ties broken by name.
+    """
+
+    def __init__(self):
+        """Initialize an empty, not yet loaded index."""
+        self._lock = threading.RLock()
+        self._entries = {}  # product_id -> (product_name, folded_name, is_active)
+        self._grams = defaultdict(set)  # trigram -> {product_id, ...}
+        self.loaded_at = None
+
+    def load(self, products):
+        """Rebuild the index from an iterable of product rows (dictionaries)."""
+        with self._lock:
+            self._entries.clear()
+            self._grams.clear()
+            for p in products:
+                self._add(p["product_id"], p["product_name"], p["is_active"])
+            self.loaded_at = time.monotonic()
+
+    def is_stale(self, max_age):
+        """Return True if the index was never loaded or is older than ``max_age`` seconds."""
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > max_age
+
+    def invalidate(self):
+        """Force a full rebuild on the next search."""
+        self.loaded_at = None
+
+    def _add(self, product_id, product_name, is_active):
+        folded = _fold(product_name)
+        self._entries[product_id] = (product_name, folded, bool(is_active))
+        for gram in _trigrams(folded):
+            self._grams[gram].add(product_id)
+
+    def _remove(self, product_id):
+        entry = self._entries.pop(product_id, None)
+        if entry is None:
+            return
+        for gram in _trigrams(entry[1]):
+            ids = self._grams.get(gram)
+            if ids is not None:
+                ids.discard(product_id)
+                if not ids:
+                    del self._grams[gram]
+
+    def upsert(self, product_id, product_name, is_active):
+        """Add a product or re-index it after a rename or status change."""
+        with self._lock:
+            self._remove(product_id)
+            self._add(product_id, product_name, is_active)
+
+    def set_active(self, product_id, is_active):
+        """
+        Flip the active flag of an indexed product.
+
+        Return False if the product is not indexed (the caller should reload).
+        """
+        with self._lock:
+            entry = self._entries.get(product_id)
+            if entry is None:
+                return False
+            self._entries[product_id] = (entry[0], entry[1], bool(is_active))
+            return True
+
+    def search(self, term, limit=10, include_inactive=False):
+        """
+        Return up to ``limit`` ranked ``(product_id, product_name)`` pairs matching ``term``.
+
+        Terms of three or more characters are answered from the trigram postings;
+        shorter terms fall back to scanning the (in-memory) names.
+        """
+        folded = _fold(term)
+        if not folded:
+            return []
+        with self._lock:
+            if len(folded) >= 3:
+                postings = sorted((self._grams.get(g, ()) for g in _trigrams(folded)), key=len)
+                if not postings or not postings[0]:
+                    return []
+                candidates = set(postings[0])
+                for ids in postings[1:]:
+                    candidates &= ids
+                    if not candidates:
+                        return []
+            else:
+                candidates = self._entries.keys()
+
+            ranked = []
+            for product_id in candidates:
+                name, name_folded, active = self._entries[product_id]
+                if not active and not include_inactive:
+                    continue
+                position = name_folded.find(folded)
+                if position < 0:
+                    continue
+                if name_folded == folded:
+                    rank = 0
+                elif position == 0:
+                    rank = 1
+                elif name_folded[position - 1] == " ":
+                    rank = 2
+                else:
+                    rank = 3
+                ranked.append((rank, position, name_folded, product_id, name))
+
+        return [(r[3], r[4]) for r in heapq.nsmallest(limit, ranked)]
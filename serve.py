@@ -0,0 +1,84 @@
+"""
+Production entry point for the Retail Invoice Management System (pre-fork mode).
+
+    pip install gunicorn
+    python serve.py --bind 0.0.0.0:8000 --workers 8
+
+Runs the Flask app from app.py under gunicorn: one master process and
+SERVE_WORKERS worker processes (one per CPU core by default), each serving
+SERVE_THREADS requests at a time. The master builds the app (compiling its
+templates) and loads the product caches, search index and low-stock index
+before forking, so workers start warm and share that memory copy-on-write.
+
+Each worker still has its own copy of anything it changes afterwards. Product
+writes are announced to the other workers through a shared-memory change feed
+(change_feed.py), which every worker checks at the start of each request, so no
+worker serves a product row another one has changed.
+"""
+
+import argparse
+import gc
+import os
+import sys
+
+from gunicorn.app.base import BaseApplication
+
+from config import Config
+
+
+class PreforkServer(BaseApplication):
+    """gunicorn application that preloads the app and its catalog in the master process."""
+
+    def __init__(self, options):
+        """Initialize with gunicorn settings (name -> value)."""
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        """Pass the options to gunicorn's settings."""
+        for name, value in self.options.items():
+            self.cfg.set(name, value)
+
+    def load(self):
+        """Build and warm up the app; called once, in the master, before any worker forks."""
+        from app import create_app
+        from database import close_idle_connections
+        import models
+
+        app = create_app()  # Templates are compiled here, once for every worker
+        models._change_feed.share()
+        print(f"Preloaded {models.Product.preload_catalog()} products.")
+        close_idle_connections()
+        # Keep the preloaded objects out of the collector's way, so that garbage
+        # collection in a worker does not write to (and so copy) shared pages.
+        gc.freeze()
+        return app
+
+
+def main(argv=None):
+    """Parse command-line arguments and run the pre-fork server."""
+    parser = argparse.ArgumentParser(description="Serve the app with pre-forked workers.")
+    parser.add_argument("--bind", default=Config.SERVE_BIND, help="host:port to listen on")
+    parser.add_argument("--workers", type=int, default=Config.SERVE_WORKERS)
+    parser.add_argument("--threads", type=int, default=Config.SERVE_THREADS)
+    args = parser.parse_args(argv)
+
+    workers = args.workers or os.cpu_count() or 1
+    if workers > 1 and Config.CART_STORE_BACKEND == "memory":
+        # Requests from one browser land on any worker; carts must be in a shared store.
+        print("Using the sqlite cart store: in-memory carts are not shared between workers.")
+        Config.CART_STORE_BACKEND = "sqlite"
+    PreforkServer(
+        {
+            "bind": args.bind,
+            "workers": workers,
+            "threads": args.threads,
+            "worker_class": "gthread",
+            "preload_app": True,
+        }
+    ).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
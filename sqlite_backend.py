@@ -0,0 +1,286 @@
+"""
+Embedded SQLite storage backend for the Retail Invoice Management System.
+
+Lets a branch run fully local, without a MySQL server. The connection and
+cursor wrappers below expose the small part of the mysql.connector API the
+models use (``%s`` placeholders, dictionary cursors, start_transaction,
+lastrowid, ...), and SQLiteDialect supplies the SQL fragments that differ.
+
+Each thread keeps one connection open for its lifetime. The database runs in
+WAL mode so readers never block the single writer, and statements are kept
+prepared in sqlite3's per-connection statement cache: the placeholder
+translation is memoized, so a given query always reaches SQLite as the same
+text and is compiled only once per connection.
+"""
+
+import functools
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+from migrations import apply_pending
+
+# Store dates the way MySQL shows them (TIMESTAMP has whole-second precision)
+# and hand DECIMAL/DATE/TIMESTAMP columns back as the same Python types
+# mysql.connector returns.
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" ", timespec="seconds"))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter("DECIMAL", lambda value: Decimal(value.decode()))
+
+
+@functools.lru_cache(maxsize=1024)
+def _translate(sql):
+    """Rewrite mysql.connector ``%s`` placeholders to SQLite's ``?``."""
+    return sql.replace("%s", "?")
+
+
+def _dict_row(cursor, row):
+    return dict(zip([column[0] for column in cursor.description], row))
+
+
+class SQLiteDialect:
+    """SQL fragments for SQLite (3.24+ for upserts)."""
+
+    name = "sqlite"
+    # SQLite has no row locks; start_transaction() takes the database write
+    # lock up front (BEGIN IMMEDIATE), which serializes checkouts instead.
+    for_update = ""
+    next_day = "DATE(%s, '+1 day')"
+    periods = {
+        "day": "sales_date",
+        "week": "DATE(sales_date, '-' || ((CAST(strftime('%w', sales_date) AS INTEGER) + 6) % 7)"
+        " || ' days')",
+        "month": "DATE(sales_date, 'start of month')",
+    }
+
+    @staticmethod
+    def upsert(conflict_columns, replace=(), add=()):
+        """
+        Return the upsert clause: ``replace`` columns take the new value, ``add`` sum it.
+
+        Sums are rounded as in decimal(), to the largest scale in the schema
+        (3 places); an INT column's affinity turns the rounded value back into
+        an integer.
+        """
+        assignments = [f"{column} = excluded.{column}" for column in replace]
+        assignments += [
+            f"{column} = {SQLiteDialect.decimal(f'{column} + excluded.{column}', 3)}"
+            for column in add
+        ]
+        return f"ON CONFLICT ({', '.join(conflict_columns)}) DO UPDATE SET " + ", ".join(
+            assignments
+        )
+
+    @staticmethod
+    def decimal(expression, places):
+        """
+        Return a computed DECIMAL ``expression`` rounded to ``places`` decimals.
+
+        SQLite stores DECIMAL columns as REAL, so arithmetic on them picks up
+        binary rounding error (0.300 - 0.100 gives 0.19999999999999998, which
+        is then short of a 0.200 sale). Rounded to the column's scale, a
+        result is the double nearest the exact amount: it compares equal to
+        that amount passed as a parameter and reads back as the same Decimal.
+        """
+        return f"ROUND({expression}, {places})"
+
+    @staticmethod
+    def date_column(expression, alias):
+        """Select ``expression AS alias`` so that it is returned as a datetime.date."""
+        return f'{expression} AS "{alias} [DATE]"'
+
+    @staticmethod
+    def estimate_rows(cursor, sql, params):
+        """Return the number of rows ``sql`` matches (SQLite has no cheap planner estimate)."""
+        cursor.execute(f"SELECT COUNT(*) FROM ({sql})", params)
+        row = cursor.fetchone()
+        return int(row[0]) if row else 0
+
+    @staticmethod
+    def name_search(column, term):
+        """
+        Return a (condition, params) pair matching ``column`` against a search ``term``.
+
+        SQLite keeps the substring LIKE; the covering invoice listing index
+        (migration 0002) lets it scan that index instead of the table.
+        """
+        return f"{column} LIKE %s", [f"%{term}%"]
+
+    @staticmethod
+    def full_scans(cursor, sql, params):
+        """Return the tables EXPLAIN QUERY PLAN says ``sql`` reads without an index."""
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        scans = []
+        for row in cursor.fetchall():
+            match = re.match(r"SCAN (?:TABLE )?(\w+)", row["detail"])
+            if match and "INDEX" not in row["detail"]:
+                scans.append(match.group(1))
+        return scans
+
+
+class SQLiteCursor:
+    """Cursor wrapper accepting mysql.connector-style ``%s`` statements."""
+
+    def __init__(self, cursor):
+        """Wrap a sqlite3 cursor."""
+        self._cursor = cursor
+
+    def execute(self, sql, params=()):
+        """Execute one statement."""
+        return self._cursor.execute(_translate(sql), params)
+
+    def executemany(self, sql, seq_of_params):
+        """Execute one statement for every parameter tuple."""
+        return self._cursor.executemany(_translate(sql), seq_of_params)
+
+    def __iter__(self):
+        """Iterate over the result rows."""
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        """Delegate fetchone/fetchmany/fetchall, lastrowid, rowcount, close, ... to sqlite3."""
+        return getattr(self._cursor, name)
+
+
+class SQLiteConnection:
+    """Connection wrapper with the mysql.connector methods the models call."""
+
+    def __init__(self, raw):
+        """Wrap a sqlite3 connection."""
+        self._raw = raw
+        self.depth = 0  # Nested checkouts by the owning thread
+
+    def cursor(self, dictionary=False, buffered=True):
+        """
+        Return a cursor; ``dictionary`` rows are dicts keyed by column name.
+
+        ``buffered`` is accepted for compatibility: SQLite always steps through
+        results lazily, so fetchmany() never loads the whole result set.
+        """
+        cursor = self._raw.cursor()
+        if dictionary:
+            cursor.row_factory = _dict_row
+        return SQLiteCursor(cursor)
+
+    def start_transaction(self):
+        """Begin a transaction holding the write lock until commit or rollback."""
+        self._raw.execute("BEGIN IMMEDIATE")
+
+    @property
+    def in_transaction(self):
+        """True while a transaction is open."""
+        return self._raw.in_transaction
+
+    def commit(self):
+        """Commit the current transaction."""
+        self._raw.commit()
+
+    def rollback(self):
+        """Roll back the current transaction."""
+        self._raw.rollback()
+
+    def close(self):
+        """Close the underlying connection."""
+        self._raw.close()
+
+
+class SQLiteBackend:
+    """
+    One SQLite connection per thread over a shared database file.
+
+    Offers the same acquire/release/discard/stats interface as the MySQL
+    ConnectionPool. A thread that checks out a connection while already
+    holding one gets the same connection back; it is only cleaned up (open
+    transaction rolled back) when the outermost checkout is released.
+    """
+
+    dialect = SQLiteDialect
+
+    def __init__(self, path, timeout):
+        """Prepare the backend; pending migrations are applied on the first connection."""
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._schema_ready = False
+        self._stats = {"connections_created": 0, "open": 0, "checkouts": 0}
+
+    def _connect(self):
+        """Open and configure this thread's connection."""
+        raw = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+            cached_statements=256,
+        )
+        raw.execute("PRAGMA journal_mode=WAL")
+        raw.execute("PRAGMA synchronous=NORMAL")
+        raw.execute("PRAGMA foreign_keys=ON")
+        conn = SQLiteConnection(raw)
+        with self._lock:
+            if not self._schema_ready:
+                apply_pending(conn, "sqlite")
+                self._schema_ready = True
+            self._stats["connections_created"] += 1
+            self._stats["open"] += 1
+        print(f"Successfully opened SQLite database {self.path}!")
+        return conn
+
+    def acquire(self):
+        """Return this thread's connection, opening it if needed; None on error."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                conn = self._local.conn = self._connect()
+            except sqlite3.Error as e:
+                print(f"Error opening SQLite database: {e}")
+                return None
+        conn.depth += 1
+        with self._lock:
+            self._stats["checkouts"] += 1
+        return conn
+
+    def release(self, conn):
+        """
+        Give back a checkout.
+
+        When the outermost checkout ends, a transaction left open by the caller
+        is rolled back so the write lock is not held past the request.
+        """
+        conn.depth -= 1
+        if conn.depth > 0:
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self.discard(conn)
+
+    def discard(self, conn):
+        """Close this thread's connection; the next checkout opens a new one."""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        if getattr(self._local, "conn", None) is conn:
+            self._local.conn = None
+        with self._lock:
+            self._stats["open"] -= 1
+
+    def close_idle(self):
+        """Close this thread's connection if it is not checked out; return 1 if it was closed."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or conn.depth > 0:
+            return 0
+        self.discard(conn)
+        return 1
+
+    def stats(self):
+        """Return a snapshot of backend metrics as a dictionary."""
+        with self._lock:
+            return dict(self._stats, backend="sqlite")
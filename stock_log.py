@@ -0,0 +1,320 @@
+"""
+Stock movement log for the Retail Invoice Management System.
+
+Every change to a product's quantity_available is recorded as an event: when it
+happened, the product, the change in grams, why (a REASONS name) and the
+invoice it belongs to, if any. Events are fixed-size binary records appended to
+one file, so the log is compact and never rewritten.
+
+Model write paths call StockLog.record after their transaction commits. That
+only appends to an in-memory queue; a background thread writes the queued
+events in batches, so checkout does not wait for the disk. Events still queued
+when a process is killed (rather than exiting normally) are lost.
+
+StockHistory reads the file into a per-product, time-ordered index and keeps it
+current by reading only the records appended since, so "the stock of product X
+at time T" is a binary search over running totals rather than a replay of the
+whole file.
+"""
+
+import atexit
+import os
+import struct
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from itertools import accumulate
+from datetime import datetime
+
+MAGIC = b"STKLOG1\n"  # First bytes of every log file (format version 1)
+
+# microseconds since the epoch, product_id, change in grams, reason code, invoice_id (0 = none)
+RECORD = struct.Struct("<qIqBI")
+
+REASONS = (
+    "opening",  # stock already on hand when the log was started (see movements.py)
+    "create",  # Product.save
+    "edit",  # Product.update
+    "import",  # Product.bulk_upsert
+    "adjust",  # Product.update_quantity
+    "sale",  # Invoice.save
+    "hold",  # StockReservation.hold
+    "release",  # a hold returned to stock, or consumed by the sale of its invoice_id
+)
+HOLD_REASONS = frozenset(["hold", "release"])
+
+_REASON_CODES = {reason: code for code, reason in enumerate(REASONS)}
+_HOLD_CODES = frozenset(_REASON_CODES[reason] for reason in HOLD_REASONS)
+
+
+def _micros(moment):
+    """Return a naive local datetime as integer microseconds since the epoch."""
+    return round(moment.timestamp() * 1_000_000)
+
+
+def _open_log(path):
+    """Open ``path`` for appending, creating it with the MAGIC header if it does not exist."""
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644)
+        os.write(fd, MAGIC)
+        return fd
+    except FileExistsError:
+        return os.open(path, os.O_WRONLY | os.O_APPEND)
+
+
+class StockLog:
+    """
+    Write-behind writer for the stock movement log.
+
+    Events are queued by record() and written by a daemon thread every
+    ``flush_interval`` seconds, or as soon as ``batch_size`` are waiting. Each
+    batch is a single append of whole records, so processes sharing the file
+    never interleave inside a record. A ``path`` of None disables the log.
+    """
+
+    def __init__(self, path, flush_interval=1.0, batch_size=500):
+        """Initialize a writer for ``path``; the file and thread are created on first use."""
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.written = 0
+        self.flushes = 0
+        self.errors = 0
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            # A forked worker inherits the queue, which its parent will write, but
+            # not the writer thread.
+            os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.flush)
+
+    def _reset(self):
+        self._pending = []
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._fd = None
+
+    @property
+    def enabled(self):
+        """Return True if events are being recorded."""
+        return bool(self.path)
+
+    def record(self, reason, changes, invoice_id=None):
+        """
+        Queue one event per product in ``changes`` (product_id -> change in grams).
+
+        Products whose change is zero are skipped. Call only after the change
+        has been committed.
+        """
+        if not self.path:
+            return
+        now = round(time.time() * 1_000_000)
+        code = _REASON_CODES[reason]
+        events = [
+            (now, int(product_id), delta, code, invoice_id or 0)
+            for product_id, delta in changes.items()
+            if delta
+        ]
+        if not events:
+            return
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="stock-log-writer", daemon=True
+                )
+                self._thread.start()
+            self._pending.extend(events)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if len(self._pending) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """
+        Append every queued event to the file now.
+
+        Return the number of events written. If the write fails the events stay
+        queued and are retried by the next flush.
+        """
+        with self._write_lock:
+            with self._cond:
+                events, self._pending = self._pending, []
+            if not events:
+                return 0
+            data = b"".join([RECORD.pack(*event) for event in events])
+            try:
+                if self._fd is None:
+                    self._fd = _open_log(self.path)
+                while data:
+                    written = os.write(self._fd, data)
+                    data = data[written:]
+            except OSError as e:
+                print(f"Error writing stock movement log: {e}")
+                self.errors += 1
+                with self._cond:
+                    self._pending[:0] = events
+                return 0
+            self.written += len(events)
+            self.flushes += 1
+            return len(events)
+
+    def stats(self):
+        """Return queue and write counters."""
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "enabled": self.enabled,
+            "pending": pending,
+            "written": self.written,
+            "flushes": self.flushes,
+            "errors": self.errors,
+        }
+
+
+class _Timeline:
+    """One product's events in time order, with running totals."""
+
+    __slots__ = ("times", "deltas", "reasons", "invoice_ids", "available", "_on_hand")
+
+    def __init__(self):
+        self.times = []
+        self.deltas = []
+        self.reasons = []
+        self.invoice_ids = []
+        self.available = []  # quantity_available after each event
+        self._on_hand = []  # the same, ignoring holds; extended on demand by on_hand()
+
+    def extend(self, records):
+        """Add (moment, product_id, delta, reason code, invoice_id) records read from the log."""
+        times, _, deltas, reasons, invoice_ids = zip(*records)
+        position = len(self.times)
+        if (position and times[0] < self.times[-1]) or list(times) != sorted(times):
+            # Batches from several processes can land slightly out of order:
+            # re-sort from the first event the new ones go before.
+            position = bisect_right(self.times, min(times))
+            kept = zip(
+                self.times[position:],
+                [None] * (len(self.times) - position),
+                self.deltas[position:],
+                self.reasons[position:],
+                self.invoice_ids[position:],
+            )
+            records = sorted([*kept, *records], key=lambda record: record[0])
+            for column in self.__slots__:
+                del getattr(self, column)[position:]
+            times, _, deltas, reasons, invoice_ids = zip(*records)
+        self.times.extend(times)
+        self.deltas.extend(deltas)
+        self.reasons.extend(reasons)
+        self.invoice_ids.extend(invoice_ids)
+        self.available.extend(accumulate(deltas, initial=self.available[-1] if position else 0))
+        del self.available[position]
+
+    def on_hand(self):
+        """Return the running totals ignoring holds: stock not yet sold."""
+        done = len(self._on_hand)
+        if done < len(self.times):
+            changes = (
+                0 if code in _HOLD_CODES else delta
+                for delta, code in zip(self.deltas[done:], self.reasons[done:])
+            )
+            self._on_hand.extend(accumulate(changes, initial=self._on_hand[-1] if done else 0))
+            del self._on_hand[done]
+        return self._on_hand
+
+
+class StockHistory:
+    """
+    Index of a stock movement log by product and time.
+
+    The file is read incrementally: every query first indexes the records
+    appended since the previous one.
+    """
+
+    def __init__(self, path):
+        """Initialize an empty index of the log at ``path``."""
+        self.path = path
+        self._offset = len(MAGIC)  # Bytes of the file already indexed
+        self._timelines = {}  # product_id -> _Timeline
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Index the records appended since the last refresh; return how many were read."""
+        if not self.path:
+            return 0
+        with self._lock:
+            try:
+                with open(self.path, "rb") as f:
+                    if f.read(len(MAGIC)) != MAGIC:
+                        raise ValueError(f"{self.path} is not a stock movement log.")
+                    f.seek(self._offset)
+                    data = f.read()
+            except FileNotFoundError:
+                return 0
+            # A batch being appended right now may end in a partial record.
+            data = data[: len(data) - len(data) % RECORD.size]
+            by_product = defaultdict(list)
+            for record in RECORD.iter_unpack(data):
+                by_product[record[1]].append(record)
+            for product_id, records in by_product.items():
+                timeline = self._timelines.get(product_id)
+                if timeline is None:
+                    timeline = self._timelines[product_id] = _Timeline()
+                timeline.extend(records)
+            self._offset += len(data)
+            return len(data) // RECORD.size
+
+    def product_ids(self):
+        """Return the set of products that have at least one event."""
+        self.refresh()
+        return set(self._timelines)
+
+    def stock_at(self, product_id, at=None, include_holds=True):
+        """
+        Return a product's stock in grams at ``at`` (a datetime, default now).
+
+        With ``include_holds`` this is quantity_available as it was then (stock
+        neither sold nor held for a cart); otherwise stock held for carts is
+        counted as still on hand. A product with no events before ``at`` has 0.
+        """
+        self.refresh()
+        with self._lock:
+            timeline = self._timelines.get(product_id)
+            if timeline is None:
+                return 0
+            position = bisect_right(timeline.times, _micros(at or datetime.now()))
+            if position == 0:
+                return 0
+            totals = timeline.available if include_holds else timeline.on_hand()
+            return totals[position - 1]
+
+    def events(self, product_id, start=None, end=None):
+        """
+        Return a product's events between two datetimes (inclusive), oldest first.
+
+        Each event is a dictionary with 'at', 'change_grams', 'reason',
+        'invoice_id' and 'quantity_grams' (quantity_available after it).
+        """
+        self.refresh()
+        with self._lock:
+            timeline = self._timelines.get(product_id)
+            if timeline is None:
+                return []
+            first = bisect_left(timeline.times, _micros(start)) if start else 0
+            last = bisect_right(timeline.times, _micros(end)) if end else len(timeline.times)
+            return [
+                {
+                    "at": datetime.fromtimestamp(timeline.times[index] / 1_000_000),
+                    "change_grams": timeline.deltas[index],
+                    "reason": REASONS[timeline.reasons[index]],
+                    "invoice_id": timeline.invoice_ids[index] or None,
+                    "quantity_grams": timeline.available[index],
+                }
+                for index in range(first, last)
+            ]
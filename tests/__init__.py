@@ -0,0 +1 @@
+"""Tests for the Retail Invoice Management System (run with ``python -m pytest``)."""
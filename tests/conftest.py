@@ -0,0 +1,58 @@
+"""
+Shared pytest setup: every test runs against a throw-away SQLite database.
+
+database.py picks its backend when first imported, so the settings are
+changed here, before any test module imports the app.
+"""
+
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+
+_DB_DIR = tempfile.mkdtemp(prefix="retail-tests-")
+
+Config.DB_BACKEND = "sqlite"
+Config.SQLITE_PATH = os.path.join(_DB_DIR, "retail.sqlite3")
+Config.STOCK_LOG_PATH = None
+Config.LOW_STOCK_ALERT_PATH = None
+Config.TEMPLATE_CACHE_DIR = None
+Config.PRECOMPILE_TEMPLATES = False
+
+_names = itertools.count(1)
+
+
+def pytest_unconfigure(config):
+    """Remove the test database."""
+    shutil.rmtree(_DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def make_product():
+    """Return a function that saves a product (named uniquely by default) and returns its id."""
+    from models import Product
+
+    def make(name=None, quantity_available=100, unit_price=80):
+        name = name or f"Test Product {next(_names)}"
+        assert Product(
+            product_name=name, quantity_available=quantity_available, unit_price=unit_price
+        ).save()
+        (product,) = Product.get_by_name_like(name)
+        return product["product_id"]
+
+    return make
+
+
+@pytest.fixture
+def client():
+    """Return a test client for a freshly built app."""
+    from app import create_app
+
+    return create_app().test_client()
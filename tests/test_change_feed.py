@@ -0,0 +1,58 @@
+"""Tests for the cross-process product change feed (change_feed.py)."""
+
+import copy
+
+import pytest
+
+import change_feed
+from change_feed import EVERYTHING, ChangeFeed
+
+
+@pytest.fixture
+def feeds(monkeypatch):
+    """Return two views (A and B) of one shared feed, as two worker processes see it."""
+    feed = ChangeFeed(slots=4)
+    feed.share()
+    workers = {"A": feed, "B": copy.copy(feed)}
+    current = {"pid": None}
+    monkeypatch.setattr(change_feed.os, "getpid", lambda: current["pid"])
+
+    def run(name, method, *args, **kwargs):
+        current["pid"] = {"A": 1001, "B": 1002}[name]
+        return getattr(workers[name], method)(*args, **kwargs)
+
+    return run
+
+
+def test_poll_returns_other_workers_changes(feeds):
+    """A worker sees another worker's changes, not its own."""
+    feeds("A", "publish", [5], stock={5: -500})
+    assert feeds("B", "poll") == ({5}, {5: -500}, False)
+    assert feeds("A", "poll") is None
+
+
+def test_poll_skips_own_entries_published_after_another_worker(feeds):
+    """Own entries behind another worker's entry are skipped, not replayed."""
+    feeds("B", "publish", [7], stock={7: -100})
+    feeds("A", "publish", [5], stock={5: -500})
+    assert feeds("A", "poll") == ({7}, {7: -100}, False)
+    assert feeds("B", "poll") == ({5}, {5: -500}, False)
+    assert feeds("A", "poll") is None
+    assert feeds("B", "poll") is None
+
+
+def test_stock_changes_are_summed_and_catalog_changes_flagged(feeds):
+    """Stock changes to one product add up; a catalog change is flagged."""
+    feeds("A", "publish", [3], stock={3: -250})
+    feeds("A", "publish", [3], stock={3: 1000}, catalog=True)
+    assert feeds("B", "poll") == ({3}, {3: 750}, True)
+
+
+def test_publishing_everything_and_falling_behind_drop_everything(feeds):
+    """An all-products entry or a ring overrun tells pollers to drop everything."""
+    feeds("A", "publish")
+    assert feeds("B", "poll") is EVERYTHING
+
+    feeds("A", "publish", [1, 2, 3])
+    feeds("A", "publish", [4, 5])
+    assert feeds("B", "poll") is EVERYTHING
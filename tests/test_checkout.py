@@ -0,0 +1,105 @@
+"""Tests for the JSON checkout API (POST /api/invoices) and its idempotency keys."""
+
+from decimal import Decimal
+
+from models import Invoice, Product
+from money import sale_line
+
+
+def _checkout(client, product_id, quantity, key=None, customer_name="Ravi Kumar"):
+    headers = {"Idempotency-Key": key} if key else {}
+    return client.post(
+        "/api/invoices",
+        json={
+            "customer_name": customer_name,
+            "items": [{"product_id": product_id, "quantity": quantity}],
+        },
+        headers=headers,
+    )
+
+
+def _stock(product_id):
+    return Product.get_by_id(product_id)["quantity_available"]
+
+
+def test_checkout_creates_invoice_and_takes_stock(client, make_product):
+    """A checkout creates the invoice and takes its quantity from stock."""
+    product_id = make_product(quantity_available=100, unit_price="80.50")
+    response = _checkout(client, product_id, "1.5")
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body["grand_total"] == 120.75
+    assert body["replayed"] is False
+    assert _stock(product_id) == Decimal("98.500")
+
+
+def test_repeated_idempotency_key_replays_the_first_invoice(client, make_product):
+    """A retry with the same key returns the first invoice and takes stock once."""
+    product_id = make_product(quantity_available=100)
+    first = _checkout(client, product_id, 2, key="till-1-0001")
+    again = _checkout(client, product_id, 2, key="till-1-0001")
+    assert first.status_code == 201
+    assert again.status_code == 200
+    assert again.get_json()["replayed"] is True
+    assert again.get_json()["invoice_id"] == first.get_json()["invoice_id"]
+    assert _stock(product_id) == Decimal("98.000")
+
+
+def test_idempotency_key_reused_for_another_request_is_rejected(client, make_product):
+    """A key reused with a different cart is rejected without taking stock."""
+    product_id = make_product(quantity_available=100)
+    assert _checkout(client, product_id, 2, key="till-1-0002").status_code == 201
+    response = _checkout(client, product_id, 3, key="till-1-0002")
+    assert response.status_code == 422
+    assert "different request" in response.get_json()["error"]
+    assert _stock(product_id) == Decimal("98.000")
+
+
+def test_checkout_short_of_stock_is_rejected(client, make_product):
+    """A checkout for more than is in stock is rejected with details."""
+    product_id = make_product(quantity_available=5)
+    response = _checkout(client, product_id, 6)
+    assert response.status_code == 422
+    body = response.get_json()
+    assert body["error"] == "Cart validation failed."
+    assert len(body["details"]) == 1
+    assert _stock(product_id) == Decimal("5.000")
+
+
+def test_invoice_save_reports_short_stock(make_product):
+    """Invoice.save records why it refused a sale short of stock."""
+    product_id = make_product(quantity_available=1, unit_price=100)
+    invoice = Invoice(
+        customer_name="Asha",
+        grand_total_paise=20000,
+        items=[sale_line(product_id, "Short", 10000, 2000)],
+    )
+    assert invoice.save() is None
+    assert invoice.stock_error
+    assert _stock(product_id) == Decimal("1.000")
+
+
+def test_malformed_checkout_is_rejected(client, make_product):
+    """Bad bodies and over-long keys get a 400 and take no stock."""
+    product_id = make_product(quantity_available=10)
+    assert client.post("/api/invoices", json=[]).status_code == 400
+    assert _checkout(client, product_id, -1).status_code == 400
+    assert _checkout(client, product_id, 1, key="k" * 65).status_code == 400
+    assert _stock(product_id) == Decimal("10")
+
+
+def test_lines_for_one_product_are_checked_together(client, make_product):
+    """Two lines that each fit but together exceed the stock are refused."""
+    product_id = make_product(quantity_available=5)
+    response = client.post(
+        "/api/invoices",
+        json={
+            "customer_name": "Split Lines",
+            "items": [
+                {"product_id": product_id, "quantity": 3},
+                {"product_id": product_id, "quantity": 3},
+            ],
+        },
+    )
+    assert response.status_code == 422
+    assert _stock(product_id) == Decimal("5")
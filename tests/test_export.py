@@ -0,0 +1,87 @@
+"""Tests for the streaming invoice export (export.py and Invoice.iter_export)."""
+
+import csv
+import io
+import json
+import sqlite3
+
+import pytest
+
+import export
+from models import Invoice
+from money import sale_line
+from sqlite_backend import SQLiteCursor
+
+
+@pytest.fixture
+def exported_invoices(make_product):
+    """Save two invoices (three lines) for a customer of their own; return (customer, ids)."""
+    rice, dal = make_product(unit_price="80.50"), make_product(unit_price=120)
+    customer = f"Export Customer #{rice}#"
+    invoices = [
+        [sale_line(rice, "Rice", 8050, 1500), sale_line(dal, "Dal", 12000, 250)],
+        [sale_line(dal, "Dal", 12000, 1000)],
+    ]
+    return customer, [
+        Invoice(customer_name=customer, grand_total_paise=0, items=items).save()
+        for items in invoices
+    ]
+
+
+@pytest.fixture
+def failing_stream(monkeypatch):
+    """Make every export cursor fail on its second batch of rows."""
+    calls = []
+
+    def fetchmany(self, size):
+        calls.append(size)
+        if len(calls) > 1:
+            raise sqlite3.OperationalError("disk I/O error")
+        return self._cursor.fetchmany(size)
+
+    monkeypatch.setattr(SQLiteCursor, "fetchmany", fetchmany, raising=False)
+
+
+def test_csv_export_has_a_row_per_invoice_line(exported_invoices):
+    """The CSV has the header and one row per line, in invoice order."""
+    customer, (first, second) = exported_invoices
+    text = "".join(export.generate_export("csv", customer_name=customer))
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert [int(row["invoice_id"]) for row in rows] == [first, first, second]
+    assert rows[0]["item_total"] == "120.75"
+
+
+def test_ndjson_export_keeps_decimals_exact(exported_invoices):
+    """NDJSON records carry decimals as exact strings."""
+    customer, _ = exported_invoices
+    text = "".join(export.generate_export("ndjson", customer_name=customer))
+    records = [json.loads(line) for line in text.splitlines()]
+    assert len(records) == 3
+    assert records[0]["unit_price"] == "80.5"
+    assert records[2]["quantity_sold"] == "1"
+
+
+def test_failed_export_raises_instead_of_ending(exported_invoices, failing_stream):
+    """A database error part-way through reaches the consumer of the stream."""
+    customer, _ = exported_invoices
+    rows = Invoice.iter_export(customer_name=customer, batch_size=1)
+    assert next(rows)["customer_name"] == customer
+    with pytest.raises(sqlite3.OperationalError):
+        list(rows)
+
+
+def test_failed_export_exits_with_an_error(exported_invoices, failing_stream, tmp_path, capsys):
+    """The command line reports a failed export and exits with status 1."""
+    customer, _ = exported_invoices
+    output = tmp_path / "invoices.csv"
+    assert export.main(["--customer-name", customer, "-o", str(output)]) == 1
+    assert "output is incomplete" in capsys.readouterr().err
+
+
+def test_export_endpoint_streams_the_export(client, exported_invoices):
+    """GET /api/invoices/export streams the same CSV as the command line."""
+    customer, _ = exported_invoices
+    response = client.get("/api/invoices/export", query_string={"customer_name": customer})
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert len(response.get_data(as_text=True).splitlines()) == 4
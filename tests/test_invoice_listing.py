@@ -0,0 +1,79 @@
+"""Tests for the keyset-paginated invoice listing (Invoice.get_all, /invoices, /api/invoices)."""
+
+import pytest
+
+from models import Invoice
+from money import sale_line
+
+
+@pytest.fixture
+def customer_invoices(make_product):
+    """Save five invoices for a customer of their own; return (customer, ids newest first)."""
+    product_id = make_product(quantity_available=1000, unit_price=10)
+    customer = f"Pager Invoices #{product_id}#"
+    saved = [
+        Invoice(
+            customer_name=customer,
+            grand_total_paise=1000,
+            items=[sale_line(product_id, "Pager", 1000, 1000)],
+        ).save()
+        for _ in range(5)
+    ]
+    return customer, saved[::-1]
+
+
+def _ids(rows):
+    return [row["invoice_id"] for row in rows]
+
+
+def test_invoice_cursors_walk_both_directions(customer_invoices):
+    """Invoice pages follow next and prev cursors back to the first page."""
+    customer, newest_first = customer_invoices
+
+    def page(cursor=None, direction="next"):
+        return Invoice.get_all(
+            customer_name=customer, page_size=2, cursor=cursor, direction=direction
+        )
+
+    first = page()
+    assert _ids(first["invoices"]) == newest_first[:2]
+    assert first["prev_cursor"] is None
+
+    second = page(first["next_cursor"])
+    assert _ids(second["invoices"]) == newest_first[2:4]
+
+    last = page(second["next_cursor"])
+    assert _ids(last["invoices"]) == newest_first[4:]
+    assert last["next_cursor"] is None
+
+    back = page(last["prev_cursor"], "prev")
+    assert _ids(back["invoices"]) == newest_first[2:4]
+    back = page(back["prev_cursor"], "prev")
+    assert _ids(back["invoices"]) == newest_first[:2]
+    assert back["prev_cursor"] is None
+
+
+def test_listing_api_pages_with_before_and_after(client, customer_invoices):
+    """GET /api/invoices takes the cursors as ``after`` (older) and ``before`` (newer)."""
+    customer, newest_first = customer_invoices
+    query = {"customer_name": customer, "page_size": 3}
+    first = client.get("/api/invoices", query_string=query).get_json()
+    assert _ids(first["invoices"]) == newest_first[:3]
+    assert all(invoice["item_count"] == 1 for invoice in first["invoices"])
+
+    older = client.get("/api/invoices", query_string={**query, "after": first["next_cursor"]})
+    assert _ids(older.get_json()["invoices"]) == newest_first[3:]
+    newer = client.get(
+        "/api/invoices", query_string={**query, "before": older.get_json()["prev_cursor"]}
+    )
+    assert _ids(newer.get_json()["invoices"]) == newest_first[:3]
+
+
+def test_invoices_page_renders_one_page(client, customer_invoices):
+    """The /invoices page lists one page of the filtered invoices."""
+    customer, newest_first = customer_invoices
+    response = client.get("/invoices", query_string={"customer_name": customer, "page_size": 2})
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert f"/invoice/{newest_first[0]}" in html
+    assert f"/invoice/{newest_first[2]}" not in html
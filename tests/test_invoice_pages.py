@@ -0,0 +1,48 @@
+"""Tests for the rendered invoice page cache (app._immutable_response)."""
+
+from app import create_app
+from config import Config
+from models import Invoice
+from money import sale_line
+
+
+class ShortLivedPages(Config):
+    """Settings with a short max-age and a one-entry page cache."""
+
+    INVOICE_PAGE_MAX_AGE = 60
+    INVOICE_PAGE_CACHE_SIZE = 1
+
+
+def _invoice(product_id):
+    return Invoice(
+        customer_name="Cached Page",
+        grand_total_paise=8000,
+        items=[sale_line(product_id, "x", 8000, 1000)],
+    ).save()
+
+
+def test_invoice_pages_are_cached_and_revalidated(make_product):
+    """A page is served with an ETag, and a matching If-None-Match gets a 304."""
+    client = create_app().test_client()
+    invoice_id = _invoice(make_product())
+    first = client.get(f"/api/invoices/{invoice_id}")
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == (
+        f"private, max-age={Config.INVOICE_PAGE_MAX_AGE}, immutable"
+    )
+    again = client.get(
+        f"/api/invoices/{invoice_id}", headers={"If-None-Match": first.headers["ETag"]}
+    )
+    assert again.status_code == 304
+
+
+def test_cache_settings_come_from_the_app_config(make_product):
+    """create_app(config) sets the max-age and the size of that app's cache."""
+    app = create_app(ShortLivedPages)
+    client = app.test_client()
+    product_id = make_product()
+    for invoice_id in (_invoice(product_id), _invoice(product_id)):
+        response = client.get(f"/api/invoices/{invoice_id}")
+        assert response.headers["Cache-Control"] == "private, max-age=60, immutable"
+    assert app.extensions["invoice_pages"].stats()["size"] == 1
+    assert create_app().extensions["invoice_pages"].stats()["size"] == 0
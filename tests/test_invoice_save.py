@@ -0,0 +1,42 @@
+"""Tests for Invoice.save's single-transaction write path."""
+
+from decimal import Decimal
+
+import models
+from models import Invoice, Product
+from money import sale_line
+
+
+def test_unexpected_error_rolls_back_and_clears_the_invoice_id(make_product, monkeypatch):
+    """A failure part-way through leaves no invoice, no id and the stock untouched."""
+    product_id = make_product(quantity_available=10)
+
+    def fail(*args):
+        raise RuntimeError("rollup failed")
+
+    monkeypatch.setattr(models, "_daily_sales_rows", fail)
+    invoice = Invoice(
+        customer_name="Rolled Back",
+        grand_total_paise=8000,
+        items=[sale_line(product_id, "x", 8000, 1000)],
+    )
+    assert invoice.save() is None
+    assert invoice.invoice_id is None
+    assert Invoice.get_all(customer_name="Rolled Back") == []
+    assert Product.get_by_id(product_id)["quantity_available"] == Decimal("10")
+
+
+def test_multi_line_invoice_is_saved_in_one_transaction(make_product):
+    """Every line is stored and its stock taken; lines for one product are combined."""
+    rice, dal = make_product(quantity_available=10), make_product(quantity_available=10)
+    items = [
+        sale_line(rice, "Rice", 8000, 1500),
+        sale_line(dal, "Dal", 12000, 2000),
+        sale_line(rice, "Rice", 8000, 500),
+    ]
+    invoice = Invoice(customer_name="Many Lines", grand_total_paise=40000, items=items)
+    invoice_id = invoice.save()
+    assert invoice_id
+    assert len(Invoice.get_by_id(invoice_id)["items"]) == 3
+    assert Product.get_by_id(rice)["quantity_available"] == Decimal("8")
+    assert Product.get_by_id(dal)["quantity_available"] == Decimal("8")
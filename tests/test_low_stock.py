@@ -0,0 +1,90 @@
+"""Tests for the low-stock index and alerts (low_stock.py) and their model and API hooks."""
+
+import json
+from decimal import Decimal
+
+import models
+from low_stock import AlertSink, LowStockIndex
+from models import Product
+
+
+def _alerts(path):
+    if not path.exists():
+        return []
+    return [(event["event"], event["product_id"]) for event in map(json.loads, path.open())]
+
+
+def _index(tmp_path):
+    return LowStockIndex(AlertSink(str(tmp_path / "alerts.jsonl"), flush_interval=60))
+
+
+def test_crossing_the_reorder_level_alerts(tmp_path):
+    """Stock falling to the reorder level raises "low"; rising above it, "restocked"."""
+    index = _index(tmp_path)
+    index.load([(1, "Rice", 10000, 5000, True), (2, "Dal", 3000, 5000, True)])
+    assert [product["product_id"] for product in index.low()] == [2]
+
+    index.apply({1: -5000, 3: -1000})
+    index.apply({2: 4000})
+    assert [product["product_id"] for product in index.low()] == [1]
+    assert index.low()[0]["quantity_available"] == Decimal("5")
+    assert index.sink.flush() == 2
+    assert _alerts(tmp_path / "alerts.jsonl") == [("low", 1), ("restocked", 2)]
+    assert index.stats()["alerts"] == 2
+
+
+def test_inactive_and_untracked_products_are_never_low(tmp_path):
+    """Deactivating a low product clears it silently; dropping its level untracks it."""
+    index = _index(tmp_path)
+    index.load([(1, "Rice", 1000, 5000, True), (2, "Dal", 1000, 5000, True)])
+    index.set_product(1, is_active=False)
+    index.set_reorder_level(2, "Dal", 1000, None, True)
+    assert index.low() == []
+    assert index.reorder_level(2) is None
+    assert index.sink.flush() == 0
+
+
+def test_reloads_alert_on_outside_changes(tmp_path):
+    """A reload alerts on changes made elsewhere, unless invalidated without alerts."""
+    index = _index(tmp_path)
+    index.load([(1, "Rice", 10000, 5000, True)])
+    index.load([(1, "Rice", 4000, 5000, True)])
+    index.invalidate(alerts=False)
+    assert index.is_stale(60)
+    index.load([(1, "Rice", 9000, 5000, True)])
+    index.sink.flush()
+    assert _alerts(tmp_path / "alerts.jsonl") == [("low", 1)]
+
+
+def test_failed_delivery_is_retried(tmp_path):
+    """Events stay queued when the sink cannot write them and go out with the next flush."""
+    path = tmp_path / "missing" / "alerts.jsonl"
+    sink = AlertSink(str(path), flush_interval=60)
+    sink.emit([{"event": "low", "product_id": 1}])
+    assert sink.flush() == 0
+    assert sink.stats()["errors"] == 1
+    assert sink.stats()["pending"] == 1
+    path.parent.mkdir()
+    assert sink.flush() == 1
+    assert _alerts(path) == [("low", 1)]
+
+
+def test_model_writes_update_the_index(monkeypatch, tmp_path, make_product, client):
+    """Reorder levels and stock adjustments move a product in and out of /api/stock/low."""
+    index = _index(tmp_path)
+    monkeypatch.setattr(models, "_low_stock", index)
+    product_id = make_product(quantity_available=10)
+    assert Product.set_reorder_level(product_id, Decimal("5"))
+    assert Product.reorder_level(product_id) == Decimal("5")
+
+    assert Product.update_quantity(product_id, -6)
+    low = client.get("/api/stock/low").get_json()["products"]
+    assert [
+        (p["product_id"], p["quantity_available"]) for p in low if p["product_id"] == product_id
+    ] == [(product_id, 4.0)]
+
+    assert Product.update_quantity(product_id, 2)
+    assert product_id not in [product["product_id"] for product in Product.low_stock()]
+    index.sink.flush()
+    assert _alerts(tmp_path / "alerts.jsonl") == [("low", product_id), ("restocked", product_id)]
+    assert Product.low_stock_stats()["tracked"] >= 1
@@ -0,0 +1,75 @@
+"""Tests for paise and gram arithmetic (money.py)."""
+
+from decimal import Decimal
+
+import pytest
+
+from money import cart_total, kgs, line_total, rupees, sale_line, to_grams, to_paise
+
+
+def test_to_paise_rounds_half_up():
+    """Rupee amounts are rounded half up to whole paise."""
+    assert to_paise("80.505") == 8051
+    assert to_paise("80.504") == 8050
+    assert to_paise(Decimal("1.005")) == 101
+    assert to_paise(2) == 200
+
+
+def test_to_paise_reads_floats_as_written():
+    """Floats are converted through their decimal text, not their binary value."""
+    assert to_paise(0.1) == 10
+    assert to_paise(1.005) == 101
+
+
+def test_to_grams_rounds_half_up():
+    """Kg quantities are rounded half up to whole grams."""
+    assert to_grams("1.2345") == 1235
+    assert to_grams(" 0.5 ") == 500
+
+
+@pytest.mark.parametrize(
+    "text, grams",
+    [
+        ("2.5", 2500),
+        ("12.", 12000),
+        ("007.125", 7125),
+        ("-1.5", -1500),
+        (".5", 500),
+        ("1e1", 10000),
+    ],
+)
+def test_form_text_converts_like_a_decimal(text, grams):
+    """Plain digits take a shortcut; signs, exponents and so on go through Decimal."""
+    assert to_grams(text) == grams == to_grams(Decimal(text))
+
+
+@pytest.mark.parametrize("value", ["", "abc", None, "1,5", ".", "-", "1.2.3", "NaN", "²"])
+def test_invalid_amounts_are_rejected(value):
+    """Values that are not numbers raise ValueError."""
+    with pytest.raises(ValueError):
+        to_paise(value)
+
+
+def test_line_total_rounds_half_up_to_the_paisa():
+    """Line totals are rounded half up to the paisa."""
+    assert line_total(1500, 8050) == 12075  # 1.5 kg at 80.50
+    assert line_total(333, 8050) == 2681  # 26.8065 rupees
+    assert line_total(1, 500) == 1  # exactly half a paisa
+    assert line_total(1, 499) == 0
+
+
+def test_cart_total_sums_rounded_lines():
+    """The grand total is the sum of the rounded line totals."""
+    lines = [sale_line(1, "Rice", 8050, 333), sale_line(2, "Dal", 12550, 2000)]
+    assert [line["item_total_paise"] for line in lines] == [2681, 25100]
+    assert cart_total(lines) == 27781
+    assert rupees(cart_total(lines)) == Decimal("277.81")
+
+
+def test_rupees_and_kgs_keep_their_places():
+    """Conversions out give Decimals with two and three places, as the columns store them."""
+    assert str(rupees(8050)) == "80.50"
+    assert str(rupees(0)) == "0.00"
+    assert str(rupees(-5)) == "-0.05"
+    assert str(kgs(1250)) == "1.250"
+    assert to_paise(rupees(123456789)) == 123456789
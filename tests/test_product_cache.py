@@ -0,0 +1,73 @@
+"""Tests for the in-process product catalog cache and its write-through invalidation."""
+
+from decimal import Decimal
+
+from database import close_db_connection, get_db_connection
+from models import Invoice, Product
+from money import sale_line
+
+
+def _write_behind_the_cache(sql, params):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    conn.commit()
+    close_db_connection(conn, cursor)
+
+
+def test_rows_are_served_from_the_cache(make_product):
+    """A second read of a product is a cache hit and does not see outside writes."""
+    product_id = make_product(quantity_available=10)
+    Product.get_by_id(product_id)
+    hits = Product.cache_stats()["rows"]["hits"]
+    _write_behind_the_cache(
+        "UPDATE products SET quantity_available = 99 WHERE product_id = %s", (product_id,)
+    )
+    assert Product.get_by_id(product_id)["quantity_available"] == Decimal("10")
+    assert Product.cache_stats()["rows"]["hits"] == hits + 1
+
+
+def test_model_writes_invalidate_the_row(make_product):
+    """Stock adjustments, edits, sales and status changes are seen by the next read."""
+    product_id = make_product(quantity_available=10, unit_price=50)
+    name = Product.get_by_id(product_id)["product_name"]
+
+    assert Product.update_quantity(product_id, 5)
+    assert Product.get_by_id(product_id)["quantity_available"] == Decimal("15")
+
+    product = Product(
+        product_id=product_id, product_name=name, quantity_available=15, unit_price=60
+    )
+    assert product.update()
+    assert Product.get_by_id(product_id)["unit_price"] == Decimal("60")
+
+    invoice = Invoice(
+        customer_name="Cache",
+        grand_total_paise=6000,
+        items=[sale_line(product_id, name, 6000, 1000)],
+    )
+    assert invoice.save()
+    assert Product.get_by_id(product_id)["quantity_available"] == Decimal("14")
+
+    assert Product.inactivate(product_id)
+    assert not Product.get_by_id(product_id)["is_active"]
+
+
+def test_cached_lists_are_dropped_on_any_write(make_product):
+    """Name searches and the full listing reflect new and deactivated products."""
+    first = make_product(name="Cached List Alpha")
+    assert _names(Product.get_by_name_like("Cached List")) == ["Cached List Alpha"]
+    assert "Cached List Alpha" in _names(Product.get_all())
+
+    make_product(name="Cached List Beta")
+    assert _names(Product.get_by_name_like("Cached List")) == [
+        "Cached List Alpha",
+        "Cached List Beta",
+    ]
+    assert Product.inactivate(first)
+    assert _names(Product.get_by_name_like("Cached List")) == ["Cached List Beta"]
+    assert len(Product.get_by_name_like("Cached List", include_inactive=True)) == 2
+
+
+def _names(products):
+    return [product["product_name"] for product in products]
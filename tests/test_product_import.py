@@ -0,0 +1,91 @@
+"""Tests for the bulk product import (model upsert, price list parsing and endpoints)."""
+
+import io
+import json
+from decimal import Decimal
+
+from models import Product
+from product_import import import_products, main, read_rows
+
+
+def _stock(prefix):
+    return {
+        product["product_name"]: (product["quantity_available"], product["unit_price"])
+        for product in Product.get_by_name_like(prefix, include_inactive=True)
+    }
+
+
+def test_bulk_upsert_inserts_and_updates_by_name():
+    """Existing names get the new stock and price, in several chunks, keeping their status."""
+    assert Product.bulk_upsert([("Bulk One", Decimal("1.5"), Decimal("10"))]) == 1
+    assert Product.inactivate(Product.get_by_name_like("Bulk One")[0]["product_id"])
+
+    rows = [("Bulk One", Decimal("2.25"), Decimal("12"))]
+    rows += [(f"Bulk Many {n}", Decimal(n), Decimal("5")) for n in range(5)]
+    assert Product.bulk_upsert(rows, chunk_size=2) == 6
+
+    assert _stock("Bulk One") == {"Bulk One": (Decimal("2.25"), Decimal("12"))}
+    assert not Product.get_by_name_like("Bulk One", include_inactive=True)[0]["is_active"]
+    assert len(_stock("Bulk Many")) == 5
+
+
+def test_read_rows():
+    """CSV and JSON price lists parse to dictionaries; other shapes are refused."""
+    csv_rows = read_rows(io.StringIO("product_name,quantity_available,unit_price\nA,1,2\n"), "csv")
+    assert csv_rows == [{"product_name": "A", "quantity_available": "1", "unit_price": "2"}]
+    assert read_rows(io.StringIO('[{"product_name": "A"}]'), "json") == [{"product_name": "A"}]
+    for text, fmt in (('{"product_name": "A"}', "json"), ("", "xml")):
+        try:
+            read_rows(io.StringIO(text), fmt)
+        except ValueError:
+            continue
+        raise AssertionError(f"{fmt} input {text!r} was accepted")
+
+
+def test_invalid_rows_are_reported_and_skipped():
+    """Rows failing validation are listed by number; the rest are written."""
+    report = import_products(
+        [
+            {"product_name": "Import Report Good", "quantity_available": "3", "unit_price": "40"},
+            {"product_name": "", "quantity_available": "3", "unit_price": "40"},
+            {"product_name": "Import Report Bad", "quantity_available": "x", "unit_price": "40"},
+        ]
+    )
+    assert report["rows_total"] == 3
+    assert report["rows_valid"] == report["rows_written"] == 1
+    assert not report["failed"]
+    assert [error["row"] for error in report["errors"]] == [2, 3]
+    assert list(_stock("Import Report")) == ["Import Report Good"]
+
+
+def test_command_line_import(tmp_path, capsys):
+    """The script imports a CSV file and prints the report."""
+    path = tmp_path / "prices.csv"
+    path.write_text("product_name,quantity_available,unit_price\nImport Cli Rice,20,55\n")
+    assert main([str(path)]) == 0
+    progress, report = capsys.readouterr().out.split("\n", 1)
+    assert progress == "Bulk upserted 1 products."
+    assert json.loads(report)["rows_written"] == 1
+    assert _stock("Import Cli") == {"Import Cli Rice": (Decimal("20"), Decimal("55"))}
+
+
+def test_import_api(client):
+    """The API takes a JSON array or an uploaded file and rejects other bodies."""
+    response = client.post(
+        "/api/products/import",
+        json=[{"product_name": "Import Api Dal", "quantity_available": 4, "unit_price": 90}],
+    )
+    assert response.status_code == 200
+    assert response.get_json()["rows_written"] == 1
+
+    upload = io.BytesIO(
+        b'[{"product_name": "Import Api Oil", "quantity_available": 2, ' b'"unit_price": 150}]'
+    )
+    response = client.post("/api/products/import", data={"file": (upload, "prices.json")})
+    assert response.status_code == 200
+    assert sorted(_stock("Import Api")) == ["Import Api Dal", "Import Api Oil"]
+
+    assert client.post("/api/products/import", json={"product_name": "x"}).status_code == 400
+    upload = io.BytesIO(b'{"product_name": "x"}')
+    response = client.post("/api/products/import", data={"file": (upload, "prices.json")})
+    assert response.status_code == 400
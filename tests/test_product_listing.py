@@ -0,0 +1,75 @@
+"""Tests for the paginated, sorted and filtered product catalog (Product.get_page)."""
+
+import pytest
+
+from models import Product
+
+NAMES = [f"Pager Product {letter}" for letter in "ABCDE"]
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    """Save five products: stock 10..50 kg, prices 50..10 rupees; the last is inactive."""
+    ids = []
+    for index, name in enumerate(NAMES):
+        assert Product(
+            product_name=name, quantity_available=(index + 1) * 10, unit_price=(5 - index) * 10
+        ).save()
+        ids.append(Product.get_by_name_like(name)[0]["product_id"])
+    assert Product.inactivate(ids[-1])
+    return ids
+
+
+def _names(rows):
+    return [row["product_name"] for row in rows]
+
+
+def _page(cursor=None, direction="next", **options):
+    return Product.get_page(
+        2, cursor=cursor, direction=direction, search="Pager Product", **options
+    )
+
+
+def test_product_cursors_walk_both_directions(catalog):
+    """Product pages follow next and prev cursors, in name order."""
+    first = _page()
+    assert _names(first["products"]) == NAMES[:2]
+    assert first["prev_cursor"] is None
+    second = _page(first["next_cursor"])
+    assert _names(second["products"]) == NAMES[2:4]
+    last = _page(second["next_cursor"])
+    assert _names(last["products"]) == NAMES[4:]
+    assert last["next_cursor"] is None
+    back = _page(last["prev_cursor"], "prev")
+    assert _names(back["products"]) == NAMES[2:4]
+
+
+def test_descending_sort_pages_both_ways(catalog):
+    """A descending sort on another column pages with its own cursors."""
+    by_stock = _page(sort="stock", descending=True)
+    assert _names(by_stock["products"]) == NAMES[::-1][:2]
+    second = _page(by_stock["next_cursor"], sort="stock", descending=True)
+    assert _names(second["products"]) == NAMES[::-1][2:4]
+    back = _page(second["prev_cursor"], "prev", sort="stock", descending=True)
+    assert _names(back["products"]) == NAMES[::-1][:2]
+
+
+def test_api_filters_by_status_stock_and_price(client, catalog):
+    """GET /api/products applies the status, stock and price filters together."""
+    query = {"search_query": "Pager Product", "page_size": 10}
+    active = client.get("/api/products", query_string={**query, "status": "active"}).get_json()
+    assert _names(active["products"]) == NAMES[:4]
+    inactive = client.get("/api/products", query_string={**query, "status": "inactive"})
+    assert _names(inactive.get_json()["products"]) == NAMES[4:]
+    filtered = client.get(
+        "/api/products", query_string={**query, "max_stock": "30", "min_price": "35"}
+    ).get_json()
+    assert _names(filtered["products"]) == NAMES[:2]
+
+
+@pytest.mark.parametrize(
+    "query", [{"sort": "price"}, {"order": "up"}, {"status": "gone"}, {"max_stock": "-1"}]
+)
+def test_api_rejects_bad_listing_options(client, query):
+    """Unknown sorts, orders and statuses and negative amounts get a 400."""
+    assert client.get("/api/products", query_string=query).status_code == 400
@@ -0,0 +1,110 @@
+"""Tests for cart stock holds (models.StockReservation) and their use at checkout."""
+
+from decimal import Decimal
+
+from config import Config
+from models import Invoice, Product, StockReservation
+from money import sale_line
+
+
+def _stock(product_id):
+    return Product.get_by_id(product_id)["quantity_available"]
+
+
+def test_hold_takes_stock_and_release_returns_it(make_product):
+    """A hold leaves only unreserved stock available; releasing puts it back."""
+    product_id = make_product(quantity_available=10)
+    assert StockReservation.hold("cart-a", product_id, 4000)
+    assert StockReservation.hold("cart-a", product_id, 1000)
+    assert _stock(product_id) == Decimal("5")
+    assert StockReservation.held(product_id) == Decimal("5")
+    assert StockReservation.release("cart-a") == 1
+    assert _stock(product_id) == Decimal("10")
+    assert StockReservation.held(product_id) == 0
+
+
+def test_hold_beyond_unreserved_stock_fails(make_product):
+    """A hold cannot take stock another cart already holds."""
+    product_id = make_product(quantity_available=10)
+    assert StockReservation.hold("cart-a", product_id, 8000)
+    assert not StockReservation.hold("cart-b", product_id, 3000)
+    assert _stock(product_id) == Decimal("2")
+    assert StockReservation.held(product_id) == Decimal("8")
+
+
+def test_unhold_gives_back_only_the_last_hold(make_product):
+    """Giving back one hold() with unhold keeps what earlier holds reserved."""
+    product_id = make_product(quantity_available=10)
+    assert StockReservation.hold("cart-a", product_id, 2000)
+    assert StockReservation.hold("cart-a", product_id, 3000)
+    assert StockReservation.unhold("cart-a", product_id, 3000)
+    assert StockReservation.held(product_id) == Decimal("2")
+    assert not StockReservation.unhold("cart-a", product_id, 3000)
+    assert StockReservation.unhold("cart-a", product_id, 2000)
+    assert StockReservation.held(product_id) == 0
+    assert _stock(product_id) == Decimal("10")
+
+
+def test_expired_holds_are_returned_to_stock(make_product, monkeypatch):
+    """release_expired returns holds past their expiry and leaves current ones."""
+    product_id = make_product(quantity_available=10)
+    monkeypatch.setattr(Config, "RESERVATION_TTL", -1)
+    assert StockReservation.hold("cart-expired", product_id, 2000)
+    monkeypatch.setattr(Config, "RESERVATION_TTL", 600)
+    assert StockReservation.hold("cart-current", product_id, 3000)
+    assert StockReservation.release_expired() >= 1
+    assert StockReservation.held(product_id) == Decimal("3")
+    assert _stock(product_id) == Decimal("7")
+
+
+def test_checkout_consumes_the_cart_holds(make_product):
+    """Held stock is sold without being taken twice; unsold holds are returned."""
+    product_id = make_product(quantity_available=10)
+    assert StockReservation.hold("cart-sale", product_id, 4000)
+    invoice = Invoice(
+        customer_name="Held",
+        grand_total_paise=24000,
+        items=[sale_line(product_id, "Held", 8000, 3000)],
+    )
+    assert invoice.save(cart_id="cart-sale")
+    assert StockReservation.held(product_id) == 0
+    assert _stock(product_id) == Decimal("7")
+
+
+def test_edited_stock_is_stock_on_hand(make_product):
+    """An edited quantity includes held stock, which stays held."""
+    product_id = make_product(quantity_available=10)
+    assert StockReservation.hold("cart-edit", product_id, 4000)
+    product = Product(
+        product_id=product_id, product_name=Product.get_by_id(product_id)["product_name"]
+    )
+    product.quantity_available = Decimal("12")
+    assert product.update()
+    assert _stock(product_id) == Decimal("8")
+    product.quantity_available = Decimal("3")
+    assert not product.update()
+    assert StockReservation.release("cart-edit") == 1
+    assert _stock(product_id) == Decimal("12")
+
+
+def test_failed_cart_add_gives_the_hold_back(client, make_product, monkeypatch):
+    """If the cart line cannot be stored, the stock held for it is returned at once."""
+    product_id = make_product(quantity_available=10)
+    name = Product.get_by_id(product_id)["product_name"]
+
+    def add(quantity):
+        return client.post(
+            "/invoice/create",
+            data={"action": "add_to_cart", "product_search": name, "quantity_to_sell": quantity},
+        )
+
+    assert add("2").status_code == 302
+    assert StockReservation.held(product_id) == Decimal("2")
+
+    def full(*args):
+        raise RuntimeError("cart store is full")
+
+    monkeypatch.setattr(client.application.extensions["cart_store"], "add_item", full)
+    assert add("3").status_code == 302
+    assert StockReservation.held(product_id) == Decimal("2")
+    assert _stock(product_id) == Decimal("8")
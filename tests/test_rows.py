@@ -0,0 +1,36 @@
+"""Tests for the typed row objects (rows.py)."""
+
+from decimal import Decimal
+
+import pytest
+
+from rows import InvoiceRow, ProductRow
+
+PRODUCT = (7, "Basmati Rice", Decimal("12.500"), Decimal("80.50"), None, 1)
+
+
+def test_rows_read_by_name_position_and_attribute():
+    """A row reads like the dictionary it replaces and like a tuple."""
+    row = ProductRow._make(PRODUCT)
+    assert row["unit_price"] == row.unit_price == row[3] == Decimal("80.50")
+    assert row[-1] == 1
+    assert row[:2] == (7, "Basmati Rice")
+    assert dict(row)["product_name"] == "Basmati Rice"
+
+
+def test_unknown_names_raise_key_error():
+    """Missing names behave as on a dictionary: KeyError, or the default from get()."""
+    row = ProductRow._make(PRODUCT)
+    with pytest.raises(KeyError):
+        row["price"]
+    assert row.get("price", 0) == 0
+    assert "price" not in row.keys()
+
+
+def test_each_row_type_has_its_own_field_positions():
+    """Field positions are built per row type, so shared names do not collide."""
+    invoice = InvoiceRow(3, None, "Ravi", Decimal("10.00"))
+    assert invoice["customer_name"] == "Ravi"
+    assert invoice["items"] is None
+    assert ProductRow._positions["product_name"] == 1
+    assert InvoiceRow._positions["customer_name"] == 2
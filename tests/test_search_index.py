@@ -0,0 +1,84 @@
+"""Tests for the trigram product name search index and the autocomplete endpoint."""
+
+from models import Product
+from search_index import ProductSearchIndex
+
+
+def _index(*products):
+    index = ProductSearchIndex()
+    index.load(
+        {"product_id": product_id, "product_name": name, "is_active": active}
+        for product_id, name, active in products
+    )
+    return index
+
+
+def test_matches_are_ranked_exact_prefix_word_then_substring():
+    """Exact names come first, then prefixes, word prefixes and other substrings."""
+    index = _index(
+        (1, "Brown Rice", True),
+        (2, "Rice", True),
+        (3, "Rice Flour", True),
+        (4, "Licorice", True),
+        (5, "Wheat", True),
+    )
+    assert [product_id for product_id, _ in index.search("rice")] == [2, 3, 1, 4]
+    assert index.search("RICE", limit=1) == [(2, "Rice")]
+    assert index.search("oat") == []
+    assert index.search("  ") == []
+
+
+def test_short_terms_and_inactive_products():
+    """Terms under three characters scan the names; inactive products are opt-in."""
+    index = _index((1, "Tea Leaves", True), (2, "Teak Oil", False))
+    assert index.search("te") == [(1, "Tea Leaves")]
+    assert index.search("te", include_inactive=True) == [(1, "Tea Leaves"), (2, "Teak Oil")]
+    assert index.set_active(2, True)
+    assert index.search("teak") == [(2, "Teak Oil")]
+    assert not index.set_active(3, True)
+
+
+def test_upsert_reindexes_a_renamed_product():
+    """A rename drops the old name's trigrams."""
+    index = _index((1, "Green Chilli", True))
+    index.upsert(1, "Red Chilli", True)
+    assert index.search("green") == []
+    assert index.search("red") == [(1, "Red Chilli")]
+
+
+def test_staleness():
+    """An index is stale until loaded and again after invalidate()."""
+    index = ProductSearchIndex()
+    assert index.is_stale(60)
+    index.load([])
+    assert not index.is_stale(60)
+    index.invalidate()
+    assert index.is_stale(60)
+
+
+def test_catalog_writes_are_searchable(make_product):
+    """New, renamed and deactivated products show up in Product.search_names at once."""
+    product_id = make_product(name="Searchable Saffron")
+    assert Product.search_names("searchable saf") == [
+        {"product_id": product_id, "product_name": "Searchable Saffron"}
+    ]
+    product = Product(
+        product_id=product_id,
+        product_name="Searchable Sesame",
+        quantity_available=100,
+        unit_price=80,
+    )
+    assert product.update()
+    assert Product.search_names("searchable saf") == []
+    assert Product.inactivate(product_id)
+    assert Product.search_names("searchable ses") == []
+    assert len(Product.search_names("searchable ses", include_inactive=True)) == 1
+
+
+def test_search_endpoint(client, make_product):
+    """The API answers terms of three or more characters and caps the limit."""
+    product_id = make_product(name="Endpoint Cardamom")
+    assert client.get("/api/products/search?query=en").get_json() == []
+    response = client.get("/api/products/search?query=endpoint card&limit=500")
+    assert response.status_code == 200
+    assert response.get_json() == [{"product_id": product_id, "product_name": "Endpoint Cardamom"}]
@@ -0,0 +1,43 @@
+"""Tests for exact DECIMAL arithmetic on the SQLite backend (sqlite_backend.py)."""
+
+from decimal import Decimal
+
+from models import DailySales, Invoice, Product
+from money import sale_line
+
+
+def _sell(product_id, grams, price_paise=1010):
+    invoice = Invoice(
+        customer_name="Exact Stock",
+        grand_total_paise=0,
+        items=[sale_line(product_id, "Exact", price_paise, grams)],
+    )
+    return invoice.save(), invoice.stock_error
+
+
+def test_selling_exactly_the_remaining_stock_succeeds(make_product):
+    """Stock left after a sale is exact, so the rest can be sold in one go."""
+    product_id = make_product(quantity_available="0.300")
+    assert _sell(product_id, 100)[1] is None
+    assert Product.get_by_id(product_id)["quantity_available"] == Decimal("0.2")
+    invoice_id, stock_error = _sell(product_id, 200)
+    assert invoice_id and stock_error is None
+    assert Product.get_by_id(product_id)["quantity_available"] == 0
+
+
+def test_repeated_adjustments_stay_exact(make_product):
+    """Adding stock in small steps adds up to the exact total."""
+    product_id = make_product(quantity_available=0)
+    for _ in range(3):
+        assert Product.update_quantity(product_id, "0.1")
+    assert Product.get_by_id(product_id)["quantity_available"] == Decimal("0.3")
+    assert _sell(product_id, 300)[1] is None
+
+
+def test_rollup_sums_are_rounded_to_the_paisa(make_product):
+    """Daily sales rows accumulate exact quantities and revenue."""
+    product_id = make_product(quantity_available=10)
+    _sell(product_id, 100)
+    _sell(product_id, 200)
+    (row,) = [row for row in DailySales.top_products(limit=100) if row["product_id"] == product_id]
+    assert (row["quantity_sold"], row["revenue"]) == (0.3, 3.03)
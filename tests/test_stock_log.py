@@ -0,0 +1,120 @@
+"""Tests for the stock movement log (stock_log.py), its model hooks and movements.py."""
+
+from datetime import datetime, timedelta
+
+import models
+import movements
+from models import Invoice, Product, StockReservation
+from money import sale_line
+from stock_log import MAGIC, RECORD, StockHistory, StockLog
+
+
+def _log_to(monkeypatch, path):
+    log = StockLog(str(path), flush_interval=60)
+    monkeypatch.setattr(models, "_stock_log", log)
+    monkeypatch.setattr(models, "_stock_history", StockHistory(str(path)))
+    return log
+
+
+def test_log_file_format_and_replay(tmp_path):
+    """Flushed events are fixed-size records after the header and replay to running totals."""
+    path = tmp_path / "stock.log"
+    log = StockLog(str(path), flush_interval=60)
+    log.record("create", {7: 5000, 8: 0})
+    log.record("sale", {7: -1250}, invoice_id=3)
+    assert log.stats()["pending"] == 2
+    assert log.flush() == 2
+    assert path.stat().st_size == len(MAGIC) + 2 * RECORD.size
+    assert log.stats()["written"] == 2
+
+    history = StockHistory(str(path))
+    assert history.stock_at(7) == 3750
+    assert history.stock_at(8) == 0
+    assert history.stock_at(7, datetime.now() - timedelta(hours=1)) == 0
+    assert [(e["reason"], e["invoice_id"], e["quantity_grams"]) for e in history.events(7)] == [
+        ("create", None, 5000),
+        ("sale", 3, 3750),
+    ]
+
+    log.record("adjust", {7: 250})
+    log.flush()
+    assert history.refresh() == 1
+    assert history.stock_at(7) == 4000
+    assert history.product_ids() == {7}
+
+
+def test_holds_count_as_on_hand_when_asked(tmp_path):
+    """Without holds the stock still in carts counts as not yet sold."""
+    path = tmp_path / "stock.log"
+    log = StockLog(str(path), flush_interval=60)
+    log.record("create", {1: 10000})
+    log.record("hold", {1: -2000})
+    log.flush()
+    history = StockHistory(str(path))
+    assert history.stock_at(1) == 8000
+    assert history.stock_at(1, include_holds=False) == 10000
+
+
+def test_out_of_order_batches_are_sorted(tmp_path):
+    """Records appended late by another process are merged into time order."""
+    path = tmp_path / "stock.log"
+    now = round(datetime.now().timestamp() * 1_000_000)
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(RECORD.pack(now - 10, 4, 1000, 1, 0))
+        f.write(RECORD.pack(now - 30, 4, 500, 0, 0))
+        f.write(RECORD.pack(now - 20, 4, -200, 4, 0))
+    history = StockHistory(str(path))
+    assert [e["quantity_grams"] for e in history.events(4)] == [500, 300, 1300]
+
+
+def test_disabled_log_records_nothing(tmp_path):
+    """A log without a path ignores events and never creates a file."""
+    log = StockLog(None)
+    log.record("create", {1: 1000})
+    assert not log.enabled
+    assert log.flush() == 0
+    assert StockHistory(None).stock_at(1) == 0
+
+
+def test_model_writes_are_logged(monkeypatch, tmp_path, make_product):
+    """Creating, adjusting, holding and selling a product each log a movement."""
+    _log_to(monkeypatch, tmp_path / "stock.log")
+    product_id = make_product(quantity_available=10, unit_price=50)
+    name = Product.get_by_id(product_id)["product_name"]
+    assert Product.update_quantity(product_id, 2)
+    assert StockReservation.hold("log-cart", product_id, 3000)
+    invoice = Invoice(
+        customer_name="Stock Log",
+        grand_total_paise=15000,
+        items=[sale_line(product_id, name, 5000, 3000)],
+    )
+    assert invoice.save(cart_id="log-cart")
+
+    events = Product.stock_movements(product_id)
+    assert [(e["reason"], e["change_grams"]) for e in events] == [
+        ("create", 10000),
+        ("adjust", 2000),
+        ("hold", -3000),
+        ("release", 3000),
+        ("sale", -3000),
+    ]
+    assert events[-1]["invoice_id"] == invoice.invoice_id
+    assert Product.stock_at(product_id) == 9000
+    assert Product.stock_log_stats()["written"] == 5
+
+
+def test_opening_stock_and_command_line(monkeypatch, tmp_path, make_product, capsys):
+    """Products with no events get an opening balance, listed by movements.py."""
+    product_id = make_product(quantity_available=4)
+    _log_to(monkeypatch, tmp_path / "stock.log")
+    assert movements.main(["opening"]) == 0
+    assert Product.stock_at(product_id) == 4000
+    assert movements.main(["opening"]) == 0
+    assert len(Product.stock_movements(product_id)) == 1
+
+    capsys.readouterr()
+    assert movements.main(["stock", str(product_id)]) == 0
+    assert capsys.readouterr().out == "4.000 kgs\n"
+    assert movements.main(["history", str(product_id)]) == 0
+    assert capsys.readouterr().out.rstrip().endswith("-> 4.000 kgs  opening")